@@ -0,0 +1,40 @@
+"""
+Add archived_record_tags table (tag index of archived health records)
+
+Run `flask backfill-record-tags` after upgrading to index records archived before this revision.
+
+Revision ID: add_archived_record_tags_v3n8ja
+Revises: health_records_sqlite_autoincrement_p7f3wd
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_archived_record_tags_v3n8ja'
+down_revision = 'health_records_sqlite_autoincrement_p7f3wd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite/dev databases get the table from db.create_all() at startup; only create it when missing
+    if 'archived_record_tags' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'archived_record_tags',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('record_id', sa.Integer(), sa.ForeignKey('health_records_archive.id'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('tag', sa.String(length=120), nullable=False),
+    )
+    op.create_index('ix_archived_record_tags_record_id', 'archived_record_tags', ['record_id'])
+    op.create_index('ix_archived_record_tags_user_tag', 'archived_record_tags', ['user_id', 'tag', 'record_id'])
+
+
+def downgrade():
+    if 'archived_record_tags' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.drop_index('ix_archived_record_tags_user_tag', table_name='archived_record_tags')
+    op.drop_index('ix_archived_record_tags_record_id', table_name='archived_record_tags')
+    op.drop_table('archived_record_tags')
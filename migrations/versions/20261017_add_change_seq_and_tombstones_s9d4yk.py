@@ -0,0 +1,60 @@
+"""
+Add change_seq to health records, archived records and members, and the record_tombstones table (delta sync)
+
+Revision ID: add_change_seq_and_tombstones_s9d4yk
+Revises: add_health_records_archive_h2v6sc
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_seq_and_tombstones_s9d4yk'
+down_revision = 'add_health_records_archive_h2v6sc'
+branch_labels = None
+depends_on = None
+
+# table -> index on (owner column, change_seq)
+CHANGE_SEQ_INDEXES = {
+    'health_records': ('ix_health_records_user_change_seq', 'user_id'),
+    'health_records_archive': ('ix_health_records_archive_user_change_seq', 'user_id'),
+    'members': ('ix_members_household_change_seq', 'household_id'),
+}
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # The app adds the columns (and db.create_all() the table on SQLite) at startup; only add what is missing.
+    # Existing rows keep change_seq 0 and are sequenced on their owner's first full sync.
+    for table, (index, owner) in CHANGE_SEQ_INDEXES.items():
+        if 'change_seq' in _columns(table):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=False, server_default='0'))
+        op.create_index(index, table, [owner, 'change_seq'])
+    if 'record_tombstones' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'record_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_record_tombstones_user_change_seq', 'record_tombstones', ['user_id', 'change_seq'])
+
+
+def downgrade():
+    if 'record_tombstones' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_record_tombstones_user_change_seq', table_name='record_tombstones')
+        op.drop_table('record_tombstones')
+    for table, (index, _) in CHANGE_SEQ_INDEXES.items():
+        if 'change_seq' not in _columns(table):
+            continue
+        op.drop_index(index, table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('change_seq')
@@ -0,0 +1,43 @@
+"""
+Add export_jobs table (background CSV exports)
+
+Revision ID: add_export_jobs_q3z8kd
+Revises: add_user_data_version_b7q4ne
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_export_jobs_q3z8kd'
+down_revision = 'add_user_data_version_b7q4ne'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite/dev databases get the table from db.create_all() at startup; only create it when missing
+    if 'export_jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('filters', sa.Text(), nullable=False),
+        sa.Column('rows_total', sa.Integer(), nullable=True),
+        sa.Column('rows_written', sa.Integer(), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_export_jobs_user_id', 'export_jobs', ['user_id'])
+    op.create_index('ix_export_jobs_expires_at', 'export_jobs', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_export_jobs_expires_at', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_user_id', table_name='export_jobs')
+    op.drop_table('export_jobs')
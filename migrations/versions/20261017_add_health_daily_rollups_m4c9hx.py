@@ -0,0 +1,46 @@
+"""
+Add health_daily_rollups table (per-member, per-day aggregates)
+
+Run `flask rebuild-rollups` after upgrading to populate it from existing records.
+
+Revision ID: add_health_daily_rollups_m4c9hx
+Revises: add_user_subjects_backfilled_t5n1vd
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_health_daily_rollups_m4c9hx'
+down_revision = 'add_user_subjects_backfilled_t5n1vd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite/dev databases get the table from db.create_all() at startup; only create it when missing
+    if 'health_daily_rollups' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'health_daily_rollups',
+        sa.Column('member_id', sa.Integer(), sa.ForeignKey('members.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('systolic_sum', sa.Integer(), nullable=False),
+        sa.Column('systolic_min', sa.Integer(), nullable=True),
+        sa.Column('systolic_max', sa.Integer(), nullable=True),
+        sa.Column('diastolic_sum', sa.Integer(), nullable=False),
+        sa.Column('diastolic_min', sa.Integer(), nullable=True),
+        sa.Column('diastolic_max', sa.Integer(), nullable=True),
+        sa.Column('heart_rate_count', sa.Integer(), nullable=False),
+        sa.Column('heart_rate_sum', sa.Integer(), nullable=False),
+        sa.Column('heart_rate_min', sa.Integer(), nullable=True),
+        sa.Column('heart_rate_max', sa.Integer(), nullable=True),
+    )
+    op.create_index('ix_health_daily_rollups_user_day', 'health_daily_rollups', ['user_id', 'day'])
+
+
+def downgrade():
+    op.drop_index('ix_health_daily_rollups_user_day', table_name='health_daily_rollups')
+    op.drop_table('health_daily_rollups')
@@ -0,0 +1,55 @@
+"""
+Add composite indexes for the health record list/count/export queries
+
+- health_records (user_id, timestamp, id): per-user filter, time range and sort/seek
+- record_subjects (member_id, record_id): covering index for the member filter subquery
+- record_subjects.record_id becomes unique (one subject per record); the old
+  single-column member_id index is superseded by the composite one
+
+Revision ID: add_health_query_indexes_r8w2mc
+Revises: add_record_tags_k3p7qa
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_health_query_indexes_r8w2mc'
+down_revision = 'add_record_tags_k3p7qa'
+branch_labels = None
+depends_on = None
+
+
+def _indexes(table):
+    return {ix['name']: ix for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # db.create_all() at startup may already have built some of these on fresh databases
+    if 'ix_health_records_user_ts_id' not in _indexes('health_records'):
+        op.create_index('ix_health_records_user_ts_id', 'health_records', ['user_id', 'timestamp', 'id'])
+    subject_indexes = _indexes('record_subjects')
+    if 'ix_record_subjects_member_record' not in subject_indexes:
+        op.create_index('ix_record_subjects_member_record', 'record_subjects', ['member_id', 'record_id'])
+    if subject_indexes.get('ix_record_subjects_record_id', {}).get('unique'):
+        return
+
+    # Keep the earliest mapping if legacy backfills ever produced duplicates, so the unique index can be built.
+    # The derived table is required by MySQL, which cannot select from the table it deletes from.
+    op.execute(sa.text(
+        "DELETE FROM record_subjects WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM record_subjects GROUP BY record_id) AS keep_rows)"
+    ))
+    if 'ix_record_subjects_record_id' in subject_indexes:
+        op.drop_index('ix_record_subjects_record_id', table_name='record_subjects')
+    op.create_index('ix_record_subjects_record_id', 'record_subjects', ['record_id'], unique=True)
+    if 'ix_record_subjects_member_id' in subject_indexes:
+        op.drop_index('ix_record_subjects_member_id', table_name='record_subjects')
+
+
+def downgrade():
+    op.create_index('ix_record_subjects_member_id', 'record_subjects', ['member_id'])
+    op.drop_index('ix_record_subjects_record_id', table_name='record_subjects')
+    op.create_index('ix_record_subjects_record_id', 'record_subjects', ['record_id'])
+    op.drop_index('ix_record_subjects_member_record', table_name='record_subjects')
+    op.drop_index('ix_health_records_user_ts_id', table_name='health_records')
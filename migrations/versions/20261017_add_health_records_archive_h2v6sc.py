@@ -0,0 +1,55 @@
+"""
+Add health_records_archive table and users.archived_before (cold record archive)
+
+Revision ID: add_health_records_archive_h2v6sc
+Revises: add_export_jobs_q3z8kd
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_health_records_archive_h2v6sc'
+down_revision = 'add_export_jobs_q3z8kd'
+branch_labels = None
+depends_on = None
+
+
+def _user_columns():
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+
+
+def upgrade():
+    # The app adds the column (and db.create_all() the table on SQLite) at startup; only add what is missing
+    if 'archived_before' not in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('archived_before', sa.DateTime(), nullable=True))
+    if 'health_records_archive' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'health_records_archive',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('subject_member_id', sa.Integer(), sa.ForeignKey('members.id'), nullable=True),
+        sa.Column('systolic', sa.Integer(), nullable=False),
+        sa.Column('diastolic', sa.Integer(), nullable=False),
+        sa.Column('heart_rate', sa.Integer(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('tags', sa.Text(), nullable=True),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.Column('severity', sa.SmallInteger(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_health_records_archive_user_ts_id', 'health_records_archive', ['user_id', 'timestamp', 'id'])
+    op.create_index('ix_health_records_archive_member_ts', 'health_records_archive', ['subject_member_id', 'timestamp'])
+
+
+def downgrade():
+    if 'health_records_archive' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_health_records_archive_member_ts', table_name='health_records_archive')
+        op.drop_index('ix_health_records_archive_user_ts_id', table_name='health_records_archive')
+        op.drop_table('health_records_archive')
+    if 'archived_before' in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.drop_column('archived_before')
@@ -0,0 +1,40 @@
+"""
+Add health_records.severity and (user_id, severity, timestamp) index
+
+Existing rows start NULL; run `flask backfill-record-severity` to classify them.
+
+Revision ID: add_record_severity_w6j2fb
+Revises: add_health_daily_rollups_m4c9hx
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_record_severity_w6j2fb'
+down_revision = 'add_health_daily_rollups_m4c9hx'
+branch_labels = None
+depends_on = None
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def upgrade():
+    # The app adds the column and index at startup on existing databases, so only add what is missing
+    insp = _inspector()
+    if 'severity' not in {c['name'] for c in insp.get_columns('health_records')}:
+        with op.batch_alter_table('health_records') as batch_op:
+            batch_op.add_column(sa.Column('severity', sa.SmallInteger(), nullable=True))
+    if 'ix_health_records_user_severity_ts' not in {i['name'] for i in _inspector().get_indexes('health_records')}:
+        op.create_index('ix_health_records_user_severity_ts', 'health_records', ['user_id', 'severity', 'timestamp'])
+
+
+def downgrade():
+    insp = _inspector()
+    if 'ix_health_records_user_severity_ts' in {i['name'] for i in insp.get_indexes('health_records')}:
+        op.drop_index('ix_health_records_user_severity_ts', table_name='health_records')
+    if 'severity' in {c['name'] for c in _inspector().get_columns('health_records')}:
+        with op.batch_alter_table('health_records') as batch_op:
+            batch_op.drop_column('severity')
@@ -0,0 +1,38 @@
+"""
+Add record_tags table (normalized tag index for health records)
+
+Run `flask backfill-record-tags` after upgrading to index existing records.
+
+Revision ID: add_record_tags_k3p7qa
+Revises: add_user_roles_and_flags_e9u3xz
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_record_tags_k3p7qa'
+down_revision = 'add_user_roles_and_flags_e9u3xz'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite/dev databases get the table from db.create_all() at startup; only create it when missing
+    if 'record_tags' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'record_tags',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('record_id', sa.Integer(), sa.ForeignKey('health_records.id'), nullable=False),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('tag', sa.String(length=120), nullable=False),
+    )
+    op.create_index('ix_record_tags_record_id', 'record_tags', ['record_id'])
+    op.create_index('ix_record_tags_user_tag', 'record_tags', ['user_id', 'tag', 'record_id'])
+
+
+def downgrade():
+    op.drop_index('ix_record_tags_user_tag', table_name='record_tags')
+    op.drop_index('ix_record_tags_record_id', table_name='record_tags')
+    op.drop_table('record_tags')
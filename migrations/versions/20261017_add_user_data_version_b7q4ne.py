@@ -0,0 +1,32 @@
+"""
+Add users.data_version (bumped on record/member writes, drives record ETags)
+
+Revision ID: add_user_data_version_b7q4ne
+Revises: add_record_severity_w6j2fb
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_data_version_b7q4ne'
+down_revision = 'add_record_severity_w6j2fb'
+branch_labels = None
+depends_on = None
+
+
+def _user_columns():
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+
+
+def upgrade():
+    # The app adds this column at startup on existing databases, so only add it when missing
+    if 'data_version' not in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default=sa.text('0')))
+
+
+def downgrade():
+    if 'data_version' in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.drop_column('data_version')
@@ -0,0 +1,36 @@
+"""
+Add users.record_subjects_backfilled marker
+
+Existing users start unmarked; run `flask backfill-record-subjects` (or let the
+first list/export request per user do it) to map legacy records to Self.
+
+Revision ID: add_user_subjects_backfilled_t5n1vd
+Revises: add_health_query_indexes_r8w2mc
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_subjects_backfilled_t5n1vd'
+down_revision = 'add_health_query_indexes_r8w2mc'
+branch_labels = None
+depends_on = None
+
+
+def _user_columns():
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns('users')}
+
+
+def upgrade():
+    # The app adds this column at startup on existing databases, so only add it when missing
+    if 'record_subjects_backfilled' not in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('record_subjects_backfilled', sa.Boolean(), nullable=False,
+                                          server_default=sa.text('0')))
+
+
+def downgrade():
+    if 'record_subjects_backfilled' in _user_columns():
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.drop_column('record_subjects_backfilled')
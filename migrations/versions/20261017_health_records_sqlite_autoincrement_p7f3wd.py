@@ -0,0 +1,47 @@
+"""
+Never reuse health record ids on SQLite (AUTOINCREMENT), so archived ids stay unique
+
+Revision ID: health_records_sqlite_autoincrement_p7f3wd
+Revises: add_change_seq_and_tombstones_s9d4yk
+Create Date: 2026-10-17
+
+Without AUTOINCREMENT SQLite hands out max(id) + 1, so ids of records moved to health_records_archive
+come back. MySQL/InnoDB keeps its AUTO_INCREMENT counter and needs no change.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'health_records_sqlite_autoincrement_p7f3wd'
+down_revision = 'add_change_seq_and_tombstones_s9d4yk'
+branch_labels = None
+depends_on = None
+
+
+def _is_sqlite():
+    return op.get_bind().dialect.name == 'sqlite'
+
+
+def upgrade():
+    if not _is_sqlite():
+        return
+    bind = op.get_bind()
+    with op.batch_alter_table('health_records', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    # Continue after every id ever handed out, archived ones included
+    tables = ['health_records']
+    if 'health_records_archive' in sa.inspect(bind).get_table_names():
+        tables.append('health_records_archive')
+    last_id = max(bind.execute(sa.text(f"SELECT COALESCE(MAX(id), 0) FROM {t}")).scalar() for t in tables)
+    bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'health_records'"))
+    bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('health_records', :seq)"),
+                 {"seq": last_id})
+
+
+def downgrade():
+    if not _is_sqlite():
+        return
+    with op.batch_alter_table('health_records', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
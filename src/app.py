@@ -14,7 +14,10 @@ from .service.health_service import health_bp
 from .service.member_service import member_bp
 from .service.admin_service import admin_bp
 from .service.version_service import version_bp
+from .service.sync_service import sync_bp
 from .errors import register_error_handlers
+from .commands import register_commands
+from . import cache, compression, exports, json_provider
 from flask import request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from .utils import error
@@ -68,11 +71,15 @@ def create_app(config_class: type = Config) -> Flask:
     except Exception:
         pass
 
-    # Init extensions
+    # Init extensions; after_request hooks run in reverse order, so compression (first) sees the final response
+    compression.init_app(app)
     db.init_app(app)
     jwt.init_app(app)
     limiter.init_app(app)
     migrate.init_app(app, db)
+    json_provider.init_app(app)
+    cache.init_app(app)
+    exports.init_app(app)
     # Generated by Zhuang: CORS relaxed for local dev and export download
     cors.init_app(app, resources={
         r"/api/*": {
@@ -82,10 +89,11 @@ def create_app(config_class: type = Config) -> Flask:
                 "Authorization",
                 "authorization",
                 "Content-Type",
-                "X-Requested-With"
+                "X-Requested-With",
+                "If-None-Match"
             ],
-            # Expose filename for CSV download
-            "expose_headers": ["Content-Disposition"],
+            # Expose filename for CSV download, and ETag for conditional record reads
+            "expose_headers": ["Content-Disposition", "ETag"],
             # Explicitly allow OPTIONS for preflight
             "methods": ["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
             # Allow credentials if the client opts in (cookies/authorization)
@@ -121,7 +129,9 @@ def create_app(config_class: type = Config) -> Flask:
                     try:
                         insp = inspect(db.engine)
                         existing = set(insp.get_table_names())
-                        required = {"users", "members", "health_records", "households", "record_subjects"}
+                        required = {"users", "members", "health_records", "households", "record_subjects", "record_tags",
+                                    "health_daily_rollups", "export_jobs",
+                                    "health_records_archive", "archived_record_tags", "record_tombstones"}
                         if not required.issubset(existing):
                             should_create = True
                     except Exception:
@@ -159,13 +169,55 @@ def create_app(config_class: type = Config) -> Flask:
                             conn.execute(text("ALTER TABLE users ADD COLUMN last_login_at DATETIME NULL"))
                         except Exception:
                             pass
+                    # Add record_subjects_backfilled column (existing users still need a backfill)
+                    if 'record_subjects_backfilled' not in cols:
+                        try:
+                            conn.execute(text("ALTER TABLE users ADD COLUMN record_subjects_backfilled INTEGER NOT NULL DEFAULT 0"))
+                        except Exception:
+                            pass
+                    # Add data_version column
+                    if 'data_version' not in cols:
+                        try:
+                            conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+                        except Exception:
+                            pass
+                    # Add archived_before column (set by `flask archive-records`)
+                    if 'archived_before' not in cols:
+                        try:
+                            conn.execute(text("ALTER TABLE users ADD COLUMN archived_before DATETIME NULL"))
+                        except Exception:
+                            pass
+                if 'health_records' in set(insp2.get_table_names()):
+                    cols = {c['name'] for c in insp2.get_columns('health_records')}
+                    conn = db.session.connection()
+                    # Add severity column (existing rows are classified by `flask backfill-record-severity`)
+                    if 'severity' not in cols:
+                        try:
+                            conn.execute(text("ALTER TABLE health_records ADD COLUMN severity SMALLINT NULL"))
+                            conn.execute(text("CREATE INDEX ix_health_records_user_severity_ts "
+                                              "ON health_records (user_id, severity, timestamp)"))
+                        except Exception:
+                            pass
+                # Add change_seq columns (delta sync); existing rows are sequenced on their owner's first sync
+                for table, index, owner in (
+                        ("health_records", "ix_health_records_user_change_seq", "user_id"),
+                        ("health_records_archive", "ix_health_records_archive_user_change_seq", "user_id"),
+                        ("members", "ix_members_household_change_seq", "household_id")):
+                    if table not in set(insp2.get_table_names()):
+                        continue
+                    if 'change_seq' not in {c['name'] for c in insp2.get_columns(table)}:
+                        conn = db.session.connection()
+                        try:
+                            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"))
+                            conn.execute(text(f"CREATE INDEX {index} ON {table} ({owner}, change_seq)"))
+                        except Exception:
+                            pass
                         
             except Exception:
                 pass
             # Ensure default SUPER_ADMIN account exists (skip in tests)
             if not app.config.get("TESTING", False):
                 try:
-                    from .manager.user_manager import UserManager
                     from .models import User
                     um = UserManager()
                     # Default credentials configurable via env
@@ -179,6 +231,7 @@ def create_app(config_class: type = Config) -> Flask:
                         # Force password change on first login
                         sa.must_change_password = True
                         db.session.commit()
+                        um.invalidate_cache(sa.id)
                     else:
                         # Ensure role is SUPER_ADMIN (do not downgrade silently)
                         if existing.role != "SUPER_ADMIN":
@@ -197,6 +250,7 @@ def create_app(config_class: type = Config) -> Flask:
     app.register_blueprint(member_bp, url_prefix="/api/v1/members")
     app.register_blueprint(admin_bp, url_prefix="/api/v1/admin")
     app.register_blueprint(version_bp, url_prefix="/api/v1/version")
+    app.register_blueprint(sync_bp, url_prefix="/api/v1/sync")
 
     # Generated by Zhuang: lightweight anonymous health endpoint for k8s probes
     @app.get("/api/healthz")
@@ -206,6 +260,9 @@ def create_app(config_class: type = Config) -> Flask:
     # Errors
     register_error_handlers(app)
 
+    # Maintenance CLI commands
+    register_commands(app)
+
     # Removed duplicate /healthz (prefer /api/healthz for probes). Generated by Zhuang
 
     # Generated by Zhuang: CLI - db-info
@@ -280,8 +337,7 @@ def create_app(config_class: type = Config) -> Flask:
             if not identity:
                 return None
             um = UserManager()
-            user = um.get_user(identity)
-            if user and user.must_change_password:
+            if um.must_change_password(identity):
                 return jsonify(error("403", "Must change password before accessing other features")), 403
         except Exception:
             # Fail-open on middleware errors to avoid breaking APIs unexpectedly
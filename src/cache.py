@@ -0,0 +1,363 @@
+"""
+Application cache: a namespaced facade over pluggable backends.
+
+Backends (CACHE_BACKEND):
+- "memory": per-process LRU + TTL (default; each gunicorn worker has its own copy)
+- "sqlite": a SQLite file shared by every worker on the host (CACHE_URL is the file path)
+- "redis": any Redis-protocol server shared by every host (CACHE_URL, needs the `redis` package)
+- "none": caching disabled
+
+Values are stored as JSON, so only API payload-like data can be cached (datetimes come back as strings).
+Entries scoped to an owner (a user id) are keyed by the owner's generation counter, which lives in the
+backend too; bumping it invalidates everything cached for that user in every worker at once on shared
+backends, but only in the current process on "memory". Entries that must not go stale in other workers
+either carry a DB-backed version in their key (record pages use data_version) or are cached only when
+Cache.shared is true.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Hashable, Optional
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# app.extensions key of the application cache
+APP_CACHE = "app_cache"
+
+CACHE_BACKENDS = ("memory", "sqlite", "redis", "none")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ttl seconds after being stored."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, value), least recently used first
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] <= self._clock():
+                del self._data[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class MemoryBackend:
+    name = "memory"
+    shared = False
+
+    def __init__(self, maxsize: int = 1024):
+        self.store = TTLCache(maxsize=maxsize)
+        # Counters live outside the LRU: an evicted generation would resurrect stale entries
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        counter = self._counters.get(key)
+        if counter is not None:
+            return str(counter).encode("ascii")
+        return self.store.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.store.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self, prefix: str) -> None:
+        self.store.clear()
+        with self._lock:
+            self._counters.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self.store)
+
+
+class SQLiteBackend:
+    """Cache table in a SQLite file (WAL mode), shared by every process that opens the same path.
+
+    One connection per thread; expired rows are dropped on read and pruned every PRUNE_EVERY writes,
+    which also trims the table to maxsize by earliest expiry.
+    """
+    name = "sqlite"
+    shared = True
+    PRUNE_EVERY = 200
+    # Generation counters never expire
+    _FOREVER = 1e18
+
+    def __init__(self, path: str, maxsize: int = 10000, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        self._conn().execute("CREATE TABLE IF NOT EXISTS cache_entries ("
+                             "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= self._clock():
+            self.delete(key)
+            return None
+        return bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                             (key, value, self._clock() + ttl))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent workers serialize here
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            value = (int(row[0]) if row else 0) + 1
+            conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, str(value).encode("ascii"), self._FOREVER))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def prune(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (self._clock(),))
+        excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.maxsize
+        if excess > 0:
+            conn.execute("DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries "
+                         "WHERE expires_at < ? ORDER BY expires_at LIMIT ?)", (self._FOREVER, excess))
+
+    def clear(self, prefix: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+    def size(self) -> Optional[int]:
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class RedisBackend:
+    """Redis-protocol backend; takes a ready client (anything with redis-py's get/set/delete/incr/scan_iter).
+
+    Generation counters are stored without expiry; run the server with a volatile-* maxmemory policy so
+    only expiring entries are evicted.
+    """
+    name = "redis"
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError:  # pragma: no cover - optional dependency
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def clear(self, prefix: str) -> None:
+        for key in self.client.scan_iter(match=prefix + "*"):
+            self.client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class Cache:
+    """Namespaced get/set with JSON values, per-owner generations and hit/miss counters.
+
+    Backend failures are logged and treated as misses, so an unavailable cache never fails a request.
+    """
+
+    def __init__(self, backend, prefix: str = "hp", default_ttl: float = 30.0,
+                 dumps: Callable[[Any], str] = json.dumps, loads: Callable[[Any], Any] = json.loads):
+        self.backend = backend
+        self._dumps = dumps
+        self._loads = loads
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.errors = 0
+
+    @property
+    def shared(self) -> bool:
+        """Whether every worker sees the same entries (and owner invalidations)."""
+        return getattr(self.backend, "shared", False)
+
+    def _gen_key(self, owner: Hashable) -> str:
+        return f"{self.prefix}:gen:{owner}"
+
+    def _key(self, namespace: str, key: Hashable, owner: Optional[Hashable]) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        if owner is None:
+            return f"{self.prefix}:{namespace}:{digest}"
+        raw = self.backend.get(self._gen_key(owner))
+        generation = int(raw) if raw is not None else 0
+        return f"{self.prefix}:{namespace}:{owner}:{generation}:{digest}"
+
+    def get(self, namespace: str, key: Hashable, owner: Optional[Hashable] = None, default: Any = None) -> Any:
+        try:
+            raw = self.backend.get(self._key(namespace, key, owner))
+        except Exception:
+            self._failed("get")
+            raw = None
+        counters = self._counters[namespace]
+        if raw is None:
+            counters["misses"] += 1
+            return default
+        counters["hits"] += 1
+        return self._loads(raw)
+
+    def set(self, namespace: str, key: Hashable, value: Any, owner: Optional[Hashable] = None,
+            ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self._key(namespace, key, owner), self._dumps(value).encode("utf-8"),
+                             self.default_ttl if ttl is None else ttl)
+        except Exception:
+            self._failed("set")
+
+    def invalidate_owner(self, owner: Hashable) -> None:
+        """Orphan everything cached for owner (old generations age out via TTL/LRU)."""
+        try:
+            self.backend.incr(self._gen_key(owner))
+        except Exception:
+            self._failed("invalidate")
+
+    def clear(self) -> None:
+        self.backend.clear(self.prefix + ":")
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for name, c in self._counters.items():
+            lookups = c["hits"] + c["misses"]
+            namespaces[name] = dict(c, hit_rate=round(c["hits"] / lookups, 3) if lookups else None)
+        try:
+            size = self.backend.size()
+        except Exception:
+            size = None
+        stats = {"backend": self.backend.name, "ttl": self.default_ttl, "size": size,
+                 "errors": self.errors, "namespaces": namespaces}
+        if isinstance(self.backend, MemoryBackend):
+            stats["evictions"] = self.backend.store.evictions
+        return stats
+
+    def _failed(self, op: str) -> None:
+        self.errors += 1
+        logger.warning("cache %s failed on %s backend", op, self.backend.name, exc_info=True)
+
+
+def _make_backend(app):
+    kind = (app.config.get("CACHE_BACKEND") or "memory").lower()
+    if kind not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown CACHE_BACKEND {kind!r}; expected one of {', '.join(CACHE_BACKENDS)}")
+    if kind == "none":
+        return None
+    max_entries = int(app.config.get("CACHE_MAX_ENTRIES", 1024))
+    if kind == "sqlite":
+        path = app.config.get("CACHE_URL") or os.path.join(app.instance_path, "cache.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SQLiteBackend(path, maxsize=max_entries)
+    if kind == "redis":
+        return RedisBackend.from_url(app.config.get("CACHE_URL") or "redis://localhost:6379/0")
+    return MemoryBackend(maxsize=max_entries)
+
+
+def init_app(app, backend=None) -> None:
+    """Create the app cache from config; pass backend to inject one (e.g. a Redis client in tests)."""
+    backend = backend or _make_backend(app)
+    # Values go through the app's JSON provider, so cached payloads may hold datetimes like responses do
+    app.extensions[APP_CACHE] = Cache(backend, prefix=app.config.get("CACHE_KEY_PREFIX", "hp"),
+                                      default_ttl=float(app.config.get("CACHE_TTL", 30)),
+                                      dumps=app.json.dumps, loads=app.json.loads) if backend else None
+
+
+def app_cache() -> Optional[Cache]:
+    """The current app's cache, or None outside an app context or when caching is disabled."""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get(APP_CACHE)
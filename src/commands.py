@@ -0,0 +1,91 @@
+"""
+Maintenance CLI commands (run with `flask <command>`).
+"""
+from datetime import datetime, time, timedelta
+import click
+from .exports import export_jobs
+from .extensions import db
+from .manager.health_manager import HealthManager, ARCHIVE_CHUNK_SIZE, BACKFILL_CHUNK_SIZE
+from .manager.member_manager import MemberManager
+from .manager.rollup_manager import RollupManager
+from .manager.sync_manager import SyncManager, SEQUENCE_CHUNK_SIZE
+from .models import HealthRecord, User
+from .timeutil import UTC
+
+
+def register_commands(app):
+    @app.cli.command("backfill-record-tags")
+    @click.option("--chunk-size", default=BACKFILL_CHUNK_SIZE, show_default=True,
+                  help="Records per transaction.")
+    def backfill_record_tags(chunk_size: int):
+        """Rebuild the record_tags and archived_record_tags indexes from the records' tags (safe to re-run)."""
+        processed = HealthManager().backfill_tags(chunk_size=chunk_size)
+        click.echo(f"Indexed tags for {processed} records")
+
+    @app.cli.command("backfill-record-severity")
+    @click.option("--chunk-size", default=BACKFILL_CHUNK_SIZE, show_default=True,
+                  help="Records per transaction.")
+    def backfill_record_severity(chunk_size: int):
+        """Classify records written before HealthRecord.severity existed (resumable)."""
+        updated = HealthManager().backfill_severity(chunk_size=chunk_size)
+        click.echo(f"Classified {updated} records")
+
+    @app.cli.command("backfill-record-subjects")
+    @click.option("--chunk-size", default=BACKFILL_CHUNK_SIZE, show_default=True,
+                  help="Records per transaction.")
+    def backfill_record_subjects(chunk_size: int):
+        """Map legacy records without a RecordSubject to each owner's Self member (resumable)."""
+        health_mgr = HealthManager()
+        member_mgr = MemberManager()
+        user_ids = [uid for (uid,) in db.session.query(User.id).
+                    filter(User.record_subjects_backfilled.is_(False)).order_by(User.id.asc()).all()]
+        total = 0
+        for uid in user_ids:
+            user = db.session.get(User, uid)
+            self_member = member_mgr.get_or_create_self_member(uid)
+            mapped = health_mgr.backfill_subjects(user, member_id=self_member.id,
+                                                  household_id=self_member.household_id, chunk_size=chunk_size)
+            total += mapped
+        click.echo(f"Mapped {total} records across {len(user_ids)} users")
+
+    @app.cli.command("rebuild-rollups")
+    @click.option("--user-id", type=int, default=None, help="Only rebuild this user's rollups.")
+    def rebuild_rollups(user_id):
+        """Recompute health_daily_rollups from raw health records."""
+        written = RollupManager().rebuild(user_id=user_id)
+        click.echo(f"Wrote {written} daily rollup rows")
+
+    @app.cli.command("gc-export-jobs")
+    def gc_export_jobs():
+        """Delete export jobs (and their files) past their TTL."""
+        removed = export_jobs().gc()
+        click.echo(f"Removed {removed} expired export jobs")
+
+    @app.cli.command("archive-records")
+    @click.option("--older-than", "older_than", type=click.IntRange(min=1), required=True,
+                  help="Archive records more than this many days old (cut at UTC midnight).")
+    @click.option("--user-id", type=int, default=None, help="Only archive this user's records.")
+    @click.option("--chunk-size", default=ARCHIVE_CHUNK_SIZE, show_default=True,
+                  help="Records per transaction.")
+    def archive_records(older_than: int, user_id, chunk_size: int):
+        """Move old health records to health_records_archive (resumable; rollups are kept)."""
+        today = datetime.now(UTC).date()
+        cutoff = datetime.combine(today - timedelta(days=older_than), time.min)
+        if user_id is None:
+            user_ids = [uid for (uid,) in db.session.query(HealthRecord.user_id).
+                        filter(HealthRecord.timestamp < cutoff).distinct().order_by(HealthRecord.user_id).all()]
+        else:
+            user_ids = [user_id]
+        health_mgr = HealthManager()
+        total = sum(health_mgr.archive_records(uid, cutoff, chunk_size=chunk_size) for uid in user_ids)
+        click.echo(f"Archived {total} records older than {cutoff.date().isoformat()} across {len(user_ids)} users")
+
+    @app.cli.command("sequence-sync-rows")
+    @click.option("--chunk-size", default=SEQUENCE_CHUNK_SIZE, show_default=True,
+                  help="Rows per transaction.")
+    def sequence_sync_rows(chunk_size: int):
+        """Give rows written before delta sync a change_seq (resumable; a full sync does it lazily)."""
+        sync_mgr = SyncManager()
+        user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id.asc()).all()]
+        total = sum(sync_mgr.sequence_legacy_rows(uid, chunk_size=chunk_size) for uid in user_ids)
+        click.echo(f"Sequenced {total} rows across {len(user_ids)} users")
@@ -0,0 +1,117 @@
+"""
+Response compression negotiated from Accept-Encoding: gzip, and brotli when the `brotli` package is
+installed.
+
+Buffered bodies smaller than COMPRESS_MIN_SIZE go out as-is; streamed bodies (CSV export, NDJSON) are
+compressed chunk by chunk with a flush after each, so clients keep receiving data as it is produced.
+Settings can be overridden per blueprint through COMPRESS_BLUEPRINTS, e.g.
+{"auth": {"enabled": False}, "health": {"min_size": 256}}.
+"""
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Encodings in server preference order (used when the client weighs them equally)
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESS_MIMETYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html",
+                      "text/css", "application/javascript")
+
+
+def _settings(app) -> dict:
+    settings = {
+        "enabled": app.config.get("COMPRESS_ENABLED", True),
+        "min_size": app.config.get("COMPRESS_MIN_SIZE", 1024),
+        "gzip_level": app.config.get("COMPRESS_GZIP_LEVEL", 6),
+        "br_quality": app.config.get("COMPRESS_BR_QUALITY", 4),
+    }
+    overrides = (app.config.get("COMPRESS_BLUEPRINTS") or {}).get(request.blueprint)
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+
+class _Compressor:
+    """Incremental gzip/brotli compressor with the same compress/flush/finish interface for both."""
+
+    def __init__(self, encoding: str, settings: dict):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=settings["br_quality"])
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(settings["gzip_level"], zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) if self._br else self._gz.compress(data)
+
+    def flush(self) -> bytes:
+        return self._br.flush() if self._br else self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br else self._gz.flush()
+
+
+def _compress_stream(chunks: Iterable, compressor: _Compressor, charset: str) -> Iterator[bytes]:
+    """Compress a response iterable chunk by chunk, flushing after each so nothing is held back."""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # Closing the wrapped iterable tears down stream_with_context's request context
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    best = max(ENCODINGS, key=lambda enc: accepted[enc])
+    return best if accepted[best] > 0 else None
+
+
+def compress_response(response):
+    """after_request hook: compress eligible responses in the encoding the client prefers."""
+    if request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+    if response.mimetype not in COMPRESS_MIMETYPES or "Content-Encoding" in response.headers:
+        return response
+    if response.direct_passthrough:  # send_file: leave files to the front-end server
+        return response
+    settings = _settings(current_app)
+    if not settings["enabled"]:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, _Compressor(encoding, settings), "utf-8")
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < settings["min_size"]:
+            return response
+        compressor = _Compressor(encoding, settings)
+        response.set_data(compressor.compress(data) + compressor.finish())
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity representation, so a strong validator must weaken
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app) -> None:
+    """Register the hook; call it before other extensions so it runs after their after_request hooks."""
+    app.after_request(compress_response)
@@ -37,5 +37,28 @@ class Config:
     ).split(",")
     RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "60 per minute")
     RATELIMIT_AUTH = os.getenv("RATELIMIT_AUTH", "5 per minute")
+    # JSON provider (src/json_provider.py): auto (orjson when installed) | orjson | stdlib
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+    # Application cache (src/cache.py): memory | sqlite | redis | none. CACHE_URL is the SQLite file
+    # path or Redis URL; CACHE_MAX_ENTRIES bounds memory/sqlite backends; CACHE_TTL is in seconds
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_URL = os.getenv("CACHE_URL")
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+    # Response compression (src/compression.py): gzip, or brotli when installed, for bodies of at least
+    # COMPRESS_MIN_SIZE bytes (streamed bodies always). COMPRESS_BLUEPRINTS overrides these per blueprint,
+    # e.g. {"auth": {"enabled": False}}
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1").lower() in ("1", "true", "yes")
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))
+    COMPRESS_BLUEPRINTS = {}
+    # Background export jobs (src/exports.py): thread pool size, queued+running bound per process, how long
+    # finished artifacts are kept (seconds), artifact directory (default instance/exports), run inline
+    EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+    EXPORT_JOB_MAX_PENDING = int(os.getenv("EXPORT_JOB_MAX_PENDING", "8"))
+    EXPORT_JOB_TTL = float(os.getenv("EXPORT_JOB_TTL", "86400"))
+    EXPORT_DIR = os.getenv("EXPORT_DIR")
+    EXPORT_JOBS_EAGER = os.getenv("EXPORT_JOBS_EAGER", "").lower() in ("1", "true", "yes")
     # Application version - read from VERSION file (unified for frontend + backend)
     VERSION = _read_version()
@@ -0,0 +1,96 @@
+"""
+Chart series downsampling: largest-triangle-three-buckets (LTTB) with abnormal-reading preference.
+
+NumPy is used for the per-bucket area computations when installed; the pure-Python fallback runs the
+same algorithm, so both pick the same points (barring floating-point ties).
+"""
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+
+def _bucket_bounds(n: int, threshold: int) -> List[int]:
+    """Start offsets of the threshold-2 inner buckets plus the end of the last one.
+
+    The first and last points are always kept, the rest are split into evenly sized buckets.
+    """
+    every = (n - 2) / (threshold - 2)
+    return [int(i * every) + 1 for i in range(threshold - 2)] + [n - 1]
+
+
+def lttb_indices(x: Sequence[float], ys: Sequence[Sequence[float]], threshold: int,
+                 keep: Optional[Sequence[bool]] = None) -> List[int]:
+    """Indices of at most threshold points of the series sharing the x axis (sorted ascending).
+
+    ys holds one or more y series; a candidate's triangle area is summed across them so one pick
+    serves every line of the chart. When keep is given and a bucket contains kept points (abnormal
+    readings), the pick is made among those, so a spike is never averaged away by its neighbours.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    bounds = _bucket_bounds(n, threshold)
+    if np is not None:
+        return _lttb_numpy(x, ys, bounds, keep)
+    return _lttb_python(x, ys, bounds, keep)
+
+
+def _lttb_python(x, ys, bounds, keep) -> List[int]:
+    n = len(x)
+    picked = [0]
+    a = 0
+    for b in range(len(bounds) - 1):
+        lo, hi = bounds[b], bounds[b + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nlo, nhi = (bounds[b + 1], bounds[b + 2]) if b + 2 < len(bounds) else (n - 1, n)
+        avg_x = sum(x[nlo:nhi]) / (nhi - nlo)
+        avg_ys = [sum(y[nlo:nhi]) / (nhi - nlo) for y in ys]
+        candidates = range(lo, hi)
+        if keep is not None:
+            flagged = [j for j in candidates if keep[j]]
+            if flagged:
+                candidates = flagged
+        best, best_area = None, -1.0
+        for j in candidates:
+            area = 0.0
+            for y, avg_y in zip(ys, avg_ys):
+                area += abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def _lttb_numpy(x, ys, bounds, keep) -> List[int]:
+    n = len(x)
+    xa = np.asarray(x, dtype=float)
+    ya = np.asarray(ys, dtype=float)  # shape (series, n)
+    ka = np.asarray(keep, dtype=bool) if keep is not None else None
+    # Next-bucket averages for every bucket at once via prefix sums
+    starts = np.asarray(bounds[1:-1] + [n - 1])
+    ends = np.asarray(bounds[2:] + [n])
+    cx = np.concatenate(([0.0], np.cumsum(xa)))
+    cy = np.concatenate((np.zeros((ya.shape[0], 1)), np.cumsum(ya, axis=1)), axis=1)
+    counts = ends - starts
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[:, ends] - cy[:, starts]) / counts
+    picked = [0]
+    a = 0
+    for b in range(len(bounds) - 1):
+        cand = np.arange(bounds[b], bounds[b + 1])
+        if ka is not None:
+            flagged = cand[ka[cand]]
+            if flagged.size:
+                cand = flagged
+        area = np.abs((xa[a] - avg_x[b]) * (ya[:, cand] - ya[:, a:a + 1])
+                      - (xa[a] - xa[cand]) * (avg_y[:, b:b + 1] - ya[:, a:a + 1])).sum(axis=0)
+        # argmax returns the first maximum, matching the strict '>' of the Python loop
+        a = int(cand[int(np.argmax(area))])
+        picked.append(a)
+    picked.append(n - 1)
+    return picked
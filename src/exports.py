@@ -0,0 +1,134 @@
+"""
+CSV export rows and background export jobs.
+
+Jobs run on a bounded per-process thread pool (EXPORT_JOB_WORKERS threads, at most
+EXPORT_JOB_MAX_PENDING queued or running) and write a gzip-compressed CSV to EXPORT_DIR
+(instance/exports by default). Finished jobs and their files are removed EXPORT_JOB_TTL seconds after
+they finish. With EXPORT_JOBS_EAGER the job runs inline in the submitting request (tests, debugging).
+"""
+import csv
+import gzip
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from flask import current_app
+from .extensions import db
+from .json_provider import format_datetime
+from .manager.export_job_manager import ExportJobManager
+from .manager.health_manager import EXPORT_CHUNK_SIZE, HealthManager
+
+logger = logging.getLogger(__name__)
+
+# app.extensions key of the export job runner
+EXPORT_JOBS = "export_jobs"
+
+# Columns written by export_csv and export jobs
+CSV_COLUMNS = ["id", "member_name", "timestamp", "systolic", "diastolic", "heart_rate", "tags", "note"]
+
+
+def csv_row(r, fallback_name: str = "") -> list:
+    """One CSV_COLUMNS row from a HealthManager export row."""
+    tags = json.loads(r.tags) if r.tags else []
+    return [
+        r.id,
+        r.member_name or fallback_name,
+        format_datetime(r.timestamp) if r.timestamp else "",
+        r.systolic,
+        r.diastolic,
+        r.heart_rate if r.heart_rate is not None else "",
+        ";".join(tags),
+        (r.note or '').replace('\n', ' ').strip(),
+    ]
+
+
+class ExportJobRunner:
+    def __init__(self, app):
+        self.app = app
+        self.export_dir = app.config.get("EXPORT_DIR") or os.path.join(app.instance_path, "exports")
+        self.ttl = float(app.config.get("EXPORT_JOB_TTL", 86400))
+        self.eager = bool(app.config.get("EXPORT_JOBS_EAGER", False))
+        workers = int(app.config.get("EXPORT_JOB_WORKERS", 2))
+        self._slots = threading.BoundedSemaphore(int(app.config.get("EXPORT_JOB_MAX_PENDING", 8)))
+        self._executor = None if self.eager else ThreadPoolExecutor(workers, thread_name_prefix="export-job")
+        self.jobs = ExportJobManager()
+        self.health = HealthManager()
+
+    def artifact_path(self, job_id: int) -> str:
+        return os.path.join(self.export_dir, f"export-{job_id}.csv.gz")
+
+    def try_reserve(self) -> bool:
+        """Take a queue slot for a new job; False when the pool is already at EXPORT_JOB_MAX_PENDING."""
+        return self._slots.acquire(blocking=False)
+
+    def release(self):
+        self._slots.release()
+
+    def submit(self, job_id: int):
+        """Run the job (holding a slot taken with try_reserve) and give the slot back when it ends."""
+        if self._executor is None:
+            self._run_and_release(job_id)
+        else:
+            self._executor.submit(self._run_and_release, job_id)
+
+    def _run_and_release(self, job_id: int):
+        try:
+            with self.app.app_context():
+                self.run(job_id)
+        finally:
+            self.release()
+
+    def run(self, job_id: int):
+        """Write the job's CSV (gzip) chunk by chunk, recording progress; needs an app context."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        os.makedirs(self.export_dir, exist_ok=True)
+        path = self.artifact_path(job_id)
+        tmp_path = path + ".part"
+        try:
+            filters = self.jobs.load_filters(job)
+            self.jobs.start(job, self.health.count_matching(job.user_id, **filters))
+            written = 0
+            with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                # BOM so Excel reads the UTF-8 (Chinese) text correctly, as in export_csv
+                f.write('\ufeff')
+                writer.writerow(CSV_COLUMNS)
+                for rows in self.health.export_chunks(job.user_id, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+                    writer.writerows(csv_row(r) for r in rows)
+                    written += len(rows)
+                    self.jobs.progress(job, written)
+            os.replace(tmp_path, path)
+            self.jobs.finish(job, self.ttl)
+        except Exception as exc:
+            logger.exception("Export job %s failed", job_id)
+            db.session.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.jobs.finish(job, self.ttl, error=str(exc) or exc.__class__.__name__)
+
+    def gc(self) -> int:
+        """Delete expired jobs and their files; return how many jobs were removed."""
+        expired = self.jobs.expired(stale_after=self.ttl)
+        for job in expired:
+            for path in (self.artifact_path(job.id), self.artifact_path(job.id) + ".part"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        if expired:
+            self.jobs.delete(expired)
+        return len(expired)
+
+
+def init_app(app) -> None:
+    """Create the app's export job runner (its thread pool starts lazily with the first job)."""
+    app.extensions[EXPORT_JOBS] = ExportJobRunner(app)
+
+
+def export_jobs() -> Optional[ExportJobRunner]:
+    """The current app's export job runner."""
+    return current_app.extensions.get(EXPORT_JOBS)
@@ -0,0 +1,78 @@
+"""
+JSON providers for the Flask app: orjson when installed, stdlib otherwise.
+
+Both serialize datetimes natively in the API's format (UTC, ISO 8601 with a trailing "Z"; naive
+datetimes are taken as UTC), sort keys like Flask's default provider and turn Decimal into str.
+"""
+import decimal
+from datetime import date, datetime
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+from .timeutil import UTC
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+JSON_PROVIDERS = ("auto", "orjson", "stdlib")
+
+
+def format_datetime(value: datetime) -> str:
+    """The API's timestamp format: UTC ISO 8601 with "Z" (naive values are UTC)."""
+    value = value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, datetime):
+        return format_datetime(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class UTCJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider, with datetimes in the API format instead of HTTP dates."""
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(UTCJSONProvider):
+    """orjson-backed provider: serializes in C, including datetimes (OPT_NAIVE_UTC | OPT_UTC_Z).
+
+    orjson keeps the offset of aware non-UTC datetimes; the database only returns naive UTC values.
+    """
+
+    def _options(self, pretty: bool = False) -> int:
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Compact like the stdlib provider's dumps; only response() pretty-prints in debug (NDJSON relies on it)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self._app.debug and self.compact is not True
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+def init_app(app) -> None:
+    """Install the JSON provider chosen by JSON_PROVIDER (auto = orjson when installed)."""
+    choice = (app.config.get("JSON_PROVIDER") or "auto").lower()
+    if choice not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER {choice!r}; expected one of {', '.join(JSON_PROVIDERS)}")
+    if choice == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson requires the 'orjson' package")
+    use_orjson = orjson is not None and choice != "stdlib"
+    app.json = (OrjsonProvider if use_orjson else UTCJSONProvider)(app)
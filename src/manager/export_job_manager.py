@@ -0,0 +1,88 @@
+"""
+Export job manager: bookkeeping for background CSV exports (the runner lives in src/exports.py).
+"""
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_
+from ..extensions import db
+from ..models import ExportJob
+from ..resilience.policy import db_breaker, with_retry
+from ..timeutil import UTC
+
+# Job lifecycle: queued -> running -> done | failed
+JOB_STATUSES = ("queued", "running", "done", "failed")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class ExportJobManager:
+    @db_breaker
+    @with_retry()
+    def create(self, user_id: int, filters: dict, file_name: str) -> ExportJob:
+        job = ExportJob()
+        job.user_id = user_id
+        job.status = "queued"
+        # Datetime filters are stored as ISO strings; load_filters turns them back
+        job.filters = json.dumps({k: v.isoformat() if isinstance(v, datetime) else v for k, v in filters.items()})
+        job.rows_written = 0
+        job.file_name = file_name
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def load_filters(job: ExportJob) -> dict:
+        filters = json.loads(job.filters)
+        for key in ("date_from", "date_to"):
+            if filters.get(key):
+                filters[key] = datetime.fromisoformat(filters[key])
+        return filters
+
+    @db_breaker
+    def get(self, job_id: int, user_id: Optional[int] = None) -> Optional[ExportJob]:
+        """The job, or None when it does not exist or (with user_id) belongs to someone else."""
+        job = db.session.get(ExportJob, job_id)
+        if job is None or (user_id is not None and job.user_id != int(user_id)):
+            return None
+        return job
+
+    def start(self, job: ExportJob, rows_total: int):
+        job.status = "running"
+        job.rows_total = rows_total
+        db.session.commit()
+
+    def progress(self, job: ExportJob, rows_written: int):
+        job.rows_written = rows_written
+        db.session.commit()
+
+    def finish(self, job: ExportJob, ttl: float, error: Optional[str] = None):
+        """Mark the job done (or failed with error); either way it expires ttl seconds from now."""
+        now = _now()
+        job.status = "failed" if error else "done"
+        job.error = error[:255] if error else None
+        job.finished_at = now
+        job.expires_at = now + timedelta(seconds=ttl)
+        db.session.commit()
+
+    @db_breaker
+    def expired(self, stale_after: float) -> List[ExportJob]:
+        """Finished jobs past expires_at, plus unfinished ones older than stale_after seconds.
+
+        An unfinished job that old lost its worker (the process running it exited).
+        """
+        now = _now()
+        return ExportJob.query.filter(or_(
+            ExportJob.expires_at <= now,
+            and_(ExportJob.status.in_(ACTIVE_STATUSES),
+                    ExportJob.created_at <= now - timedelta(seconds=stale_after)),
+        )).all()
+
+    @db_breaker
+    def delete(self, jobs: List[ExportJob]):
+        for job in jobs:
+            db.session.delete(job)
+        db.session.commit()
@@ -2,31 +2,147 @@
 Health manager layer. Generated by Zhuang
 """
 import json
-from datetime import datetime
-from typing import List, Optional, Tuple
-from sqlalchemy import and_, or_, select
+from datetime import datetime, time
+from typing import Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, distinct, exists, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.engine import Row
 from ..extensions import db
-from ..models import HealthRecord, RecordSubject
+from ..models import (ArchivedRecordTag, HealthRecord, HealthRecordArchive, Member, RecordSubject, RecordTag,
+                      RecordTombstone, User)
 from ..resilience.policy import db_breaker, with_retry
+from ..timeutil import UTC
+from ..vitals import NORMAL, classify_bp, severity_expr
+from .rollup_manager import RollupManager, bucket_expr
+from .user_manager import UserManager
+
+
+# Rows fetched per round-trip when streaming exports
+EXPORT_CHUNK_SIZE = 1000
+# Records processed per transaction by maintenance backfills
+BACKFILL_CHUNK_SIZE = 1000
+# Records removed per transaction by bulk_delete
+DELETE_CHUNK_SIZE = 500
+# Records moved per transaction by archive_records
+ARCHIVE_CHUNK_SIZE = 1000
+
+TAG_MODES = ("any", "all")
+STAT_BUCKETS = ("day", "week", "month")
+# Matches RecordTag.tag; longer tags are indexed (and looked up) by their prefix
+TAG_MAX_LENGTH = 120
+# HealthRecord columns list endpoints may select (sparse fieldsets)
+RECORD_COLUMNS = ("id", "systolic", "diastolic", "heart_rate", "timestamp", "tags", "note")
+
+
+def _normalize_tags(tags) -> List[str]:
+    """Distinct, non-empty tag strings in first-seen order."""
+    seen = []
+    for t in tags or []:
+        t = str(t).strip()[:TAG_MAX_LENGTH] if t is not None else ""
+        if t and t not in seen:
+            seen.append(t)
+    return seen
+
+
+def _tagged_ids(index, user_id: int, tags, tag_mode: str):
+    """Ids of the user's records with the tags, resolved through a tag index (RecordTag or ArchivedRecordTag).
+
+    Uses the (user_id, tag) index; "any" = OR, "all" = record carries every tag.
+    """
+    wanted = _normalize_tags(tags)
+    q = select(index.record_id).where(index.user_id == user_id, index.tag.in_(wanted))
+    if tag_mode == "all":
+        q = q.group_by(index.record_id).having(func.count(distinct(index.tag)) == len(wanted))
+    return q
+
+
+def _covers_whole_days(date_from: Optional[datetime], date_to: Optional[datetime]) -> bool:
+    """True when the [date_from, date_to] filter selects whole UTC days, so daily rollups can answer it."""
+    starts_at_midnight = date_from is None or date_from.time() == time.min
+    ends_at_day_end = date_to is None or date_to.time() >= time(23, 59, 59)
+    return starts_at_midnight and ends_at_day_end
 
 
 class HealthManager:
+    def __init__(self):
+        self.rollups = RollupManager()
+        self.users = UserManager()
+
     @db_breaker
     @with_retry()
     def create(self, user_id: int, systolic: int, diastolic: int, heart_rate: Optional[int],
-               timestamp: datetime, tags: List[str], note: Optional[str]) -> HealthRecord:
-        rec = HealthRecord()
-        rec.user_id = user_id
-        rec.systolic = systolic
-        rec.diastolic = diastolic
-        rec.heart_rate = heart_rate
-        rec.timestamp = timestamp
-        # Generated by Zhuang: preserve non-ASCII characters for exact contains on Chinese tags
-        rec.tags = json.dumps(tags, ensure_ascii=False)
-        rec.note = note
-        db.session.add(rec)
+               timestamp: datetime, tags: List[str], note: Optional[str],
+               subject_member_id: Optional[int] = None, household_id: Optional[int] = None) -> HealthRecord:
+        """Create one record with its tag index and (optional) subject mapping in a single commit."""
+        rec_id, = self._insert_records(user_id, [{
+            "systolic": systolic,
+            "diastolic": diastolic,
+            "heart_rate": heart_rate,
+            "timestamp": timestamp,
+            "tags": tags,
+            "note": note,
+            "subject_member_id": subject_member_id,
+        }], household_id)
         db.session.commit()
-        return rec
+        return db.session.get(HealthRecord, rec_id)
+
+    @db_breaker
+    def bulk_create(self, user_id: int, items: List[dict], household_id: int) -> List[int]:
+        """Insert many validated records, their subject mappings and tag index in one transaction.
+
+        Each item carries the create() fields plus subject_member_id. Returns the new ids in input order.
+        """
+        try:
+            ids = self._insert_records(user_id, items, household_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return ids
+
+    def _insert_records(self, user_id: int, items: List[dict], household_id: Optional[int]) -> List[int]:
+        """Insert records plus RecordSubject/RecordTag rows set-based; return the new ids in input order.
+
+        The records go in as one executemany INSERT, without per-row RETURNING (SQLite/MySQL cannot batch
+        that). Every row carries its own change_seq, unique per user, so a single SELECT over the reserved
+        range maps them back to their ids. Caller owns the transaction.
+        """
+        seqs = self.users.change_seqs(user_id, len(items))
+        db.session.execute(insert(HealthRecord), [{
+            "user_id": user_id,
+            "change_seq": seq,
+            "systolic": item["systolic"],
+            "diastolic": item["diastolic"],
+            "severity": classify_bp(item["systolic"], item["diastolic"]),
+            "heart_rate": item.get("heart_rate"),
+            "timestamp": item["timestamp"],
+            # Generated by Zhuang: preserve non-ASCII characters for exact contains on Chinese tags
+            "tags": json.dumps(item.get("tags") or [], ensure_ascii=False),
+            "note": item.get("note"),
+        } for item, seq in zip(items, seqs)])
+        id_by_seq = dict(db.session.query(HealthRecord.change_seq, HealthRecord.id).
+                         filter(HealthRecord.user_id == user_id, HealthRecord.change_seq >= seqs[0],
+                                HealthRecord.change_seq <= seqs[-1]).all())
+        ids = [id_by_seq[seq] for seq in seqs]
+        subject_rows = [{
+            "record_id": rec_id,
+            "household_id": household_id,
+            "member_id": item["subject_member_id"],
+            "created_by_user_id": user_id,
+        } for rec_id, item in zip(ids, items) if item.get("subject_member_id") is not None]
+        if subject_rows:
+            db.session.execute(insert(RecordSubject), subject_rows)
+        tag_rows = [{"record_id": rec_id, "user_id": user_id, "tag": t}
+                    for rec_id, item in zip(ids, items) for t in _normalize_tags(item.get("tags"))]
+        if tag_rows:
+            db.session.execute(insert(RecordTag), tag_rows)
+        self.rollups.refresh({(item.get("subject_member_id"), item["timestamp"].date()) for item in items})
+        return ids
+
+    def _index_tags(self, rec_id: int, user_id: int, tags) -> None:
+        """Write the record_tags rows for one record (caller owns the transaction)."""
+        rows = [{"record_id": rec_id, "user_id": user_id, "tag": t} for t in _normalize_tags(tags)]
+        if rows:
+            db.session.execute(insert(RecordTag), rows)
 
     def _base_query(self, user_id: int):
         return HealthRecord.query.filter_by(user_id=user_id)
@@ -35,69 +151,552 @@ class HealthManager:
     def get(self, user_id: int, rec_id: int) -> Optional[HealthRecord]:
         return HealthRecord.query.filter_by(id=rec_id, user_id=user_id).first()
 
+    @db_breaker
+    def get_archived(self, user_id: int, rec_id: int) -> Optional[HealthRecordArchive]:
+        return HealthRecordArchive.query.filter_by(id=rec_id, user_id=user_id).first()
+
+    @db_breaker
+    def get_with_subject(self, user_id: int, rec_id: int) -> Optional[Row]:
+        """(record, subject_member_id, member_name) of one record, joined in a single query.
+
+        The record is a HealthRecord, or a HealthRecordArchive when it has been archived.
+        """
+        row = self._with_subject(HealthRecord.query.filter_by(id=rec_id, user_id=user_id)).first()
+        if row is not None or not self._archive_reached(user_id):
+            return row
+        return db.session.query(HealthRecordArchive, HealthRecordArchive.subject_member_id,
+                                Member.full_name.label("member_name")).\
+            outerjoin(Member, Member.id == HealthRecordArchive.subject_member_id).\
+            filter(HealthRecordArchive.id == rec_id, HealthRecordArchive.user_id == user_id).first()
+
+    @staticmethod
+    def _with_subject(q):
+        """Add the subject member's id and name (None for unmapped records) through the record_id index."""
+        return q.outerjoin(RecordSubject, RecordSubject.record_id == HealthRecord.id).\
+            outerjoin(Member, Member.id == RecordSubject.member_id).\
+            add_columns(RecordSubject.member_id.label("subject_member_id"), Member.full_name.label("member_name"))
+
     @db_breaker
     def count(self, user_id: int, q):
         return q.count()
 
-    @db_breaker
-    def list(self, user_id: int, page: int, size: int, tags: Optional[List[str]],
-             date_from: Optional[datetime], date_to: Optional[datetime], subject_member_id: Optional[int] = None) -> Tuple[int, List[HealthRecord]]:
+    def _filtered_query(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                        date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                        tag_mode: str = "any", abnormal_only: bool = False):
+        """Apply the shared list/export filters to the per-user base query."""
         q = self._base_query(user_id)
         if subject_member_id is not None:
             subq = select(RecordSubject.record_id).where(RecordSubject.member_id == subject_member_id)
             q = q.filter(HealthRecord.id.in_(subq))
         if tags:
-            # Generated by Zhuang: Use OR semantics and exact tag match; support both raw and \u-escaped storage
-            # per_tag_condition = OR(contains('"餐后"'), contains('"\u9910\u540e"'))
-            conditions = []
-            for t in tags:
-                raw = f'"{t}"'
-                escaped = json.dumps(t, ensure_ascii=True)  # includes surrounding quotes
-                conditions.append(or_(HealthRecord.tags.contains(raw), HealthRecord.tags.contains(escaped)))
-            if conditions:
-                q = q.filter(or_(*conditions))
+            q = q.filter(HealthRecord.id.in_(_tagged_ids(RecordTag, user_id, tags, tag_mode)))
+        if abnormal_only:
+            q = q.filter(HealthRecord.severity > NORMAL)
         if date_from:
             q = q.filter(HealthRecord.timestamp >= date_from)
         if date_to:
             q = q.filter(HealthRecord.timestamp <= date_to)
-        total = q.count()
-        items = q.order_by(HealthRecord.timestamp.desc()).offset((page - 1) * size).limit(size).all()
-        return total, items
+        return q
+
+    @classmethod
+    def _select_columns(cls, q, columns: Optional[Sequence[str]], with_subject: bool = False):
+        """Restrict q to the named RECORD_COLUMNS (rows instead of ORM objects); None keeps whole records.
+
+        with_subject adds subject_member_id and member_name to every row (all columns when none are named).
+        """
+        if with_subject:
+            return cls._with_subject(q.with_entities(*[getattr(HealthRecord, c) for c in columns or RECORD_COLUMNS]))
+        if not columns:
+            return q
+        return q.with_entities(*[getattr(HealthRecord, c) for c in columns])
 
     @db_breaker
-    def list_all(self, user_id: int, tags: Optional[List[str]],
-                 date_from: Optional[datetime], date_to: Optional[datetime], subject_member_id: Optional[int] = None) -> List[HealthRecord]:
-        """Return all records matching the filters without pagination. Generated by Zhuang"""
-        q = self._base_query(user_id)
+    def list(self, user_id: int, page: int, size: int, tags: Optional[List[str]],
+             date_from: Optional[datetime], date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+             tag_mode: str = "any", abnormal_only: bool = False,
+             columns: Optional[Sequence[str]] = None, total: Optional[int] = None,
+             with_subject: bool = False) -> Tuple[int, List[HealthRecord]]:
+        """Offset page plus the filtered total; pass a known (cached) total to skip the COUNT.
+
+        The total rides along on the page query as an uncorrelated (SELECT COUNT ...) column, so a page
+        costs one round-trip; a page past the end has no row to carry it and falls back to a plain COUNT.
+        with_subject joins in each record's subject member (see _select_columns) in the same query.
+        """
+        q = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        page_q = self._select_columns(q, columns, with_subject).\
+            order_by(HealthRecord.timestamp.desc(), HealthRecord.id.desc()).offset((page - 1) * size).limit(size)
+        if total is not None:
+            return total, page_q.all()
+        total_count = q.with_entities(func.count(HealthRecord.id)).order_by(None).scalar_subquery()
+        rows = page_q.add_columns(total_count.label("total_count")).all()
+        if not rows:
+            return q.count(), []
+        # Whole-record pages come back as (HealthRecord, total) pairs; column pages keep the extra field
+        items = rows if columns or with_subject else [row[0] for row in rows]
+        return rows[0].total_count, items
+
+    @db_breaker
+    def list_without_total(self, user_id: int, page: int, size: int, tags: Optional[List[str]],
+                           date_from: Optional[datetime], date_to: Optional[datetime],
+                           subject_member_id: Optional[int] = None, tag_mode: str = "any",
+                           abnormal_only: bool = False, columns: Optional[Sequence[str]] = None,
+                           with_subject: bool = False) -> Tuple[List[HealthRecord], bool]:
+        """Offset page without COUNT: fetches size+1 rows and returns (items, has_more)."""
+        q = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        rows = self._select_columns(q, columns, with_subject).\
+            order_by(HealthRecord.timestamp.desc(), HealthRecord.id.desc()).offset((page - 1) * size).limit(size + 1).all()
+        return rows[:size], len(rows) > size
+
+    @db_breaker
+    def list_after(self, user_id: int, size: int, after: Optional[Tuple[datetime, int]], tags: Optional[List[str]],
+                   date_from: Optional[datetime], date_to: Optional[datetime],
+                   subject_member_id: Optional[int] = None,
+                   tag_mode: str = "any", abnormal_only: bool = False,
+                   columns: Optional[Sequence[str]] = None, with_subject: bool = False
+                   ) -> Tuple[List[HealthRecord], Optional[Tuple[datetime, int]]]:
+        """Keyset page: records strictly after the (timestamp, id) key in newest-first order.
+
+        Seeks on (timestamp, id) instead of OFFSET and skips the COUNT, so deep pages cost the same
+        as the first one. Returns the page and the key to continue from (None on the last page).
+        With columns, timestamp and id are always selected as well (they form the key).
+        """
+        if columns:
+            columns = list(columns) + [c for c in ("timestamp", "id") if c not in columns]
+        q = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        if after is not None:
+            ts, rec_id = after
+            q = q.filter(or_(HealthRecord.timestamp < ts,
+                             and_(HealthRecord.timestamp == ts, HealthRecord.id < rec_id)))
+        # Fetch one extra row to learn whether another page exists
+        rows = self._select_columns(q, columns, with_subject).\
+            order_by(HealthRecord.timestamp.desc(), HealthRecord.id.desc()).limit(size + 1).all()
+        items = rows[:size]
+        next_key = (items[-1].timestamp, items[-1].id) if len(rows) > size else None
+        return items, next_key
+
+    def iter_export_rows(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                         date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                         tag_mode: str = "any", abnormal_only: bool = False, since: Optional[datetime] = None,
+                         chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Row]:
+        """Stream export rows oldest-first, chunk_size rows per fetch.
+
+        Each row carries the record columns plus the subject member's id and name (joined in the same
+        query), so memory stays flat regardless of how many records match. since keeps only records
+        strictly newer than it.
+        """
+        q = self._export_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only, since)
+        # yield_per uses a server-side cursor where the driver supports it
+        yield from q.yield_per(chunk_size)
+
+    def export_chunks(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                      date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                      tag_mode: str = "any", abnormal_only: bool = False,
+                      chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Row]]:
+        """The iter_export_rows rows in lists of chunk_size, each fetched by its own keyset query.
+
+        No cursor stays open between chunks, so the caller may commit in between (export jobs record
+        their progress that way).
+        """
+        q = self._export_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        after = None
+        while True:
+            page = q
+            if after is not None:
+                ts, rec_id = after
+                page = page.filter(or_(HealthRecord.timestamp > ts,
+                                       and_(HealthRecord.timestamp == ts, HealthRecord.id > rec_id)))
+            rows = page.limit(chunk_size).all()
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1].timestamp, rows[-1].id)
+
+    def _export_query(self, user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only,
+                      since=None):
+        """Export rows query, oldest first; archived rows are UNION ALLed in when the range reaches the archive."""
+        q = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        if since is not None:
+            q = q.filter(HealthRecord.timestamp > since)
+        q = q.outerjoin(RecordSubject, RecordSubject.record_id == HealthRecord.id).\
+            outerjoin(Member, Member.id == RecordSubject.member_id).\
+            with_entities(HealthRecord.id, RecordSubject.member_id.label("subject_member_id"),
+                          Member.full_name.label("member_name"), HealthRecord.timestamp,
+                          HealthRecord.systolic, HealthRecord.diastolic, HealthRecord.heart_rate,
+                          HealthRecord.tags, HealthRecord.note)
+        order = (HealthRecord.timestamp.asc(), HealthRecord.id.asc())
+        if not self._archive_reached(user_id, date_from, since):
+            return q.order_by(*order)
+        archived = self._archived_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only,
+                                        since).\
+            outerjoin(Member, Member.id == HealthRecordArchive.subject_member_id).\
+            with_entities(HealthRecordArchive.id, HealthRecordArchive.subject_member_id,
+                          Member.full_name.label("member_name"), HealthRecordArchive.timestamp,
+                          HealthRecordArchive.systolic, HealthRecordArchive.diastolic, HealthRecordArchive.heart_rate,
+                          HealthRecordArchive.tags, HealthRecordArchive.note)
+        return q.union_all(archived).order_by(*order)
+
+    def _archive_reached(self, user_id: int, *lower_bounds: Optional[datetime]) -> bool:
+        """Whether a read starting at the latest of lower_bounds (None = unbounded) reaches the archive."""
+        boundary = db.session.query(User.archived_before).filter(User.id == user_id).scalar()
+        if boundary is None:
+            return False
+        bounds = [b for b in lower_bounds if b is not None]
+        return not bounds or max(bounds) < boundary
+
+    def _archived_query(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                        date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                        tag_mode: str = "any", abnormal_only: bool = False, since: Optional[datetime] = None):
+        """The user's archived records under the list/export filters (see _filtered_query)."""
+        q = HealthRecordArchive.query.filter_by(user_id=user_id)
         if subject_member_id is not None:
-            subq = select(RecordSubject.record_id).where(RecordSubject.member_id == subject_member_id)
-            q = q.filter(HealthRecord.id.in_(subq))
+            q = q.filter(HealthRecordArchive.subject_member_id == subject_member_id)
         if tags:
-            # Generated by Zhuang: OR semantics; support raw and escaped forms
-            conditions = []
-            for t in tags:
-                raw = f'"{t}"'
-                escaped = json.dumps(t, ensure_ascii=True)
-                conditions.append(or_(HealthRecord.tags.contains(raw), HealthRecord.tags.contains(escaped)))
-            if conditions:
-                q = q.filter(or_(*conditions))
+            q = q.filter(HealthRecordArchive.id.in_(_tagged_ids(ArchivedRecordTag, user_id, tags, tag_mode)))
+        if abnormal_only:
+            q = q.filter(HealthRecordArchive.severity > NORMAL)
         if date_from:
-            q = q.filter(HealthRecord.timestamp >= date_from)
+            q = q.filter(HealthRecordArchive.timestamp >= date_from)
         if date_to:
-            q = q.filter(HealthRecord.timestamp <= date_to)
-        return q.order_by(HealthRecord.timestamp.asc()).all()
+            q = q.filter(HealthRecordArchive.timestamp <= date_to)
+        if since is not None:
+            q = q.filter(HealthRecordArchive.timestamp > since)
+        return q
+
+    def _vitals_source(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                       date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                       tag_mode: str = "any", abnormal_only: bool = False, with_subject: bool = False):
+        """Subquery of (id, timestamp, systolic, diastolic, heart_rate, severity) of the matching records.
+
+        Archived records are UNION ALLed in when the range reaches the archive, so aggregates and charts
+        cover the same records as exports and the daily rollups. with_subject adds subject_member_id.
+        """
+        columns = ("id", "timestamp", "systolic", "diastolic", "heart_rate", "severity")
+        live = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only).\
+            with_entities(*[getattr(HealthRecord, c) for c in columns])
+        if with_subject:
+            live = live.outerjoin(RecordSubject, RecordSubject.record_id == HealthRecord.id).\
+                add_columns(RecordSubject.member_id.label("subject_member_id"))
+        if not self._archive_reached(user_id, date_from):
+            return live.subquery("records")
+        archived = self._archived_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode,
+                                        abnormal_only).with_entities(*[getattr(HealthRecordArchive, c) for c in columns])
+        if with_subject:
+            archived = archived.add_columns(HealthRecordArchive.subject_member_id)
+        return union_all(live.statement, archived.statement).subquery("records")
+
+    @db_breaker
+    def count_matching(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                       date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                       tag_mode: str = "any", abnormal_only: bool = False) -> int:
+        """Number of records matching the list/export filters, archived ones included when the range reaches them.
+
+        Counts exactly what export_chunks streams, so export job progress adds up.
+        """
+        count = self._filtered_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode,
+                                     abnormal_only).count()
+        if self._archive_reached(user_id, date_from):
+            count += self._archived_query(user_id, tags, date_from, date_to, subject_member_id, tag_mode,
+                                          abnormal_only).count()
+        return count
+
+    @db_breaker
+    def series_points(self, user_id: int, tags: Optional[List[str]], date_from: Optional[datetime],
+                      date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+                      tag_mode: str = "any", abnormal_only: bool = False) -> List[Row]:
+        """Chart columns (id, timestamp, systolic, diastolic, heart_rate) of matching records, oldest first.
+
+        Only the plotted columns are fetched, as plain rows rather than ORM objects.
+        """
+        src = self._vitals_source(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        return db.session.query(src.c.id, src.c.timestamp, src.c.systolic, src.c.diastolic, src.c.heart_rate).\
+            order_by(src.c.timestamp.asc(), src.c.id.asc()).all()
+
+    @db_breaker
+    def stats(self, user_id: int, bucket: str, tags: Optional[List[str]], date_from: Optional[datetime],
+              date_to: Optional[datetime], subject_member_id: Optional[int] = None,
+              tag_mode: str = "any", abnormal_only: bool = False) -> List[Row]:
+        """Per-bucket count and min/max/avg of each vital, aggregated in SQL, oldest bucket first.
+
+        Queries over whole days without tag or abnormal_only filters are answered from the daily rollups
+        instead of raw records.
+        """
+        if not tags and not abnormal_only and _covers_whole_days(date_from, date_to):
+            return self.rollups.stats(user_id, bucket, date_from.date() if date_from else None,
+                                      date_to.date() if date_to else None, subject_member_id)
+        src = self._vitals_source(user_id, tags, date_from, date_to, subject_member_id, tag_mode, abnormal_only)
+        period = bucket_expr(src.c.timestamp, bucket)
+        q = db.session.query(
+            period.label("period"),
+            func.count(src.c.id).label("count"),
+            func.min(src.c.systolic).label("systolic_min"),
+            func.max(src.c.systolic).label("systolic_max"),
+            func.avg(src.c.systolic).label("systolic_avg"),
+            func.min(src.c.diastolic).label("diastolic_min"),
+            func.max(src.c.diastolic).label("diastolic_max"),
+            func.avg(src.c.diastolic).label("diastolic_avg"),
+            func.count(src.c.heart_rate).label("heart_rate_count"),
+            func.min(src.c.heart_rate).label("heart_rate_min"),
+            func.max(src.c.heart_rate).label("heart_rate_max"),
+            func.avg(src.c.heart_rate).label("heart_rate_avg"),
+        )
+        return q.group_by(period).order_by(period).all()
+
+    @db_breaker
+    def abnormal_counts(self, user_id: int, date_from: Optional[datetime], date_to: Optional[datetime],
+                        subject_member_id: Optional[int] = None) -> List[Row]:
+        """(member_id, severity, count) of the user's abnormal records, one row per member and level."""
+        src = self._vitals_source(user_id, None, date_from, date_to, subject_member_id, abnormal_only=True,
+                                  with_subject=True)
+        return db.session.query(src.c.subject_member_id.label("member_id"), src.c.severity,
+                                func.count(src.c.id).label("count")).\
+            filter(src.c.subject_member_id.isnot(None)).\
+            group_by(src.c.subject_member_id, src.c.severity).\
+            order_by(src.c.subject_member_id, src.c.severity).all()
 
     @db_breaker
     @with_retry()
     def update(self, rec: HealthRecord, **fields) -> HealthRecord:
+        vitals_changed = any(k in fields for k in ("systolic", "diastolic", "heart_rate", "timestamp"))
+        # Keys before the change, in case the record moves to another day
+        touched = self.rollups.keys_for_records([rec.id]) if vitals_changed else set()
         for k, v in fields.items():
+            if k == "tags":
+                continue
             if hasattr(rec, k):
                 setattr(rec, k, v)
+        if "systolic" in fields or "diastolic" in fields:
+            rec.severity = classify_bp(rec.systolic, rec.diastolic)
+        if "tags" in fields:
+            tags = fields["tags"] or []
+            rec.tags = json.dumps(tags, ensure_ascii=False)
+            RecordTag.query.filter_by(record_id=rec.id).delete(synchronize_session=False)
+            self._index_tags(rec.id, rec.user_id, tags)
+        if vitals_changed:
+            db.session.flush()
+            self.rollups.refresh(touched | self.rollups.keys_for_records([rec.id]))
+        rec.change_seq = self.users.touch_data_version(rec.user_id)
         db.session.commit()
         return rec
 
     @db_breaker
     @with_retry()
-    def delete(self, rec: HealthRecord):
-        db.session.delete(rec)
+    def delete(self, rec):
+        """Delete a live or archived record with its subject mapping and tag index, and refresh its day's rollup."""
+        self._delete_records(rec.user_id, [rec.id], archived=isinstance(rec, HealthRecordArchive))
+        db.session.commit()
+
+    @db_breaker
+    def bulk_delete(self, user_id: int, ids: Optional[Sequence[int]] = None, filters: Optional[dict] = None,
+                    chunk_size: int = DELETE_CHUNK_SIZE) -> int:
+        """Delete the user's records by id list or by list/export filters; return how many were deleted.
+
+        Live records first, then archived ones when the ids or the filter's range reach the archive.
+        Works in id chunks of chunk_size, one transaction each (see _delete_records). Ids that do not
+        exist or belong to another user are ignored.
+        """
+        deleted = 0
+        date_from = (filters or {}).get("date_from") if ids is None else None
+        for archived in (False, True):
+            if archived and not self._archive_reached(user_id, date_from):
+                break
+            for rec_ids in self._owned_id_chunks(user_id, ids, filters, chunk_size, archived):
+                if not rec_ids:
+                    continue
+                try:
+                    self._delete_records(user_id, rec_ids, archived)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+                deleted += len(rec_ids)
+        return deleted
+
+    def _delete_records(self, user_id: int, rec_ids: Sequence[int], archived: bool = False) -> None:
+        """Set-based deletes of the records (live or archived) with their subject mappings and tag index,
+        then a refresh of the touched daily rollups and the records' sync tombstones (caller commits).
+        """
+        if archived:
+            touched = {(member_id, ts.date()) for member_id, ts in
+                       db.session.query(HealthRecordArchive.subject_member_id, HealthRecordArchive.timestamp).
+                       filter(HealthRecordArchive.id.in_(rec_ids)).all()}
+            ArchivedRecordTag.query.filter(ArchivedRecordTag.record_id.in_(rec_ids)).delete(synchronize_session=False)
+            HealthRecordArchive.query.filter(HealthRecordArchive.id.in_(rec_ids)).delete(synchronize_session=False)
+        else:
+            touched = self.rollups.keys_for_records(rec_ids)
+            RecordSubject.query.filter(RecordSubject.record_id.in_(rec_ids)).delete(synchronize_session=False)
+            RecordTag.query.filter(RecordTag.record_id.in_(rec_ids)).delete(synchronize_session=False)
+            HealthRecord.query.filter(HealthRecord.id.in_(rec_ids)).delete(synchronize_session=False)
+        self.rollups.refresh(touched)
+        self._add_tombstones(user_id, rec_ids)
+
+    def _add_tombstones(self, user_id: int, rec_ids: Sequence[int]) -> None:
+        """Record the deletion of rec_ids for delta sync (caller owns the transaction)."""
+        db.session.execute(insert(RecordTombstone), [
+            {"user_id": user_id, "record_id": rid, "change_seq": seq}
+            for rid, seq in zip(rec_ids, self.users.change_seqs(user_id, len(rec_ids)))])
+
+    @db_breaker
+    def archive_records(self, user_id: int, cutoff: datetime, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+        """Move the user's records older than cutoff to health_records_archive; return how many moved.
+
+        One id chunk per transaction: INSERT ... SELECT into the archive (subject member folded in) and of
+        the tag index into archived_record_tags, then set-based deletes of the tag index, subject mappings
+        and records. Daily rollups are left as they
+        are; their refresh and rebuild read the archive too. users.archived_before is raised to cutoff so
+        reads know when to look in the archive. Records keep their change_seq: archiving is not a change
+        to sync. Resumable: re-running continues where it stopped.
+        """
+        archived_at = datetime.now(UTC).replace(tzinfo=None)
+        columns = ("id", "user_id", "subject_member_id", "systolic", "diastolic", "heart_rate", "timestamp",
+                   "tags", "note", "severity", "change_seq", "created_at", "archived_at")
+        moved = 0
+        while True:
+            rec_ids = [rid for (rid,) in db.session.query(HealthRecord.id).
+                       filter(HealthRecord.user_id == user_id, HealthRecord.timestamp < cutoff).
+                       order_by(HealthRecord.id.asc()).limit(chunk_size).all()]
+            if not rec_ids:
+                return moved
+            rows = select(HealthRecord.id, HealthRecord.user_id, RecordSubject.member_id, HealthRecord.systolic,
+                          HealthRecord.diastolic, HealthRecord.heart_rate, HealthRecord.timestamp, HealthRecord.tags,
+                          HealthRecord.note, HealthRecord.severity, HealthRecord.change_seq, HealthRecord.created_at,
+                          literal(archived_at)).\
+                select_from(HealthRecord).\
+                outerjoin(RecordSubject, RecordSubject.record_id == HealthRecord.id).\
+                where(HealthRecord.id.in_(rec_ids))
+            try:
+                db.session.execute(insert(HealthRecordArchive).from_select(columns, rows))
+                db.session.execute(insert(ArchivedRecordTag).from_select(
+                    ("record_id", "user_id", "tag"),
+                    select(RecordTag.record_id, RecordTag.user_id, RecordTag.tag).
+                    where(RecordTag.record_id.in_(rec_ids))))
+                RecordTag.query.filter(RecordTag.record_id.in_(rec_ids)).delete(synchronize_session=False)
+                RecordSubject.query.filter(RecordSubject.record_id.in_(rec_ids)).delete(synchronize_session=False)
+                HealthRecord.query.filter(HealthRecord.id.in_(rec_ids)).delete(synchronize_session=False)
+                User.query.filter(User.id == user_id,
+                                  or_(User.archived_before.is_(None), User.archived_before < cutoff)).\
+                    update({User.archived_before: cutoff}, synchronize_session=False)
+                # Paged lists no longer show these records
+                self.users.touch_data_version(user_id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            moved += len(rec_ids)
+
+    def _owned_id_chunks(self, user_id: int, ids: Optional[Sequence[int]], filters: Optional[dict],
+                         chunk_size: int, archived: bool = False) -> Iterator[List[int]]:
+        """Ascending chunks of the user's live (or archived) record ids: those among ids, or those matching filters."""
+        model = HealthRecordArchive if archived else HealthRecord
+        if ids is not None:
+            q = model.query.filter_by(user_id=user_id).with_entities(model.id)
+            wanted = sorted(set(ids))
+            for i in range(0, len(wanted), chunk_size):
+                yield [rid for (rid,) in q.filter(model.id.in_(wanted[i:i + chunk_size])).all()]
+            return
+        filters = {"tags": None, "date_from": None, "date_to": None, **(filters or {})}
+        query = self._archived_query if archived else self._filtered_query
+        q = query(user_id, **filters).with_entities(model.id).order_by(model.id.asc())
+        last_id = 0
+        while True:
+            chunk = [rid for (rid,) in q.filter(model.id > last_id).limit(chunk_size).all()]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
+
+    def backfill_tags(self, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+        """Rebuild record_tags (and archived_record_tags) from the records' tags column, one id-range chunk per commit.
+
+        Idempotent: each chunk's index rows are replaced, so the command can simply be re-run.
+        Returns the number of records processed.
+        """
+        return sum(self._backfill_tag_index(model, index, chunk_size)
+                   for model, index in ((HealthRecord, RecordTag), (HealthRecordArchive, ArchivedRecordTag)))
+
+    def _backfill_tag_index(self, model, index, chunk_size: int) -> int:
+        last_id = 0
+        processed = 0
+        while True:
+            chunk = db.session.query(model.id, model.user_id, model.tags).\
+                filter(model.id > last_id).order_by(model.id.asc()).limit(chunk_size).all()
+            if not chunk:
+                return processed
+            ids = [rid for rid, _, _ in chunk]
+            index.query.filter(index.record_id.in_(ids)).delete(synchronize_session=False)
+            rows = []
+            for rid, uid, raw in chunk:
+                try:
+                    tags = json.loads(raw) if raw else []
+                except ValueError:
+                    tags = []
+                if isinstance(tags, list):
+                    rows.extend({"record_id": rid, "user_id": uid, "tag": t} for t in _normalize_tags(tags))
+            if rows:
+                db.session.execute(insert(index), rows)
+            # Tag-filtered results can change for these users
+            for uid in {uid for _, uid, _ in chunk}:
+                self.users.touch_data_version(uid)
+            db.session.commit()
+            processed += len(chunk)
+            last_id = ids[-1]
+
+    def backfill_severity(self, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+        """Classify records whose severity is still NULL, one set-based UPDATE per id-range chunk.
+
+        Resumable: classified rows are skipped on re-run. Returns the number of records updated.
+        """
+        last_id = 0
+        updated = 0
+        while True:
+            chunk = db.session.query(HealthRecord.id, HealthRecord.user_id).\
+                filter(HealthRecord.id > last_id, HealthRecord.severity.is_(None)).\
+                order_by(HealthRecord.id.asc()).limit(chunk_size).all()
+            if not chunk:
+                return updated
+            ids = [rid for rid, _ in chunk]
+            HealthRecord.query.filter(HealthRecord.id >= ids[0], HealthRecord.id <= ids[-1],
+                                      HealthRecord.severity.is_(None)).\
+                update({HealthRecord.severity: severity_expr(HealthRecord.systolic, HealthRecord.diastolic)},
+                       synchronize_session=False)
+            # abnormal_only results change for these users
+            for uid in {uid for _, uid in chunk}:
+                self.users.touch_data_version(uid)
+            db.session.commit()
+            updated += len(ids)
+            last_id = ids[-1]
+
+    def backfill_subjects(self, user: User, member_id: int, household_id: int,
+                          chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+        """Map the user's unmapped legacy records to member_id, one bulk insert + commit per chunk.
+
+        Chunks walk the id range, so an interrupted run resumes where it stopped. Sets
+        user.record_subjects_backfilled when done so request paths can skip the anti-join.
+        Returns the number of records mapped.
+        """
+        last_id = 0
+        mapped = 0
+        while True:
+            chunk = db.session.query(HealthRecord.id, HealthRecord.timestamp).\
+                filter(HealthRecord.user_id == user.id, HealthRecord.id > last_id).\
+                filter(~exists().where(RecordSubject.record_id == HealthRecord.id)).\
+                order_by(HealthRecord.id.asc()).limit(chunk_size).all()
+            if not chunk:
+                break
+            ids = [rid for rid, _ in chunk]
+            db.session.execute(insert(RecordSubject), [{
+                "record_id": rid,
+                "household_id": household_id,
+                "member_id": member_id,
+                "created_by_user_id": user.id,
+            } for rid in ids])
+            self.rollups.refresh({(member_id, ts.date()) for _, ts in chunk})
+            # The records gained a subject, which sync clients see
+            db.session.execute(update(HealthRecord), [
+                {"id": rid, "change_seq": seq} for rid, seq in zip(ids, self.users.change_seqs(user.id, len(ids)))])
+            db.session.commit()
+            mapped += len(ids)
+            last_id = ids[-1]
+        user.record_subjects_backfilled = True
         db.session.commit()
+        return mapped
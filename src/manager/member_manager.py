@@ -6,9 +6,30 @@ from sqlalchemy import and_
 from ..extensions import db
 from ..models import Household, Member
 from ..resilience.policy import db_breaker, with_retry
+from .user_manager import UserManager
 
 
 class MemberManager:
+    def __init__(self):
+        self.users = UserManager()
+
+    def _owner_id(self, member: Member) -> Optional[int]:
+        hh = db.session.get(Household, member.household_id)
+        return hh.owner_user_id if hh is not None else None
+
+    def _touch_owner(self, member: Member):
+        # Member names show up in record exports, so member edits invalidate the owner's record ETags;
+        # the new data_version is also the member's delta-sync sequence number
+        owner_id = self._owner_id(member)
+        if owner_id is not None:
+            member.change_seq = self.users.touch_data_version(owner_id)
+
+    def _invalidate_owner(self, member: Member):
+        # After commit, so no worker can re-cache the old member list under the new generation
+        owner_id = self._owner_id(member)
+        if owner_id is not None:
+            self.users.invalidate_cache(owner_id)
+
     @db_breaker
     @with_retry()
     def ensure_default_household(self, owner_user_id: int) -> Household:
@@ -25,6 +46,7 @@ class MemberManager:
         m.household_id = hh.id
         m.full_name = "Self"
         m.status = "active"
+        m.change_seq = self.users.touch_data_version(owner_user_id)
         db.session.add(m)
         db.session.commit()
         return hh
@@ -64,8 +86,10 @@ class MemberManager:
         m.height = height
         m.weight = weight
         m.status = "active"
+        m.change_seq = self.users.touch_data_version(owner_user_id)
         db.session.add(m)
         db.session.commit()
+        self.users.invalidate_cache(owner_user_id)
         return m
 
     @db_breaker
@@ -74,14 +98,18 @@ class MemberManager:
         for k, v in fields.items():
             if hasattr(member, k):
                 setattr(member, k, v)
+        self._touch_owner(member)
         db.session.commit()
+        self._invalidate_owner(member)
         return member
 
     @db_breaker
     @with_retry()
     def soft_delete_member(self, member: Member):
         member.status = "inactive"
+        self._touch_owner(member)
         db.session.commit()
+        self._invalidate_owner(member)
 
     @db_breaker
     def get_or_create_self_member(self, owner_user_id: int) -> Member:
@@ -93,6 +121,8 @@ class MemberManager:
         m.household_id = hh.id
         m.full_name = "Self"
         m.status = "active"
+        m.change_seq = self.users.touch_data_version(owner_user_id)
         db.session.add(m)
         db.session.commit()
+        self.users.invalidate_cache(owner_user_id)
         return m
@@ -0,0 +1,194 @@
+"""
+Daily rollup manager: per-member, per-UTC-day aggregates kept in step with health record writes.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Float, Integer, cast, func, insert, select, union_all
+from sqlalchemy.engine import Row
+from ..extensions import db
+from ..models import HealthDailyRollup, HealthRecord, HealthRecordArchive, RecordSubject
+from ..resilience.policy import db_breaker
+
+# (member_id, UTC day) identifies one rollup row
+RollupKey = Tuple[int, date]
+
+
+def bucket_expr(column, bucket: str):
+    """SQL expression for the start date of the day/week (Monday)/month containing column.
+
+    Timestamps are stored as naive UTC, so buckets are UTC calendar periods.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        if bucket == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        if bucket == "month":
+            return func.strftime("%Y-%m-01", column)
+        return func.date(column)
+    if dialect in ("mysql", "mariadb"):
+        if bucket == "week":
+            return func.subdate(func.date(column), func.weekday(column))
+        if bucket == "month":
+            return func.date_format(column, "%Y-%m-01")
+        return func.date(column)
+    # PostgreSQL and others with date_trunc
+    return func.date(func.date_trunc(bucket, column))
+
+
+def _as_date(value) -> date:
+    # SQLite returns DATE() results as 'YYYY-MM-DD' strings
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def _raw_vitals(user_id: Optional[int] = None, member_id: Optional[int] = None,
+                start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Subquery of (member_id, user_id, timestamp, vitals) over live and archived records.
+
+    Archived records still count towards their days, so refreshes and rebuilds read both tables; the
+    filters are applied inside each branch so both use their own indexes.
+    """
+    branches = []
+    for table, member_col in ((HealthRecord, RecordSubject.member_id),
+                              (HealthRecordArchive, HealthRecordArchive.subject_member_id)):
+        q = select(member_col.label("member_id"), table.user_id, table.timestamp, table.systolic,
+                   table.diastolic, table.heart_rate)
+        if table is HealthRecord:
+            q = q.join(RecordSubject, RecordSubject.record_id == HealthRecord.id)
+        else:
+            q = q.where(member_col.isnot(None))
+        if user_id is not None:
+            q = q.where(table.user_id == user_id)
+        if member_id is not None:
+            q = q.where(member_col == member_id)
+        if start is not None:
+            q = q.where(table.timestamp >= start)
+        if end is not None:
+            q = q.where(table.timestamp < end)
+        branches.append(q)
+    return union_all(*branches).subquery("vitals")
+
+
+def _raw_aggregates(src):
+    """Columns of one rollup row, aggregated from the raw records of src (see _raw_vitals)."""
+    return [
+        func.count().label("count"),
+        func.sum(src.c.systolic).label("systolic_sum"),
+        func.min(src.c.systolic).label("systolic_min"),
+        func.max(src.c.systolic).label("systolic_max"),
+        func.sum(src.c.diastolic).label("diastolic_sum"),
+        func.min(src.c.diastolic).label("diastolic_min"),
+        func.max(src.c.diastolic).label("diastolic_max"),
+        func.count(src.c.heart_rate).label("heart_rate_count"),
+        func.coalesce(func.sum(src.c.heart_rate), 0).label("heart_rate_sum"),
+        func.min(src.c.heart_rate).label("heart_rate_min"),
+        func.max(src.c.heart_rate).label("heart_rate_max"),
+    ]
+
+
+_ROLLUP_FIELDS = ("count", "systolic_sum", "systolic_min", "systolic_max", "diastolic_sum", "diastolic_min",
+                  "diastolic_max", "heart_rate_count", "heart_rate_sum", "heart_rate_min", "heart_rate_max")
+
+
+def _rollup_row(member_id: int, row: Row) -> dict:
+    values = {f: getattr(row, f) for f in _ROLLUP_FIELDS}
+    values.update(member_id=member_id, day=_as_date(row.day), user_id=row.user_id)
+    return values
+
+
+class RollupManager:
+    def keys_for_records(self, record_ids: Iterable[int]) -> Set[RollupKey]:
+        """Rollup keys touched by the given (still existing) records."""
+        ids = list(record_ids)
+        if not ids:
+            return set()
+        rows = db.session.query(RecordSubject.member_id, HealthRecord.timestamp).\
+            join(HealthRecord, HealthRecord.id == RecordSubject.record_id).\
+            filter(RecordSubject.record_id.in_(ids)).all()
+        return {(member_id, ts.date()) for member_id, ts in rows}
+
+    def refresh(self, keys: Iterable[RollupKey]) -> None:
+        """Recompute the rollup rows for keys from raw records (caller owns the transaction).
+
+        Re-aggregating a whole day keeps min/max exact after updates and deletes; one grouped
+        query per member covers all of its touched days.
+        """
+        days_by_member = defaultdict(set)
+        for member_id, day in keys:
+            if member_id is not None:
+                days_by_member[member_id].add(day)
+        for member_id, days in days_by_member.items():
+            HealthDailyRollup.query.filter(HealthDailyRollup.member_id == member_id,
+                                           HealthDailyRollup.day.in_(days)).delete(synchronize_session=False)
+            start = datetime.combine(min(days), time.min)
+            end = datetime.combine(max(days) + timedelta(days=1), time.min)
+            src = _raw_vitals(member_id=member_id, start=start, end=end)
+            day_expr = bucket_expr(src.c.timestamp, "day")
+            rows = db.session.query(day_expr.label("day"), src.c.user_id, *_raw_aggregates(src)).\
+                group_by(day_expr, src.c.user_id).all()
+            values = [_rollup_row(member_id, r) for r in rows if _as_date(r.day) in days]
+            if values:
+                db.session.execute(insert(HealthDailyRollup), values)
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """Recreate rollups from raw records for one user (or everyone), one commit per user.
+
+        Returns the number of rollup rows written.
+        """
+        if user_id is None:
+            HealthDailyRollup.query.delete(synchronize_session=False)
+            db.session.commit()
+            user_ids = [uid for (uid,) in db.session.query(HealthRecord.user_id).
+                        union(db.session.query(HealthRecordArchive.user_id)).all()]
+        else:
+            user_ids = [user_id]
+        written = 0
+        for uid in user_ids:
+            HealthDailyRollup.query.filter_by(user_id=uid).delete(synchronize_session=False)
+            src = _raw_vitals(user_id=uid)
+            day_expr = bucket_expr(src.c.timestamp, "day")
+            rows = db.session.query(src.c.member_id, day_expr.label("day"), src.c.user_id,
+                                    *_raw_aggregates(src)).\
+                group_by(src.c.member_id, day_expr, src.c.user_id).all()
+            values = [_rollup_row(r.member_id, r) for r in rows]
+            if values:
+                db.session.execute(insert(HealthDailyRollup), values)
+            db.session.commit()
+            written += len(values)
+        return written
+
+    @db_breaker
+    def stats(self, user_id: int, bucket: str, date_from: Optional[date], date_to: Optional[date],
+              subject_member_id: Optional[int] = None) -> List[Row]:
+        """Same shape as HealthManager.stats, read from rollups for whole UTC days [date_from, date_to]."""
+        period = bucket_expr(HealthDailyRollup.day, bucket)
+        q = HealthDailyRollup.query.filter_by(user_id=user_id)
+        if subject_member_id is not None:
+            q = q.filter(HealthDailyRollup.member_id == subject_member_id)
+        if date_from:
+            q = q.filter(HealthDailyRollup.day >= date_from)
+        if date_to:
+            q = q.filter(HealthDailyRollup.day <= date_to)
+
+        def avg(total, n):
+            return cast(func.sum(total), Float) / func.nullif(func.sum(n), 0)
+
+        q = q.with_entities(
+            period.label("period"),
+            cast(func.sum(HealthDailyRollup.count), Integer).label("count"),
+            func.min(HealthDailyRollup.systolic_min).label("systolic_min"),
+            func.max(HealthDailyRollup.systolic_max).label("systolic_max"),
+            avg(HealthDailyRollup.systolic_sum, HealthDailyRollup.count).label("systolic_avg"),
+            func.min(HealthDailyRollup.diastolic_min).label("diastolic_min"),
+            func.max(HealthDailyRollup.diastolic_max).label("diastolic_max"),
+            avg(HealthDailyRollup.diastolic_sum, HealthDailyRollup.count).label("diastolic_avg"),
+            cast(func.sum(HealthDailyRollup.heart_rate_count), Integer).label("heart_rate_count"),
+            func.min(HealthDailyRollup.heart_rate_min).label("heart_rate_min"),
+            func.max(HealthDailyRollup.heart_rate_max).label("heart_rate_max"),
+            avg(HealthDailyRollup.heart_rate_sum, HealthDailyRollup.heart_rate_count).label("heart_rate_avg"),
+        )
+        return q.group_by(period).order_by(period).all()
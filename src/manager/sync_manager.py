@@ -0,0 +1,102 @@
+"""
+Sync manager: a user's record and member changes after a checkpoint, for offline-capable clients.
+
+Every write stamps the rows it changes with sequence numbers taken from the owner's data_version
+(UserManager.change_seqs), one per row; deleted records leave a RecordTombstone carrying theirs.
+A client keeps the last sequence number it has seen and asks for everything after it.
+"""
+from typing import Iterable, List, Tuple
+from sqlalchemy import update
+from ..extensions import db
+from ..models import HealthRecord, HealthRecordArchive, Household, Member, RecordSubject, RecordTombstone
+from ..resilience.policy import db_breaker
+from .user_manager import UserManager
+
+# Rows sequenced per transaction by sequence_legacy_rows
+SEQUENCE_CHUNK_SIZE = 1000
+
+# Change kinds in a batch: a created/updated record or member, or a deleted record
+CHANGE_KINDS = ("record", "member", "deleted_record")
+
+
+class SyncManager:
+    def __init__(self):
+        self.users = UserManager()
+
+    @db_breaker
+    def changes(self, user_id: int, since: int, limit: int) -> Tuple[List[Tuple[int, str, object]], int, bool]:
+        """The user's first limit changes with change_seq > since, oldest first.
+
+        Returns (changes, next_since, has_more); changes are (change_seq, kind, row) triples with kind
+        from CHANGE_KINDS. Sequence numbers are unique per user, so a batch never splits a change and
+        next_since (the last one returned, or the user's data_version once caught up) is an exact
+        checkpoint. Reads stop at the data_version read first: every number up to it is committed, so a
+        checkpoint can never pass a row that commits later with a smaller number.
+        """
+        head = self.users.get_data_version(user_id) or 0
+        if since >= head:
+            return [], head, False
+        streams = (
+            ("record", self._record_rows(HealthRecord, user_id, since, head, limit)),
+            ("record", self._record_rows(HealthRecordArchive, user_id, since, head, limit)),
+            ("member", self._members(user_id).filter(Member.change_seq > since, Member.change_seq <= head).
+             order_by(Member.change_seq.asc()).limit(limit + 1).all()),
+            ("deleted_record", RecordTombstone.query.
+             filter(RecordTombstone.user_id == user_id, RecordTombstone.change_seq > since,
+                    RecordTombstone.change_seq <= head).
+             order_by(RecordTombstone.change_seq.asc()).limit(limit + 1).all()),
+        )
+        # Each stream holds its own first limit + 1 changes, so the merged first limit + 1 are exact
+        merged = sorted(((row.change_seq, kind, row) for kind, rows in streams for row in rows),
+                        key=lambda change: change[0])[:limit + 1]
+        if len(merged) > limit:
+            return merged[:limit], merged[limit - 1][0], True
+        return merged, head, False
+
+    @staticmethod
+    def _record_rows(model, user_id: int, since: int, head: int, limit: int) -> list:
+        """Live (HealthRecord) or archived (HealthRecordArchive) records in the change window, with subject."""
+        archived = model is HealthRecordArchive
+        subject = HealthRecordArchive.subject_member_id if archived else RecordSubject.member_id
+        q = db.session.query(model.id, model.change_seq, model.timestamp, model.systolic, model.diastolic,
+                             model.heart_rate, model.tags, model.note, subject.label("subject_member_id"))
+        if not archived:
+            q = q.outerjoin(RecordSubject, RecordSubject.record_id == HealthRecord.id)
+        return q.filter(model.user_id == user_id, model.change_seq > since, model.change_seq <= head).\
+            order_by(model.change_seq.asc()).limit(limit + 1).all()
+
+    @staticmethod
+    def _members(user_id: int):
+        return Member.query.join(Household, Household.id == Member.household_id).\
+            filter(Household.owner_user_id == user_id)
+
+    def sequence_legacy_rows(self, user_id: int, chunk_size: int = SEQUENCE_CHUNK_SIZE) -> int:
+        """Give the user's rows written before delta sync (change_seq 0) a sequence number; return how many.
+
+        A full sync (since=0) runs this first, so it can page through them like any other change.
+        One chunk per transaction; resumable.
+        """
+        sequenced = 0
+        for model, ids in (
+                (HealthRecord, db.session.query(HealthRecord.id).filter(HealthRecord.user_id == user_id)),
+                (HealthRecordArchive, db.session.query(HealthRecordArchive.id).
+                 filter(HealthRecordArchive.user_id == user_id)),
+                (Member, self._members(user_id).with_entities(Member.id))):
+            for chunk in self._unsequenced_chunks(ids.filter(model.change_seq == 0).order_by(model.id.asc()),
+                                                  model, chunk_size):
+                db.session.execute(update(model), [
+                    {"id": row_id, "change_seq": seq}
+                    for row_id, seq in zip(chunk, self.users.change_seqs(user_id, len(chunk)))])
+                db.session.commit()
+                sequenced += len(chunk)
+        return sequenced
+
+    @staticmethod
+    def _unsequenced_chunks(q, model, chunk_size: int) -> Iterable[List[int]]:
+        last_id = 0
+        while True:
+            chunk = [row_id for (row_id,) in q.filter(model.id > last_id).limit(chunk_size).all()]
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1]
@@ -9,6 +9,7 @@ from sqlalchemy import func
 from datetime import datetime
 from ..timeutil import UTC
 from ..security import hash_password
+from ..cache import app_cache
 
 
 class UserManager:
@@ -22,6 +23,8 @@ class UserManager:
         user.age = age
         user.gender = gender
         user.weight = weight
+        # New accounts have no unmapped legacy records to backfill
+        user.record_subjects_backfilled = True
         db.session.add(user)
         try:
             db.session.commit()
@@ -47,18 +50,59 @@ class UserManager:
             if v is not None and hasattr(user, k):
                 setattr(user, k, v)
         db.session.commit()
+        # Profile fields feed the Self member in member lists
+        self.invalidate_cache(user.id)
         return user
 
     def bump_token_version(self, user: User):
         user.token_version += 1
         db.session.commit()
 
+    def touch_data_version(self, user_id: int, changes: int = 1) -> int:
+        """Atomically bump the user's data_version by changes and return the new value (caller owns the transaction).
+
+        Also invalidates the user's cached record pages; their keys include data_version, so a page
+        cached by a concurrent reader before this transaction commits is never served afterwards.
+        """
+        User.query.filter_by(id=user_id).update({User.data_version: User.data_version + changes},
+                                                synchronize_session=False)
+        self.invalidate_cache(user_id)
+        return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
+    def change_seqs(self, user_id: int, count: int) -> range:
+        """Reserve count delta-sync sequence numbers for rows changed in this transaction.
+
+        They are the data_version values the bump skips over, one per row. The UPDATE keeps the user row
+        locked until commit, so a user's sequence numbers are committed in the order they are handed out.
+        """
+        last = self.touch_data_version(user_id, count)
+        return range(last - count + 1, last + 1)
+
+    def invalidate_cache(self, user_id: int):
+        """Drop everything cached for the user (in every worker when the cache backend is shared)."""
+        cache = app_cache()
+        if cache is not None:
+            cache.invalidate_owner(int(user_id))
+
+    def must_change_password(self, user_id: int) -> Optional[bool]:
+        """The user's must_change_password flag (None for unknown users).
+
+        Read from the DB on every call, never cached: a reset in one worker must bind every worker at once.
+        Only the one column is selected, by primary key.
+        """
+        flag = db.session.query(User.must_change_password).filter(User.id == user_id).scalar()
+        return None if flag is None else bool(flag)
+
+    def get_data_version(self, user_id: int) -> Optional[int]:
+        return db.session.query(User.data_version).filter(User.id == user_id).scalar()
+
     def set_password(self, user: User, new_password: str, force_change_next_login: bool = False):
         user.password_hash = hash_password(new_password)
         user.must_change_password = bool(force_change_next_login)
         # Invalidate existing refresh tokens
         user.token_version += 1
         db.session.commit()
+        self.invalidate_cache(user.id)
 
     def set_role(self, user: User, role: str):
         user.role = role
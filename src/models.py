@@ -28,17 +28,29 @@ class Member(db.Model):
     height = db.Column(db.Float)
     weight = db.Column(db.Float)
     status = db.Column(db.String(16), default="active", nullable=False)  # active/inactive
+    # Owner's data_version when the member last changed (delta sync); 0 = not yet sequenced
+    change_seq = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
 
+    __table_args__ = (
+        db.Index("ix_members_household_change_seq", "household_id", "change_seq"),
+    )
+
 
 class RecordSubject(db.Model):
     __tablename__ = "record_subjects"
     id = db.Column(db.Integer, primary_key=True)
-    record_id = db.Column(db.Integer, db.ForeignKey("health_records.id"), nullable=False, index=True)
+    # One subject per record; the unique index also serves record -> member lookups
+    record_id = db.Column(db.Integer, db.ForeignKey("health_records.id"), nullable=False, index=True, unique=True)
     household_id = db.Column(db.Integer, db.ForeignKey("households.id"), nullable=False)
-    member_id = db.Column(db.Integer, db.ForeignKey("members.id"), nullable=False, index=True)
+    member_id = db.Column(db.Integer, db.ForeignKey("members.id"), nullable=False)
     created_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
+
+    __table_args__ = (
+        # Covers the member filter subquery: SELECT record_id ... WHERE member_id = ?
+        db.Index("ix_record_subjects_member_record", "member_id", "record_id"),
+    )
 # Generated by Zhuang: End Family models
 
 
@@ -56,8 +68,15 @@ class User(db.Model):
     gender = db.Column(db.String(16))
     weight = db.Column(db.Float)
     token_version = db.Column(db.Integer, default=0, nullable=False)
+    # Bumped on every change to the user's records or members; drives ETags on record reads and is the
+    # change sequence of delta sync (changed rows are stamped with it, see UserManager.change_seqs)
+    data_version = db.Column(db.Integer, default=0, nullable=False)
     # Track last successful login for admin visibility
     last_login_at = db.Column(db.DateTime)
+    # Set once every legacy record of this user has a RecordSubject mapping (see HealthManager.backfill_subjects)
+    record_subjects_backfilled = db.Column(db.Boolean, default=False, nullable=False)
+    # Records older than this were moved to health_records_archive (`flask archive-records`); NULL = none
+    archived_before = db.Column(db.DateTime, nullable=True)
     # Store timezone-aware UTC datetimes; ensure consistent serialization
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=False)
@@ -75,4 +94,129 @@ class HealthRecord(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False)
     tags = db.Column(db.Text)  # store as JSON string
     note = db.Column(db.Text)
+    # Blood pressure category (src/vitals.py), set on write; NULL only for rows not yet backfilled
+    severity = db.Column(db.SmallInteger, nullable=True)
+    # Owner's data_version when the record last changed (delta sync); 0 = not yet sequenced
+    change_seq = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
+
+    __table_args__ = (
+        # Serves the per-user filter, the time-range filter and the (timestamp, id) sort/seek
+        db.Index("ix_health_records_user_ts_id", "user_id", "timestamp", "id"),
+        # Abnormal-only lists and counts
+        db.Index("ix_health_records_user_severity_ts", "user_id", "severity", "timestamp"),
+        # Delta sync: the user's records changed after a checkpoint
+        db.Index("ix_health_records_user_change_seq", "user_id", "change_seq"),
+        # Ids stay unique across health_records_archive: SQLite would otherwise reuse the archived ones
+        {"sqlite_autoincrement": True},
+    )
+
+
+class HealthRecordArchive(db.Model):
+    """Cold health records moved out of health_records by `flask archive-records`.
+
+    Rows keep their original id and carry their subject member inline (no RecordSubject row); their tag
+    index moves to archived_record_tags. Daily rollups keep counting them.
+    """
+    __tablename__ = "health_records_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    subject_member_id = db.Column(db.Integer, db.ForeignKey("members.id"), nullable=True)
+    systolic = db.Column(db.Integer, nullable=False)
+    diastolic = db.Column(db.Integer, nullable=False)
+    heart_rate = db.Column(db.Integer, nullable=True)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    tags = db.Column(db.Text)  # JSON string, as on HealthRecord
+    note = db.Column(db.Text)
+    severity = db.Column(db.SmallInteger, nullable=True)
+    change_seq = db.Column(db.Integer, default=0, nullable=False)  # carried over from the live record
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_health_records_archive_user_ts_id", "user_id", "timestamp", "id"),
+        db.Index("ix_health_records_archive_user_change_seq", "user_id", "change_seq"),
+        # Rollup refreshes re-aggregate a member's day
+        db.Index("ix_health_records_archive_member_ts", "subject_member_id", "timestamp"),
+    )
+
+
+class RecordTombstone(db.Model):
+    """A deleted health record, kept so delta sync can tell clients to drop it."""
+    __tablename__ = "record_tombstones"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)  # no FK: the record row is gone
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_record_tombstones_user_change_seq", "user_id", "change_seq"),
+    )
+
+
+class RecordTag(db.Model):
+    """Normalized tag index for health records (HealthRecord.tags stays the display source)."""
+    __tablename__ = "record_tags"
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer, db.ForeignKey("health_records.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    tag = db.Column(db.String(120), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_record_tags_user_tag", "user_id", "tag", "record_id"),
+    )
+
+
+class ArchivedRecordTag(db.Model):
+    """Tag index of archived records, moved over from record_tags by `flask archive-records`."""
+    __tablename__ = "archived_record_tags"
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer, db.ForeignKey("health_records_archive.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    tag = db.Column(db.String(120), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_archived_record_tags_user_tag", "user_id", "tag", "record_id"),
+    )
+
+
+class HealthDailyRollup(db.Model):
+    """Per-member, per-UTC-day aggregates of health records, maintained with every record write."""
+    __tablename__ = "health_daily_rollups"
+    member_id = db.Column(db.Integer, db.ForeignKey("members.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    systolic_sum = db.Column(db.Integer, nullable=False, default=0)
+    systolic_min = db.Column(db.Integer)
+    systolic_max = db.Column(db.Integer)
+    diastolic_sum = db.Column(db.Integer, nullable=False, default=0)
+    diastolic_min = db.Column(db.Integer)
+    diastolic_max = db.Column(db.Integer)
+    # heart_rate is optional per record, so it carries its own count
+    heart_rate_count = db.Column(db.Integer, nullable=False, default=0)
+    heart_rate_sum = db.Column(db.Integer, nullable=False, default=0)
+    heart_rate_min = db.Column(db.Integer)
+    heart_rate_max = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.Index("ix_health_daily_rollups_user_day", "user_id", "day"),
+    )
+
+
+class ExportJob(db.Model):
+    """A background CSV export (src/exports.py); the gzip artifact lives under instance/exports."""
+    __tablename__ = "export_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default="queued")  # queued/running/done/failed
+    filters = db.Column(db.Text, nullable=False)  # export_csv filter kwargs as JSON
+    rows_total = db.Column(db.Integer)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+    file_name = db.Column(db.String(255))  # download name shown to the user
+    error = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), nullable=False)
+    finished_at = db.Column(db.DateTime)
+    # Artifact and row are garbage-collected after this (set when the job finishes)
+    expires_at = db.Column(db.DateTime, index=True)
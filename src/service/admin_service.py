@@ -1,11 +1,11 @@
 """
 Admin service endpoints: user list, role management, password reset.
 """
-from ..timeutil import UTC
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from ..manager.user_manager import UserManager
 from ..utils import error
+from ..cache import app_cache
 from ..security import validate_password_strength, generate_temp_password
 
 
@@ -34,8 +34,9 @@ def list_users():
             "id": u.id,
             "username": u.username,
             "email": u.email,
-            "created_at": (u.created_at if u.created_at.tzinfo else u.created_at.replace(tzinfo=UTC)).isoformat().replace("+00:00", "Z"),
-            "last_login_at": ((u.last_login_at if u.last_login_at and u.last_login_at.tzinfo else (u.last_login_at.replace(tzinfo=UTC) if u.last_login_at else None)).isoformat().replace("+00:00", "Z") if u.last_login_at else None),
+            # Serialized as UTC "...Z" by the app's JSON provider
+            "created_at": u.created_at,
+            "last_login_at": u.last_login_at,
             "role": u.role,
         })
     return jsonify({"items": items, "total": len(items)}), 200
@@ -88,3 +89,13 @@ def admin_reset_password(user_id: int):
         "message": "Password reset; user must change password on next login",
         "temp_password": temp_password,
     }), 200
+
+
+@admin_bp.route("/cache-stats", methods=["GET"])
+@jwt_required()
+def cache_stats():
+    """Backend, size and this worker's hit/miss counters per cache namespace."""
+    if not _require_role("ADMIN"):
+        return jsonify(error("403", "Forbidden")), 403
+    cache = app_cache()
+    return jsonify({"cache": cache.stats() if cache is not None else None}), 200
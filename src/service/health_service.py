@@ -2,22 +2,48 @@
 Health service endpoints. Generated by Zhuang
 """
 import json
+import os
+import zlib
 from datetime import datetime
 from ..timeutil import UTC
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, send_file, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import and_, select
-from io import StringIO
+from io import StringIO, TextIOWrapper
 from urllib.parse import quote
 import csv
-from ..manager.health_manager import HealthManager
+from ..manager.health_manager import HealthManager, EXPORT_CHUNK_SIZE, RECORD_COLUMNS, STAT_BUCKETS, TAG_MODES
 from ..manager.member_manager import MemberManager
-from ..models import RecordSubject, Member
-from ..utils import get_pagination_params, make_pagination, error
+from ..manager.user_manager import UserManager
+from ..downsample import lttb_indices
+from ..vitals import SEVERITY_LABELS, is_abnormal
+from ..cache import app_cache
+from ..exports import CSV_COLUMNS, csv_row, export_jobs
+from ..manager.export_job_manager import ExportJobManager
+from ..utils import get_pagination_params, make_pagination, error, encode_cursor, decode_cursor
 
 health_bp = Blueprint("health", __name__)
+# Upper bound for POST /batch; larger syncs should be split by the client
+MAX_BATCH_RECORDS = 2000
+# POST /bulk-delete: most ids per request, and the filter keys it accepts (same meaning as list_records)
+MAX_BULK_DELETE_IDS = 10000
+BULK_DELETE_FILTERS = ("subject_member_id", "date_from", "date_to", "tags", "tag_mode", "abnormal_only")
+# CSV import: rows inserted per transaction, and how many row errors are echoed back
+IMPORT_CHUNK_SIZE = 500
+MAX_IMPORT_ERRORS = 100
+# Subject member fields of list and detail responses, joined in with the record (no per-row lookups)
+SUBJECT_FIELDS = ("subject_member_id", "member_name")
+# Fields list_records can return (?fields=)
+LIST_FIELDS = RECORD_COLUMNS + SUBJECT_FIELDS
+LIST_FORMATS = ("rows", "columnar")
+# Chart series: default and maximum number of points returned by /series
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+# Import requires the export_csv columns (CSV_COLUMNS) a record cannot do without
+IMPORT_REQUIRED_COLUMNS = {"timestamp", "systolic", "diastolic"}
 manager = HealthManager()
 member_mgr = MemberManager()
+user_mgr = UserManager()
+job_mgr = ExportJobManager()
 
 
 def _parse_int(value):
@@ -71,6 +97,113 @@ def _format_timestamp(value: datetime) -> str:
     return utc_dt.isoformat().replace("+00:00", "Z")
 
 
+def _parse_tag_params(args=None):
+    """Read `tags` (comma separated) and `tag_mode` (any|all) from the query string (or args).
+
+    Return (tag_list, tag_mode); raise ValueError on an unknown tag_mode.
+    """
+    args = request.args if args is None else args
+    tags_q = args.get("tags")
+    tag_list = None
+    if tags_q:
+        tag_list = [x.strip() for x in tags_q.split(",") if x.strip()]
+    tag_mode = (args.get("tag_mode") or "any").lower()
+    if tag_mode not in TAG_MODES:
+        raise ValueError("invalid tag_mode")
+    return tag_list, tag_mode
+
+
+def _ensure_subjects_backfilled(user_id, self_member):
+    """Map legacy unmapped records to Self once per user; a no-op after the user is marked done."""
+    user = user_mgr.get_user(user_id)
+    if user is None or user.record_subjects_backfilled:
+        return
+    hh = member_mgr.ensure_default_household(user_id)
+    manager.backfill_subjects(user, member_id=self_member.id, household_id=hh.id)
+
+
+def _data_etag(user_id, version: int) -> str:
+    """Weak ETag for a record read: the user's data_version plus a digest of the app version and URL.
+
+    data_version is bumped on every record/member write, so a matching tag means the body is unchanged.
+    """
+    digest = zlib.crc32(f"{current_app.config.get('VERSION')}|{request.full_path}".encode("utf-8"))
+    return f"u{user_id}.v{version}.{digest:08x}"
+
+
+def _not_modified(etag: str):
+    """304 response when the client's If-None-Match already holds etag, else None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _with_etag(Response(status=304), etag)
+
+
+def _with_etag(resp: Response, etag: str) -> Response:
+    resp.set_etag(etag, weak=True)
+    # Per-user data: only private caches may store it, and they must revalidate every time
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Authorization")
+    return resp
+
+
+def _parse_record_filters(user_id, args=None):
+    """Parse the filters shared by list/export/stats from the query string (or the args mapping).
+
+    Return (filters, member, error_response): filters are HealthManager filter kwargs, member is the
+    validated subject member (or None), error_response is set instead when the input is invalid.
+    Also makes sure the user's legacy records are mapped to Self before any member filter runs.
+    """
+    args = request.args if args is None else args
+    try:
+        tag_list, tag_mode = _parse_tag_params(args)
+    except ValueError:
+        return None, None, (jsonify(error("400", "Invalid tag_mode")), 400)
+
+    date_from = args.get("date_from")
+    date_to = args.get("date_to")
+    df = None
+    dt = None
+    if date_from:
+        try:
+            df = _as_db_datetime(_parse_iso_datetime(date_from))
+        except (TypeError, ValueError):
+            return None, None, (jsonify(error("400", "Invalid date_from")), 400)
+    if date_to:
+        try:
+            dt = _as_db_datetime(_parse_iso_datetime(date_to))
+        except (TypeError, ValueError):
+            return None, None, (jsonify(error("400", "Invalid date_to")), 400)
+
+    abnormal_only = (args.get("abnormal_only") or "").lower()
+    if abnormal_only not in ("", "0", "false", "1", "true"):
+        return None, None, (jsonify(error("400", "Invalid abnormal_only")), 400)
+
+    # Filter by member if provided
+    subject_member_id = args.get("subject_member_id")
+    # Generated by Zhuang: always resolve self_member for potential lazy backfill
+    self_member = member_mgr.get_or_create_self_member(user_id)
+    member = None
+    if subject_member_id is not None:
+        try:
+            subject_member_id = int(subject_member_id)
+        except (TypeError, ValueError):
+            return None, None, (jsonify(error("400", "Invalid subject_member_id")), 400)
+        # Validate membership
+        member = member_mgr.get_member(user_id, subject_member_id)
+        if not member:
+            return None, None, (jsonify(error("404", "Member not found")), 404)
+    # Legacy records without a mapping belong to Self
+    _ensure_subjects_backfilled(user_id, self_member)
+    return {
+        "tags": tag_list,
+        "tag_mode": tag_mode,
+        "date_from": df,
+        "date_to": dt,
+        "subject_member_id": subject_member_id,
+        "abnormal_only": abnormal_only in ("1", "true"),
+    }, member, None
+
+
 def _validate_health_record_payload(data, for_update=False, current=None):
     """Validate payload for create/update. Return (clean, errors)."""
     errors = {}
@@ -133,6 +266,44 @@ def _validate_health_record_payload(data, for_update=False, current=None):
     return clean, errors
 
 
+def _validate_new_record_item(data, member_ids, default_member_id, now):
+    """Validate one batch item with create_record semantics. Return (item, errors)."""
+    if not isinstance(data, dict):
+        return None, {"_schema": ["must be an object"]}
+    clean, errors = _validate_health_record_payload(data, for_update=False)
+    ts = now
+    ts_raw = data.get("timestamp")
+    if ts_raw:
+        try:
+            ts = _as_db_datetime(_parse_iso_datetime(ts_raw))
+        except (TypeError, ValueError):
+            errors.setdefault("timestamp", []).append("invalid format")
+    tags = data.get("tags") or []
+    if not isinstance(tags, list):
+        errors.setdefault("tags", []).append("must be a list")
+    member_id = data.get("subject_member_id")
+    if member_id is None:
+        member_id = default_member_id
+    else:
+        try:
+            member_id = int(member_id)
+            if member_id not in member_ids:
+                errors.setdefault("subject_member_id", []).append("member not found")
+        except (TypeError, ValueError):
+            errors.setdefault("subject_member_id", []).append("must be an integer")
+    if errors:
+        return None, errors
+    return {
+        "systolic": clean["systolic"],
+        "diastolic": clean["diastolic"],
+        "heart_rate": clean.get("heart_rate"),
+        "timestamp": ts,
+        "tags": tags,
+        "note": data.get("note"),
+        "subject_member_id": member_id,
+    }, {}
+
+
 @health_bp.route("", methods=["POST"])
 @jwt_required()
 def create_record():
@@ -174,18 +345,10 @@ def create_record():
         m = member_mgr.get_or_create_self_member(user_id)
         subject_member_id = m.id
 
+    # Record, tag index and subject link are written in one transaction
     rec = manager.create(user_id=user_id, systolic=systolic, diastolic=diastolic, heart_rate=heart_rate,
-                         timestamp=ts, tags=tags, note=note)
-    # Link record to subject
-    rs = RecordSubject()
-    hh = member_mgr.ensure_default_household(user_id)
-    rs.record_id = rec.id
-    rs.household_id = hh.id
-    rs.member_id = subject_member_id
-    rs.created_by_user_id = user_id
-    from ..extensions import db
-    db.session.add(rs)
-    db.session.commit()
+                         timestamp=ts, tags=tags, note=note, subject_member_id=subject_member_id,
+                         household_id=m.household_id)
     return jsonify({
         "id": rec.id,
         "systolic": rec.systolic,
@@ -199,207 +362,151 @@ def create_record():
     }), 201
 
 
-@health_bp.route("", methods=["GET"])
+@health_bp.route("/batch", methods=["POST"])
 @jwt_required()
-def list_records():
+def create_records_batch():
+    """Create up to MAX_BATCH_RECORDS records in one transaction; all-or-nothing with per-item errors."""
     user_id = get_jwt_identity()
-    page, size = get_pagination_params()
-    # Build filters
-    tags_q = request.args.get("tags")
-    tag_list = None
-    if tags_q:
-        tag_list = [x.strip() for x in tags_q.split(",") if x.strip()]
-
-    date_from = request.args.get("date_from")
-    date_to = request.args.get("date_to")
-    df = None
-    dt = None
-    if date_from:
-        try:
-            df = _as_db_datetime(_parse_iso_datetime(date_from))
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid date_from")), 400
-    if date_to:
-        try:
-            dt = _as_db_datetime(_parse_iso_datetime(date_to))
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid date_to")), 400
+    data = request.get_json(force=True) or {}
+    items = data.get("records") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify(error("400", "Validation error", details={"records": ["must be a non-empty list"]})), 400
+    if len(items) > MAX_BATCH_RECORDS:
+        return jsonify(error("400", "Validation error",
+                             details={"records": [f"at most {MAX_BATCH_RECORDS} items per batch"]})), 400
 
-    # Filter by member if provided
-    subject_member_id = request.args.get("subject_member_id")
-    # Generated by Zhuang: always resolve self_member for potential lazy backfill
     self_member = member_mgr.get_or_create_self_member(user_id)
-    if subject_member_id is not None:
-        try:
-            subject_member_id = int(subject_member_id)
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid subject_member_id")), 400
-        # Validate membership
-        m = member_mgr.get_member(user_id, subject_member_id)
-        if not m:
-            return jsonify(error("404", "Member not found")), 404
-        # Generated by Zhuang: if explicitly filtering by Self, still perform lazy backfill
-        if m.id == self_member.id:
-            from ..models import HealthRecord
-            from ..extensions import db
-            subq = select(RecordSubject.record_id)
-            unmapped = db.session.query(HealthRecord.id).\
-                filter(HealthRecord.user_id == user_id).\
-                filter(~HealthRecord.id.in_(subq)).all()
-            if unmapped:
-                hh = member_mgr.ensure_default_household(user_id)
-                for (rid,) in unmapped:
-                    rs = RecordSubject()
-                    rs.record_id = rid
-                    rs.household_id = hh.id
-                    rs.member_id = self_member.id
-                    rs.created_by_user_id = user_id
-                    db.session.add(rs)
-                db.session.commit()
-    else:
-        # Backfill legacy records to Self for this user lazily to ensure Self can see data
-        # If no subject_member_id specified, do not filter, but ensure mappings exist for future Self queries
-        from ..models import HealthRecord
-        from ..extensions import db
-        # Find records without mapping
-        subq = select(RecordSubject.record_id)
-        unmapped = db.session.query(HealthRecord.id).filter(HealthRecord.user_id == user_id).filter(
-            ~HealthRecord.id.in_(subq)
-        ).all()
-        if unmapped:
-            hh = member_mgr.ensure_default_household(user_id)
-            for (rid,) in unmapped:
-                rs = RecordSubject()
-                rs.record_id = rid
-                rs.household_id = hh.id
-                rs.member_id = self_member.id
-                rs.created_by_user_id = user_id
-                db.session.add(rs)
-            db.session.commit()
-
-    total, items = manager.list(user_id=user_id, page=page, size=size, tags=tag_list, date_from=df, date_to=dt,
-                                subject_member_id=subject_member_id)
-    # Optionally include subject_member_id by querying mapping
-    # To keep it lightweight, include only when a single member filter is active
-    include_subject = subject_member_id is not None
-    data = [{
-        "id": r.id,
-        "systolic": r.systolic,
-        "diastolic": r.diastolic,
-        "heart_rate": r.heart_rate,
-        "timestamp": _format_timestamp(r.timestamp),
-        "tags": json.loads(r.tags) if r.tags else [],
-        "note": r.note,
-        **({"subject_member_id": subject_member_id} if include_subject else {}),
-    } for r in items]
-    return jsonify({"records": data, "pagination": make_pagination(page, size, total)}), 200
+    member_ids = {m.id for m in member_mgr.list_members(user_id)}
+    now = _as_db_datetime(datetime.now(UTC))
+    clean_items = []
+    item_errors = []
+    for index, item in enumerate(items):
+        clean, errors = _validate_new_record_item(item, member_ids, self_member.id, now)
+        if errors:
+            item_errors.append({"index": index, "errors": errors})
+        else:
+            clean_items.append(clean)
+    if item_errors:
+        return jsonify(error("400", "Validation error", details={"items": item_errors})), 400
+
+    ids = manager.bulk_create(user_id, clean_items, household_id=self_member.household_id)
+    return jsonify({"created": len(ids), "ids": ids}), 201
+
+
+def _parse_list_shape():
+    """Parse ?fields= and ?format= for list_records. Return (fields, fmt, error_response).
+
+    fields is None when the client did not ask for a sparse fieldset.
+    """
+    fmt = (request.args.get("format") or "rows").lower()
+    if fmt not in LIST_FORMATS:
+        return None, None, (jsonify(error("400", "Invalid format", details={"format": list(LIST_FORMATS)})), 400)
+    raw = request.args.get("fields")
+    if raw is None:
+        return None, fmt, None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in LIST_FIELDS]
+    if not fields or unknown:
+        return None, None, (jsonify(error("400", "Invalid fields",
+                                          details={"unknown": unknown, "allowed": list(LIST_FIELDS)})), 400)
+    return fields, fmt, None
+
+
+def _record_field(r, field: str):
+    # Datetimes are left to the app's JSON provider, which writes them as UTC "...Z"
+    if field == "tags":
+        return json.loads(r.tags) if r.tags else []
+    return getattr(r, field)
+
+
+def _filter_signature(filters: dict) -> tuple:
+    """Hashable, order-independent form of the record filters."""
+    return (
+        tuple(sorted(filters["tags"] or ())), filters["tag_mode"],
+        filters["date_from"].isoformat() if filters["date_from"] else None,
+        filters["date_to"].isoformat() if filters["date_to"] else None,
+        filters["subject_member_id"], filters["abnormal_only"],
+    )
 
 
-@health_bp.route("/export", methods=["GET"])
-@jwt_required()
-def export_csv():
-    """Export health records as CSV. Filters: subject_member_id, date_from, date_to, tags. Generated by Zhuang"""
-    user_id = get_jwt_identity()
-    # Reuse parsing from list_records
-    tags_q = request.args.get("tags")
-    tag_list = None
-    if tags_q:
-        tag_list = [x.strip() for x in tags_q.split(",") if x.strip()]
+def _list_cache_key(user_id, version: int, filters: dict, position: tuple, fields, fmt: str) -> tuple:
+    """Record list cache key: user, data_version, normalized filters, page position and response shape."""
+    return (int(user_id), version, position, tuple(fields) if fields else None, fmt) + _filter_signature(filters)
 
-    date_from = request.args.get("date_from")
-    date_to = request.args.get("date_to")
-    df = None
-    dt = None
-    if date_from:
-        try:
-            df = _as_db_datetime(_parse_iso_datetime(date_from))
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid date_from")), 400
-    if date_to:
-        try:
-            dt = _as_db_datetime(_parse_iso_datetime(date_to))
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid date_to")), 400
 
-    subject_member_id = request.args.get("subject_member_id")
-    self_member = member_mgr.get_or_create_self_member(user_id)
-    selected_member = None  # Generated by Zhuang
-    if subject_member_id is not None:
+@health_bp.route("", methods=["GET"])
+@jwt_required()
+def list_records():
+    user_id = get_jwt_identity()
+    page, size = get_pagination_params()
+    # Keyset mode: any `cursor` param (empty for the first page) switches from page/size offsets
+    cursor = request.args.get("cursor")
+    after = None
+    if cursor:
         try:
-            subject_member_id = int(subject_member_id)
-        except (TypeError, ValueError):
-            return jsonify(error("400", "Invalid subject_member_id")), 400
-        m = member_mgr.get_member(user_id, subject_member_id)
-        if not m:
-            return jsonify(error("404", "Member not found")), 404
-        selected_member = m
-        # If exporting Self, ensure backfill so legacy records are included
-        if m.id == self_member.id:
-            from ..models import HealthRecord
-            from ..extensions import db
-            subq = select(RecordSubject.record_id)
-            unmapped = db.session.query(HealthRecord.id).\
-                filter(HealthRecord.user_id == user_id).\
-                filter(~HealthRecord.id.in_(subq)).all()
-            if unmapped:
-                hh = member_mgr.ensure_default_household(user_id)
-                for (rid,) in unmapped:
-                    rs = RecordSubject()
-                    rs.record_id = rid
-                    rs.household_id = hh.id
-                    rs.member_id = self_member.id
-                    rs.created_by_user_id = user_id
-                    db.session.add(rs)
-                db.session.commit()
+            after = decode_cursor(cursor)
+        except ValueError:
+            return jsonify(error("400", "Invalid cursor")), 400
+    # ?total=false skips the COUNT and reports has_more instead of total/pages
+    want_total = (request.args.get("total") or "true").lower()
+    if want_total not in ("true", "1", "false", "0"):
+        return jsonify(error("400", "Invalid total")), 400
+    want_total = want_total in ("true", "1")
+    fields, fmt, err = _parse_list_shape()
+    if err:
+        return err
+    filters, _, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    version = user_mgr.get_data_version(user_id)
+    etag = _data_etag(user_id, version)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    cache = app_cache()
+    position = ("cursor", cursor, size) if cursor is not None else ("page", page, size, want_total)
+    cache_key = _list_cache_key(user_id, version, filters, position, fields, fmt)
+    payload = cache.get("record-list", cache_key, owner=int(user_id)) if cache is not None else None
+    if payload is not None:
+        return _with_etag(jsonify(payload), etag), 200
+
+    if fields is None:
+        # Default shape: every record column plus its subject member
+        fields = list(LIST_FIELDS)
+    # Only the requested columns are selected in SQL; subject fields join the member into the same query
+    columns = [f for f in fields if f in RECORD_COLUMNS]
+    with_subject = any(f in SUBJECT_FIELDS for f in fields)
+    if cursor is not None:
+        items, next_key = manager.list_after(user_id=user_id, size=size, after=after, columns=columns,
+                                             with_subject=with_subject, **filters)
+        pagination = {"size": size, "next_cursor": encode_cursor(*next_key) if next_key else None,
+                      "has_more": next_key is not None}
+    elif not want_total:
+        items, has_more = manager.list_without_total(user_id=user_id, page=page, size=size, columns=columns,
+                                                     with_subject=with_subject, **filters)
+        pagination = {"page": page, "size": size, "has_more": has_more}
     else:
-        # No filter means export all records for user; also perform backfill for Self in case client later filters
-        from ..models import HealthRecord
-        from ..extensions import db
-        subq = select(RecordSubject.record_id)
-        unmapped = db.session.query(HealthRecord.id).\
-            filter(HealthRecord.user_id == user_id).\
-            filter(~HealthRecord.id.in_(subq)).all()
-        if unmapped:
-            hh = member_mgr.ensure_default_household(user_id)
-            for (rid,) in unmapped:
-                rs = RecordSubject()
-                rs.record_id = rid
-                rs.household_id = hh.id
-                rs.member_id = self_member.id
-                rs.created_by_user_id = user_id
-                db.session.add(rs)
-            db.session.commit()
-
-    # Fetch all records according to filter
-    items = manager.list_all(user_id=user_id, tags=tag_list, date_from=df, date_to=dt, subject_member_id=subject_member_id)
-
-    # Generated by Zhuang: build record_id -> member_name map for CSV output
-    from ..extensions import db
-    rec_ids = [r.id for r in items]
-    name_map = {}
-    if rec_ids:
-        rows = db.session.query(RecordSubject.record_id, Member.full_name).\
-            join(Member, Member.id == RecordSubject.member_id).\
-            filter(RecordSubject.record_id.in_(rec_ids)).all()
-        for rid, full_name in rows:
-            name_map[rid] = full_name
-
-    # Prepare CSV
-    buf = StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(["id", "member_name", "timestamp", "systolic", "diastolic", "heart_rate", "tags", "note"])
-    for r in items:
-        tags = json.loads(r.tags) if r.tags else []
-        writer.writerow([
-            r.id,
-            name_map.get(r.id, (selected_member.full_name if selected_member else "")),
-            _format_timestamp(r.timestamp),
-            r.systolic,
-            r.diastolic,
-            r.heart_rate if r.heart_rate is not None else "",
-            ";".join(tags),
-            (r.note or '').replace('\n', ' ').strip(),
-        ])
+        # Totals are cached per filter signature, so paging through one result set counts once
+        total_key = (version,) + _filter_signature(filters)
+        total = cache.get("record-total", total_key, owner=int(user_id)) if cache is not None else None
+        counted, items = manager.list(user_id=user_id, page=page, size=size, columns=columns, total=total,
+                                      with_subject=with_subject, **filters)
+        if total is None and cache is not None:
+            cache.set("record-total", total_key, counted, owner=int(user_id))
+        pagination = make_pagination(page, size, counted)
+        pagination["has_more"] = page * size < counted
+    if fmt == "columnar":
+        data = {f: [_record_field(r, f) for r in items] for f in fields}
+    else:
+        data = [{f: _record_field(r, f) for f in fields} for r in items]
+    payload = {"records": data, "pagination": pagination}
+    if cache is not None:
+        cache.set("record-list", cache_key, payload, owner=int(user_id))
+    return _with_etag(jsonify(payload), etag), 200
+
+
+def _export_filenames(selected_member, df, dt):
+    """(UTF-8 display name, ASCII fallback) of an export, with member name and optional date range."""
     # Build a meaningful filename including member name and optional date range; provide ASCII fallback and UTF-8 filename* for proper display
     if selected_member is not None:
         member_display = (selected_member.full_name or f"member-{selected_member.id}").strip()
@@ -423,18 +530,325 @@ def export_csv():
 
     filename_utf8 = f"health_records_{member_display}{date_suffix}.csv"
     ascii_fallback = f"health_records_{ascii_member}{date_suffix}.csv"
-    # Prepend BOM to help Excel properly recognize UTF-8 for Chinese characters
-    csv_data = '\ufeff' + buf.getvalue()
+    return filename_utf8, ascii_fallback
 
-    from flask import Response
-    return Response(
-        csv_data,
+
+@health_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_csv():
+    """Export health records as CSV. Filters: subject_member_id, date_from, date_to, tags. Generated by Zhuang"""
+    user_id = get_jwt_identity()
+    # Reuse parsing from list_records
+    filters, selected_member, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    version = user_mgr.get_data_version(user_id)
+    etag = _data_etag(user_id, version)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    df, dt = filters["date_from"], filters["date_to"]
+
+    # Stream rows straight from the DB cursor; member names come from the same query
+    rows = manager.iter_export_rows(user_id=user_id, **filters)
+    fallback_name = selected_member.full_name if selected_member else ""
+
+    def generate():
+        buf = StringIO()
+        writer = csv.writer(buf)
+        # Prepend BOM to help Excel properly recognize UTF-8 for Chinese characters
+        buf.write('\ufeff')
+        writer.writerow(CSV_COLUMNS)
+        for n, r in enumerate(rows, 1):
+            writer.writerow(csv_row(r, fallback_name))
+            if n % EXPORT_CHUNK_SIZE == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate(0)
+        yield buf.getvalue()
+
+    filename_utf8, ascii_fallback = _export_filenames(selected_member, df, dt)
+    return _with_etag(Response(
+        stream_with_context(generate()),
         mimetype='text/csv; charset=utf-8',
         headers={
             # RFC 5987 for UTF-8 filename
             'Content-Disposition': f"attachment; filename=\"{ascii_fallback}\"; filename*=UTF-8''{quote(filename_utf8)}"
         }
-    )
+    ), etag)
+
+
+def _export_job_json(job):
+    done = job.status == "done"
+    return {
+        "id": job.id,
+        "status": job.status,
+        "progress": {
+            "rows_written": job.rows_written,
+            "rows_total": job.rows_total,
+            "percent": round(100 * job.rows_written / job.rows_total, 1) if job.rows_total else (100.0 if done else 0.0),
+        },
+        "file_name": job.file_name,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+        "download_url": url_for("health.download_export_job", job_id=job.id) if done else None,
+    }
+
+
+@health_bp.route("/export-jobs", methods=["POST"])
+@jwt_required()
+def create_export_job():
+    """Queue a background CSV export (filters: same as export_csv, in the query string).
+
+    Returns 202 with the job; poll GET /export-jobs/<id> until status is done, then fetch download_url.
+    """
+    user_id = get_jwt_identity()
+    filters, selected_member, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    runner = export_jobs()
+    # Expired artifacts are collected opportunistically (also: `flask gc-export-jobs`)
+    runner.gc()
+    if not runner.try_reserve():
+        resp = jsonify(error("503", "Too many exports in progress, retry later"))
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+    try:
+        filename_utf8, _ = _export_filenames(selected_member, filters["date_from"], filters["date_to"])
+        job = job_mgr.create(int(user_id), filters, filename_utf8 + ".gz")
+    except Exception:
+        runner.release()
+        raise
+    runner.submit(job.id)
+    resp = jsonify(_export_job_json(job))
+    resp.headers["Location"] = url_for("health.get_export_job", job_id=job.id)
+    return resp, 202
+
+
+@health_bp.route("/export-jobs/<int:job_id>", methods=["GET"])
+@jwt_required()
+def get_export_job(job_id: int):
+    job = job_mgr.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify(error("404", "Export job not found")), 404
+    return jsonify(_export_job_json(job)), 200
+
+
+@health_bp.route("/export-jobs/<int:job_id>/download", methods=["GET"])
+@jwt_required()
+def download_export_job(job_id: int):
+    """The finished export as a gzip-compressed CSV attachment."""
+    job = job_mgr.get(job_id, user_id=get_jwt_identity())
+    if job is None:
+        return jsonify(error("404", "Export job not found")), 404
+    if job.status != "done":
+        return jsonify(error("409", "Export is not finished", details={"status": job.status})), 409
+    path = export_jobs().artifact_path(job.id)
+    if not os.path.exists(path):
+        return jsonify(error("404", "Export file expired")), 404
+    return send_file(path, mimetype="application/gzip", as_attachment=True, download_name=job.file_name)
+
+
+@health_bp.route("/stream", methods=["GET"])
+@jwt_required()
+def stream_records():
+    """Full record history as JSON Lines (application/x-ndjson), oldest first, one record per line.
+
+    Filters: same as list_records, plus `since` (only records newer than that timestamp). Rows come
+    from a server-side cursor and are written as they are read, so the response has no size limit.
+    """
+    user_id = get_jwt_identity()
+    since = request.args.get("since")
+    if since:
+        try:
+            since = _as_db_datetime(_parse_iso_datetime(since))
+        except (TypeError, ValueError):
+            return jsonify(error("400", "Invalid since")), 400
+    filters, _, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    rows = manager.iter_export_rows(user_id=user_id, since=since or None, **filters)
+    dumps = current_app.json.dumps
+
+    def generate():
+        lines = []
+        for r in rows:
+            lines.append(dumps({
+                "id": r.id,
+                "timestamp": r.timestamp,
+                "systolic": r.systolic,
+                "diastolic": r.diastolic,
+                "heart_rate": r.heart_rate,
+                "tags": json.loads(r.tags) if r.tags else [],
+                "note": r.note,
+                "subject_member_id": r.subject_member_id,
+                "member_name": r.member_name,
+            }))
+            if len(lines) == EXPORT_CHUNK_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    # Compressed chunk by chunk by the compression middleware when the client accepts it
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@health_bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_csv():
+    """Import records from a CSV in the export_csv format (multipart `file` or a raw text/csv body).
+
+    Rows are parsed and validated as they stream in and inserted IMPORT_CHUNK_SIZE per transaction;
+    invalid rows are skipped and reported by line number. The `id` column is ignored.
+    """
+    user_id = get_jwt_identity()
+    upload = request.files.get("file")
+    stream = upload.stream if upload is not None else request.stream
+    # utf-8-sig drops the BOM that export_csv writes for Excel
+    reader = csv.DictReader(TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        header = {(name or "").strip() for name in (reader.fieldnames or [])}
+    except UnicodeDecodeError:
+        return jsonify(error("400", "CSV must be UTF-8 encoded")), 400
+    missing = sorted(IMPORT_REQUIRED_COLUMNS - header)
+    if missing:
+        return jsonify(error("400", "Invalid CSV header", details={"missing_columns": missing})), 400
+
+    self_member = member_mgr.get_or_create_self_member(user_id)
+    members_by_name = {}
+    for m in member_mgr.list_members(user_id):
+        members_by_name.setdefault((m.full_name or "").strip(), m.id)
+    members_by_name.update({"": self_member.id, "Self": self_member.id, "自己": self_member.id})
+    member_ids = set(members_by_name.values())
+    now = _as_db_datetime(datetime.now(UTC))
+
+    imported = 0
+    skipped = 0
+    row_errors = []
+    chunk = []
+    try:
+        # Header is line 1, so data rows start at line 2
+        for line_no, row in enumerate(reader, 2):
+            row = {(k or "").strip(): (v or "").strip() if isinstance(v, str) else v for k, v in row.items()}
+            member_name = row.get("member_name") or ""
+            payload = {
+                "systolic": row.get("systolic"),
+                "diastolic": row.get("diastolic"),
+                "heart_rate": row.get("heart_rate"),
+                "timestamp": row.get("timestamp"),
+                "tags": [t.strip() for t in (row.get("tags") or "").split(";") if t.strip()],
+                "note": row.get("note") or None,
+                "subject_member_id": members_by_name.get(member_name, -1),
+            }
+            errors = {}
+            if not payload["timestamp"]:
+                errors["timestamp"] = ["required"]
+            clean, item_errors = _validate_new_record_item(payload, member_ids, self_member.id, now)
+            errors.update(item_errors)
+            if "subject_member_id" in errors:
+                errors["member_name"] = errors.pop("subject_member_id")
+            if errors:
+                skipped += 1
+                if len(row_errors) < MAX_IMPORT_ERRORS:
+                    row_errors.append({"line": line_no, "errors": errors})
+                continue
+            chunk.append(clean)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                imported += len(manager.bulk_create(user_id, chunk, household_id=self_member.household_id))
+                chunk = []
+    except (UnicodeDecodeError, csv.Error):
+        # Rows before the bad chunk are already committed; report how far the import got
+        return jsonify(error("400", "Malformed CSV", details={"imported": imported, "skipped": skipped})), 400
+    if chunk:
+        imported += len(manager.bulk_create(user_id, chunk, household_id=self_member.household_id))
+    return jsonify({
+        "imported": imported,
+        "skipped": skipped,
+        "errors": row_errors,
+        "errors_truncated": skipped > len(row_errors),
+    }), 200
+
+
+def _round_avg(value):
+    # AVG comes back as float (SQLite) or Decimal (MySQL)
+    return round(float(value), 1) if value is not None else None
+
+
+@health_bp.route("/stats", methods=["GET"])
+@jwt_required()
+def record_stats():
+    """Per day/week/month min/max/avg/count of each vital. Filters: same as list_records."""
+    user_id = get_jwt_identity()
+    bucket = (request.args.get("bucket") or "day").lower()
+    if bucket not in STAT_BUCKETS:
+        return jsonify(error("400", "Invalid bucket", details={"bucket": list(STAT_BUCKETS)})), 400
+    filters, _, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    rows = manager.stats(user_id=user_id, bucket=bucket, **filters)
+    stats = [{
+        "period": str(r.period),
+        "count": r.count,
+        "systolic": {"min": r.systolic_min, "max": r.systolic_max, "avg": _round_avg(r.systolic_avg)},
+        "diastolic": {"min": r.diastolic_min, "max": r.diastolic_max, "avg": _round_avg(r.diastolic_avg)},
+        "heart_rate": {"count": r.heart_rate_count, "min": r.heart_rate_min, "max": r.heart_rate_max,
+                       "avg": _round_avg(r.heart_rate_avg)},
+    } for r in rows]
+    return jsonify({"bucket": bucket, "stats": stats}), 200
+
+
+@health_bp.route("/abnormal/count", methods=["GET"])
+@jwt_required()
+def abnormal_count():
+    """Abnormal readings per member, broken down by severity. Filters: subject_member_id, date_from, date_to."""
+    user_id = get_jwt_identity()
+    filters, _, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    rows = manager.abnormal_counts(user_id, filters["date_from"], filters["date_to"], filters["subject_member_id"])
+    members = {}
+    for member_id, severity, count in rows:
+        entry = members.setdefault(member_id, {"member_id": member_id, "abnormal": 0, "by_severity": {}})
+        entry["abnormal"] += count
+        entry["by_severity"][SEVERITY_LABELS[severity]] = count
+    return jsonify({"members": list(members.values())}), 200
+
+
+@health_bp.route("/series", methods=["GET"])
+@jwt_required()
+def record_series():
+    """Chart series downsampled to at most `points` readings (LTTB), keeping abnormal readings visible.
+
+    Filters: same as list_records. The first and last readings are always included.
+    """
+    user_id = get_jwt_identity()
+    try:
+        points = _parse_int(request.args.get("points", DEFAULT_SERIES_POINTS))
+    except (TypeError, ValueError):
+        points = None
+    if points is None or points < 3 or points > MAX_SERIES_POINTS:
+        return jsonify(error("400", "Invalid points", details={"min": 3, "max": MAX_SERIES_POINTS})), 400
+    filters, _, err = _parse_record_filters(user_id)
+    if err:
+        return err
+    rows = manager.series_points(user_id=user_id, **filters)
+    total = len(rows)
+    if total > points:
+        x = [r.timestamp.replace(tzinfo=UTC).timestamp() for r in rows]
+        ys = ([r.systolic for r in rows], [r.diastolic for r in rows])
+        keep = [is_abnormal(r.systolic, r.diastolic) for r in rows]
+        rows = [rows[i] for i in lttb_indices(x, ys, points, keep=keep)]
+    data = [{
+        "id": r.id,
+        "timestamp": _format_timestamp(r.timestamp),
+        "systolic": r.systolic,
+        "diastolic": r.diastolic,
+        "heart_rate": r.heart_rate,
+    } for r in rows]
+    return jsonify({"series": data, "total": total, "downsampled": total > points}), 200
 
 
 # Generated by Zhuang: Allow CORS preflight to pass with 2xx by handling OPTIONS without JWT
@@ -447,19 +861,28 @@ def export_csv_options():
 @jwt_required()
 def get_record(rec_id: int):
     user_id = get_jwt_identity()
-    rec = manager.get(user_id=user_id, rec_id=rec_id)
-    if not rec:
+    version = user_mgr.get_data_version(user_id)
+    etag = _data_etag(user_id, version)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    row = manager.get_with_subject(user_id=user_id, rec_id=rec_id)
+    if not row:
         return jsonify(error("404", "Record not found")), 404
-    return jsonify({
+    # A live or an archived record
+    rec = row[0]
+    return _with_etag(jsonify({
         "id": rec.id,
         "systolic": rec.systolic,
         "diastolic": rec.diastolic,
         "heart_rate": rec.heart_rate,
-        "timestamp": _format_timestamp(rec.timestamp),
+        "timestamp": rec.timestamp,
         "tags": json.loads(rec.tags) if rec.tags else [],
         "note": rec.note,
-        "created_at": _format_timestamp(rec.created_at),
-    }), 200
+        "created_at": rec.created_at,
+        "subject_member_id": row.subject_member_id,
+        "member_name": row.member_name,
+    }), etag), 200
 
 
 @health_bp.route("/<int:rec_id>", methods=["PUT"])
@@ -474,17 +897,15 @@ def update_record(rec_id: int):
     if errors:
         return jsonify(error("400", "Validation error", details=errors)), 400
     # apply updates
-    for k in ("systolic", "diastolic", "heart_rate"):
-        if k in clean:
-            setattr(rec, k, clean[k])
+    updates = {k: clean[k] for k in ("systolic", "diastolic", "heart_rate") if k in clean}
     if "tags" in data:
         tags = data.get("tags") or []
         if not isinstance(tags, list):
             return jsonify(error("400", "Validation error", details={"tags": ["must be a list"]})), 400
-        rec.tags = json.dumps(tags, ensure_ascii=False)
+        updates["tags"] = tags
     if "note" in data:
-        rec.note = data.get("note")
-    manager.update(rec)
+        updates["note"] = data.get("note")
+    manager.update(rec, **updates)
     return jsonify({
         "id": rec.id,
         "systolic": rec.systolic,
@@ -501,11 +922,60 @@ def update_record(rec_id: int):
 @jwt_required()
 def delete_record(rec_id: int):
     user_id = get_jwt_identity()
-    rec = manager.get(user_id=user_id, rec_id=rec_id)
+    rec = manager.get(user_id=user_id, rec_id=rec_id) or manager.get_archived(user_id=user_id, rec_id=rec_id)
     if not rec:
         return jsonify(error("404", "Record not found")), 404
-    # Clean up mapping
-    from ..extensions import db
-    RecordSubject.query.filter_by(record_id=rec.id).delete()
+    # Mapping, tag index and rollup are cleaned up by the manager
     manager.delete(rec)
     return jsonify({"message": "Record deleted successfully."}), 200
+
+
+def _filter_args(raw: dict) -> dict:
+    """Query-string style (string) values for a JSON filter object, for _parse_record_filters."""
+    args = {}
+    for key, value in raw.items():
+        if value is None:
+            continue
+        if key == "tags" and isinstance(value, list):
+            value = ",".join(str(t) for t in value)
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        args[key] = str(value)
+    return args
+
+
+@health_bp.route("/bulk-delete", methods=["POST"])
+@jwt_required()
+def bulk_delete_records():
+    """Delete many records at once: body {"ids": [...]} or {"filter": {...}} (list_records filters).
+
+    Ids not owned by the user are skipped. A filter needs at least one criterion besides tag_mode, so
+    an empty filter cannot wipe the whole history. Returns the number of records deleted.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    ids, raw_filter = data.get("ids"), data.get("filter")
+    if (ids is None) == (raw_filter is None):
+        return jsonify(error("400", "Provide either ids or filter")), 400
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify(error("400", "ids must be a list of integers")), 400
+        if len(ids) > MAX_BULK_DELETE_IDS:
+            return jsonify(error("400", "Too many ids", details={"max": MAX_BULK_DELETE_IDS})), 400
+        deleted = manager.bulk_delete(user_id, ids=ids)
+        return jsonify({"deleted": deleted}), 200
+
+    if not isinstance(raw_filter, dict):
+        return jsonify(error("400", "filter must be an object")), 400
+    unknown = [k for k in raw_filter if k not in BULK_DELETE_FILTERS]
+    if unknown:
+        return jsonify(error("400", "Invalid filter", details={"unknown": unknown,
+                                                               "allowed": list(BULK_DELETE_FILTERS)})), 400
+    args = _filter_args(raw_filter)
+    if not any(k != "tag_mode" and v not in ("", "false", "0") for k, v in args.items()):
+        return jsonify(error("400", "filter needs at least one criterion")), 400
+    filters, _, err = _parse_record_filters(user_id, args)
+    if err:
+        return err
+    deleted = manager.bulk_delete(user_id, filters=filters)
+    return jsonify({"deleted": deleted}), 200
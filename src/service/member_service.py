@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..manager.member_manager import MemberManager
 from ..utils import error
+from ..cache import app_cache
 from ..manager.user_manager import UserManager
 
 
@@ -12,49 +13,61 @@ member_bp = Blueprint("members", __name__)
 manager = MemberManager()
 
 
+def _merge_self(member, user):
+    # Treat both 'Self' and '自己' as the default self member
+    name = (member.full_name or '').strip()
+    is_self = name.lower() == 'self' or name == '自己'
+    if not is_self or not user:
+        return member.gender, member.age, member.height, member.weight
+    # Map user.gender from either M/F/O or male/female/other into member's male/female/other
+    val = (user.gender or '').strip()
+    letter_map = {'M': 'male', 'F': 'female', 'O': 'other'}
+    word_map = {'male': 'male', 'female': 'female', 'other': 'other', '男': 'male', '女': 'female'}
+    g = None
+    if val:
+        g = letter_map.get(val.upper()) or word_map.get(val.lower()) or member.gender
+    else:
+        g = member.gender
+    age = user.age if user.age is not None else member.age
+    # Height lives on member; sync from Profile update path writes to Self member already
+    height = member.height
+    weight = user.weight if user.weight is not None else member.weight
+    return g, age, height, weight
+
+
+def member_json(member, user) -> dict:
+    """A member as returned by the members list (and delta sync)."""
+    # Generated by Zhuang: For the default 'Self' member, pull fields from user profile (个人信息)
+    g, a, h, w = _merge_self(member, user)
+    return {
+        "id": member.id,
+        "full_name": member.full_name,
+        "gender": g,
+        "age": a,
+        "height": h,
+        "weight": w,
+        "status": member.status,
+    }
+
+
 @member_bp.route("", methods=["GET"])
 @jwt_required()
 def list_members():
     user_id = get_jwt_identity()
+    cache = app_cache()
+    # Member writes invalidate by owner generation, which a per-process memory cache cannot share
+    if cache is not None and not cache.shared:
+        cache = None
+    payload = cache.get("member-list", "active", owner=int(user_id)) if cache is not None else None
+    if payload is not None:
+        return jsonify(payload), 200
     items = manager.list_members(user_id)
-    # Generated by Zhuang: For the default 'Self' member, pull fields from user profile (个人信息)
-    user_mgr = UserManager()
-    user = user_mgr.get_user(user_id)
-
-    def _merge_self(member):
-        # Treat both 'Self' and '自己' as the default self member
-        name = (member.full_name or '').strip()
-        is_self = name.lower() == 'self' or name == '自己'
-        if not is_self or not user:
-            return member.gender, member.age, member.height, member.weight
-        # Map user.gender from either M/F/O or male/female/other into member's male/female/other
-        val = (user.gender or '').strip()
-        letter_map = {'M': 'male', 'F': 'female', 'O': 'other'}
-        word_map = {'male': 'male', 'female': 'female', 'other': 'other', '男': 'male', '女': 'female'}
-        g = None
-        if val:
-            g = letter_map.get(val.upper()) or word_map.get(val.lower()) or member.gender
-        else:
-            g = member.gender
-        age = user.age if user.age is not None else member.age
-        # Height lives on member; sync from Profile update path writes to Self member already
-        height = member.height
-        weight = user.weight if user.weight is not None else member.weight
-        return g, age, height, weight
-
-    data = []
-    for m in items:
-        g, a, h, w = _merge_self(m)
-        data.append({
-            "id": m.id,
-            "full_name": m.full_name,
-            "gender": g,
-            "age": a,
-            "height": h,
-            "weight": w,
-            "status": m.status,
-        })
-    return jsonify({"members": data}), 200
+    user = UserManager().get_user(user_id)
+    data = [member_json(m, user) for m in items]
+    payload = {"members": data}
+    if cache is not None:
+        cache.set("member-list", "active", payload, owner=int(user_id))
+    return jsonify(payload), 200
 
 
 @member_bp.route("", methods=["POST"])
@@ -0,0 +1,70 @@
+"""
+Delta sync endpoint: records and members changed since a client's checkpoint.
+"""
+import json
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..manager.sync_manager import SyncManager
+from ..manager.user_manager import UserManager
+from ..utils import error
+from .member_service import member_json
+
+sync_bp = Blueprint("sync", __name__)
+# Changes per response: default and maximum of ?limit=
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 2000
+manager = SyncManager()
+user_mgr = UserManager()
+
+
+@sync_bp.route("", methods=["GET"])
+@jwt_required()
+def sync_changes():
+    """Changes after ?since= (0 or omitted = everything), at most ?limit= per response, oldest first.
+
+    Pass next_since back as since until has_more is false; each response is a complete step, so a client
+    can stop after any of them and resume from its next_since.
+    """
+    user_id = get_jwt_identity()
+    since = (request.args.get("since") or "0").strip()
+    if not since.isdigit():
+        return jsonify(error("400", "Invalid since")), 400
+    since = int(since)
+    try:
+        limit = int(request.args.get("limit", DEFAULT_SYNC_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SYNC_LIMIT
+    limit = max(1, min(limit, MAX_SYNC_LIMIT))
+
+    if since == 0:
+        # Rows from before delta sync have no sequence number yet; give them one so they can be paged
+        manager.sequence_legacy_rows(user_id)
+    changes, next_since, has_more = manager.changes(user_id, since, limit)
+    user = user_mgr.get_user(user_id)
+    records, members, deleted = [], [], []
+    for seq, kind, row in changes:
+        if kind == "record":
+            records.append({
+                "id": row.id,
+                "timestamp": row.timestamp,
+                "systolic": row.systolic,
+                "diastolic": row.diastolic,
+                "heart_rate": row.heart_rate,
+                "tags": json.loads(row.tags) if row.tags else [],
+                "note": row.note,
+                "subject_member_id": row.subject_member_id,
+                "change_seq": seq,
+            })
+        elif kind == "member":
+            members.append({**member_json(row, user), "change_seq": seq})
+        else:
+            deleted.append(row.record_id)
+    # A record id deleted and then reused (SQLite can reuse the highest id) is live again
+    live = {r["id"] for r in records}
+    return jsonify({
+        "records": records,
+        "members": members,
+        "deleted": {"records": [rid for rid in deleted if rid not in live]},
+        "next_since": next_since,
+        "has_more": has_more,
+    }), 200
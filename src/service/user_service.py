@@ -68,6 +68,12 @@ def update_user_info(user_id: int):
         except Exception:
             # Best-effort: ignore height sync failures so profile update still succeeds
             pass
+    elif any(data.get(k) is not None for k in ("age", "gender", "weight")):
+        # The Self member shows these profile fields, so delta sync must see it as changed
+        try:
+            member_manager.update_member(member_manager.get_or_create_self_member(user_id))
+        except Exception:
+            pass
     # Return height from Self member for UI consistency
     self_member = member_manager.get_or_create_self_member(user_id)
     height = self_member.height if self_member else None
@@ -1,6 +1,9 @@
 """
 Utilities: pagination helper, validation, time, responses. Generated by Zhuang
 """
+import base64
+import json
+from datetime import datetime
 from typing import Any, Dict, Tuple, Optional
 from flask import request
 
@@ -28,6 +31,24 @@ def make_pagination(page: int, size: int, total: int) -> Dict[str, Any]:
     return {"page": page, "size": size, "total": total, "pages": pages}
 
 
+def encode_cursor(timestamp: datetime, rec_id: int) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe token."""
+    raw = json.dumps([timestamp.isoformat(), rec_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    """Decode a token produced by encode_cursor. Raise ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        ts_raw, rec_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(rec_id, int):
+            raise ValueError("invalid cursor id")
+        return datetime.fromisoformat(ts_raw), rec_id
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
 def ok(data: Any = None, **kwargs):
     payload = {"data": data} if data is not None else {}
     payload.update(kwargs)
@@ -0,0 +1,56 @@
+"""
+Blood pressure classification (ACC/AHA 2017 categories) shared by writes, queries and charts.
+"""
+from typing import Optional
+from sqlalchemy import case
+
+# Severity levels stored on HealthRecord.severity; anything above NORMAL is "abnormal"
+NORMAL = 0
+ELEVATED = 1
+STAGE_1 = 2
+STAGE_2 = 3
+CRISIS = 4
+
+SEVERITY_LABELS = {
+    NORMAL: "normal",
+    ELEVATED: "elevated",
+    STAGE_1: "stage_1",
+    STAGE_2: "stage_2",
+    CRISIS: "crisis",
+}
+
+# Same thresholds the dashboard chart highlights (HealthChart.js)
+ABNORMAL_SYSTOLIC = 120
+ABNORMAL_DIASTOLIC = 80
+
+# (severity, systolic >=, diastolic >=) from most to least severe; the first band either value reaches
+# wins. ELEVATED is systolic-only: a diastolic >= 80 already falls into STAGE_1.
+_BANDS = (
+    (CRISIS, 181, 121),
+    (STAGE_2, 140, 90),
+    (STAGE_1, 130, 80),
+    (ELEVATED, ABNORMAL_SYSTOLIC, None),
+)
+
+
+def classify_bp(systolic: int, diastolic: int) -> int:
+    for severity, sys_min, dia_min in _BANDS:
+        if systolic >= sys_min or (dia_min is not None and diastolic >= dia_min):
+            return severity
+    return NORMAL
+
+
+def severity_expr(systolic, diastolic):
+    """SQL CASE equivalent of classify_bp over the given columns (used by set-based backfills)."""
+    whens = []
+    for severity, sys_min, dia_min in _BANDS:
+        cond = systolic >= sys_min
+        if dia_min is not None:
+            cond = cond | (diastolic >= dia_min)
+        whens.append((cond, severity))
+    return case(*whens, else_=NORMAL)
+
+
+def is_abnormal(systolic: Optional[int], diastolic: Optional[int]) -> bool:
+    return (systolic is not None and systolic >= ABNORMAL_SYSTOLIC) or \
+        (diastolic is not None and diastolic >= ABNORMAL_DIASTOLIC)
@@ -15,6 +15,8 @@ class TestConfig(Config):
     JWT_SECRET_KEY = 'test-secret-key'
     WTF_CSRF_ENABLED = False
     RATELIMIT_ENABLED = False  # Disable rate limiting for tests
+    EXPORT_JOBS_EAGER = True  # Run export jobs inline so tests see them finished
+    EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'health-platform-test-exports')
 
 
 @pytest.fixture
@@ -0,0 +1,239 @@
+"""
+Tests for the application cache: TTL/LRU store, the memory/SQLite/Redis backends (Redis via an
+in-process stand-in) and the cached record/member/user lookups.
+"""
+import fnmatch
+import time
+import pytest
+from src.app import create_app
+from src.cache import Cache, MemoryBackend, RedisBackend, SQLiteBackend, TTLCache, app_cache
+from src.extensions import db
+from tests.conftest import TestConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Just enough of redis-py's client API (bytes in, bytes out) for RedisBackend."""
+
+    def __init__(self, clock=time.time):
+        self._data = {}
+        self._clock = clock
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, px=None):
+        self._data[key] = (value, self._clock() + px / 1000 if px else None)
+        return True
+
+    def delete(self, *keys):
+        return sum(self._data.pop(k, None) is not None for k in keys)
+
+    def incr(self, key):
+        entry = self._live(key)
+        value = int(entry[0]) + 1 if entry else 1
+        self._data[key] = (str(value).encode(), entry[1] if entry else None)
+        return value
+
+    def scan_iter(self, match='*'):
+        return [k for k in list(self._data) if fnmatch.fnmatchcase(k, match)]
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend_factory(request, tmp_path):
+    """Builds backends of one kind, one per call ('worker'): sqlite/redis ones share a store, memory ones don't."""
+    clock = FakeClock()
+    fake_redis = FakeRedis(clock=clock)
+
+    def make():
+        if request.param == 'sqlite':
+            return SQLiteBackend(str(tmp_path / 'cache.sqlite3'), clock=clock)
+        if request.param == 'redis':
+            return RedisBackend(fake_redis)
+        backend = MemoryBackend()
+        backend.store._clock = clock
+        return backend
+    make.clock = clock
+    return make
+
+
+class TestTTLCache:
+    def test_lru_eviction_and_ttl(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1  # 'a' becomes most recently used
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        clock.now += 10
+        assert cache.get('a') is None
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (3, 2, 1, 1)
+
+    def test_zero_size_disables(self):
+        cache = TTLCache(maxsize=0)
+        cache.set('a', 1)
+        assert cache.get('a') is None
+
+
+class TestCacheBackends:
+    def test_roundtrip_and_expiry(self, backend_factory):
+        cache = Cache(backend_factory(), default_ttl=5)
+        cache.set('ns', ('k', 1), {'records': [1, 2], 'note': '晨起'})
+        assert cache.get('ns', ('k', 1)) == {'records': [1, 2], 'note': '晨起'}
+        assert cache.get('ns', ('k', 2)) is None
+        backend_factory.clock.now += 5
+        assert cache.get('ns', ('k', 1)) is None
+        assert cache.stats()['namespaces']['ns'] == {'hits': 1, 'misses': 2, 'hit_rate': 0.333}
+
+    def test_owner_invalidation_reaches_other_workers(self, backend_factory):
+        worker_a = Cache(backend_factory())
+        worker_b = Cache(backend_factory())
+        shared = backend_factory().name != 'memory'
+        assert worker_a.shared is shared
+        worker_a.set('members', 'active', ['Self'], owner=7)
+        worker_a.set('members', 'active', ['Self', 'Dad'], owner=8)
+        assert worker_b.get('members', 'active', owner=7) == (['Self'] if shared else None)
+        worker_b.set('members', 'active', ['Self'], owner=7)
+        worker_b.invalidate_owner(7)
+        assert worker_b.get('members', 'active', owner=7) is None
+        # A per-process memory cache never hears of the other worker's invalidation
+        assert worker_a.get('members', 'active', owner=7) == (None if shared else ['Self'])
+        assert worker_a.get('members', 'active', owner=8) == ['Self', 'Dad']
+
+    def test_backend_errors_are_misses(self):
+        class Broken:
+            name = 'broken'
+
+            def __getattr__(self, op):
+                def fail(*args, **kwargs):
+                    raise ConnectionError('down')
+                return fail
+
+        cache = Cache(Broken())
+        cache.set('ns', 'k', 1)
+        cache.invalidate_owner(1)
+        assert cache.get('ns', 'k', default='miss') == 'miss'
+        assert cache.stats()['errors'] == 3
+
+    def test_sqlite_prune_keeps_generations(self, tmp_path):
+        clock = FakeClock()
+        backend = SQLiteBackend(str(tmp_path / 'c.sqlite3'), maxsize=3, clock=clock)
+        backend.incr('gen:1')
+        for i in range(5):
+            backend.set(f'k{i}', b'v', ttl=10 + i)
+        backend.prune()
+        assert backend.size() == 3
+        assert backend.get('gen:1') == b'1'
+        assert backend.get('k0') is None and backend.get('k4') == b'v'
+
+
+class TestCachedLookups:
+    def test_list_pages_cached_until_write(self, client, auth_headers):
+        access_headers = auth_headers['access']
+        client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80}, headers=access_headers)
+        cache = app_cache()
+
+        def counters():
+            c = cache.stats()['namespaces'].get('record-list', {'hits': 0, 'misses': 0})
+            return c['hits'], c['misses']
+
+        first = client.get('/api/v1/health?size=5', headers=access_headers).get_json()
+        second = client.get('/api/v1/health?size=5', headers=access_headers).get_json()
+        assert first == second
+        assert counters() == (1, 1)
+
+        client.post('/api/v1/health', json={'systolic': 130, 'diastolic': 85}, headers=access_headers)
+        third = client.get('/api/v1/health?size=5', headers=access_headers).get_json()
+        assert third['pagination']['total'] == 2
+        assert counters() == (1, 2)
+
+    def test_cache_stats_requires_admin(self, client, auth_headers):
+        resp = client.get('/api/v1/admin/cache-stats', headers=auth_headers['access'])
+        assert resp.status_code == 403
+
+    def test_redis_backend_shared_between_workers(self, tmp_path, monkeypatch):
+        """Two app instances (workers) on one DB and one Redis: a write in one is seen by the other"""
+        fake_redis = FakeRedis()
+        monkeypatch.setattr(RedisBackend, 'from_url', classmethod(lambda cls, url: cls(fake_redis)))
+
+        class SharedConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'shared.db'}"
+            CACHE_BACKEND = 'redis'
+
+        worker_a, worker_b = create_app(SharedConfig), create_app(SharedConfig)
+        with worker_a.app_context():
+            db.create_all()
+        client_a, client_b = worker_a.test_client(), worker_b.test_client()
+        client_a.post('/api/v1/auth/register', json={'username': 'shared', 'email': 'shared@example.com',
+                                                     'password': 'password123'})
+        token = client_a.post('/api/v1/auth/login', json={'email': 'shared@example.com',
+                                                          'password': 'password123'}).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        assert [m['full_name'] for m in client_a.get('/api/v1/members', headers=headers).get_json()['members']] == \
+            ['Self']
+        dad = client_b.post('/api/v1/members', json={'full_name': 'Dad'}, headers=headers).get_json()
+        assert [m['full_name'] for m in client_a.get('/api/v1/members', headers=headers).get_json()['members']] == \
+            ['Self', 'Dad']
+        client_a.put(f"/api/v1/members/{dad['id']}", json={'full_name': 'Father'}, headers=headers)
+        assert [m['full_name'] for m in client_b.get('/api/v1/members', headers=headers).get_json()['members']] == \
+            ['Self', 'Father']
+        with worker_a.app_context():
+            assert app_cache().stats()['backend'] == 'redis'
+            db.drop_all()
+
+    def test_memory_backend_workers_never_serve_each_others_stale_state(self, tmp_path):
+        """Two workers with per-process memory caches: member lists and the password-change guard stay exact"""
+        from src.manager.user_manager import UserManager
+        from src.models import User
+
+        class MemoryConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'shared.db'}"
+            CACHE_BACKEND = 'memory'
+
+        worker_a, worker_b = create_app(MemoryConfig), create_app(MemoryConfig)
+        with worker_a.app_context():
+            db.create_all()
+        client_a, client_b = worker_a.test_client(), worker_b.test_client()
+        client_a.post('/api/v1/auth/register', json={'username': 'mem', 'email': 'mem@example.com',
+                                                     'password': 'password123'})
+        token = client_a.post('/api/v1/auth/login', json={'email': 'mem@example.com',
+                                                          'password': 'password123'}).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def names(client):
+            return [m['full_name'] for m in client.get('/api/v1/members', headers=headers).get_json()['members']]
+        assert names(client_a) == ['Self']
+        client_b.post('/api/v1/members', json={'full_name': 'Dad'}, headers=headers)
+        assert names(client_a) == ['Self', 'Dad']
+
+        # Admin reset handled by worker B binds worker A on its very next request
+        with worker_b.app_context():
+            UserManager().set_password(User.query.filter_by(email='mem@example.com').one(), 'Temp1234!',
+                                       force_change_next_login=True)
+        assert client_a.get('/api/v1/members', headers=headers).status_code == 403
+        # ... and so does the self-service change that clears the flag
+        resp = client_b.post('/api/v1/auth/change-password', json={'current_password': 'Temp1234!',
+                                                                   'new_password': 'Newpass123'}, headers=headers)
+        assert resp.status_code == 200
+        assert client_a.get('/api/v1/members', headers=headers).status_code == 200
+        with worker_a.app_context():
+            db.drop_all()
@@ -0,0 +1,85 @@
+"""
+Tests for response compression: Accept-Encoding negotiation, size threshold, streamed bodies and
+per-blueprint settings.
+"""
+import gzip
+import pytest
+from src.app import create_app
+from src.extensions import db
+from tests.conftest import TestConfig
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def _add_records(client, headers, n):
+    client.post('/api/v1/health/batch', json={'records': [
+        {'systolic': 120 + i % 20, 'diastolic': 80, 'timestamp': f'2025-08-01T08:{i % 60:02d}:00Z',
+         'note': 'after a long walk in the park'} for i in range(n)]}, headers=headers)
+
+
+class TestCompression:
+    def test_large_json_is_gzipped_small_is_not(self, client, auth_headers):
+        headers = auth_headers['access']
+        _add_records(client, headers, 50)
+
+        plain = client.get('/api/v1/health?size=50', headers=headers)
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.headers['Vary'] and 'Accept-Encoding' in plain.headers['Vary']
+
+        packed = client.get('/api/v1/health?size=50', headers={**headers, **GZIP})
+        assert packed.headers['Content-Encoding'] == 'gzip'
+        assert int(packed.headers['Content-Length']) < len(plain.get_data())
+        assert gzip.decompress(packed.get_data()) == plain.get_data()
+
+        small = client.get('/api/v1/health?size=1', headers={**headers, **GZIP})
+        assert 'Content-Encoding' not in small.headers
+
+    def test_refused_encoding_is_not_used(self, client, auth_headers):
+        headers = auth_headers['access']
+        _add_records(client, headers, 50)
+        resp = client.get('/api/v1/health?size=50', headers={**headers, 'Accept-Encoding': 'gzip;q=0, identity'})
+        assert 'Content-Encoding' not in resp.headers
+
+    def test_streamed_csv_compressed_in_chunks(self, client, auth_headers):
+        headers = auth_headers['access']
+        _add_records(client, headers, 30)
+        plain = client.get('/api/v1/health/export', headers=headers).get_data()
+        resp = client.get('/api/v1/health/export', headers={**headers, **GZIP})
+        assert resp.is_streamed
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in resp.headers
+        assert gzip.decompress(resp.get_data()) == plain
+
+    def test_not_modified_untouched(self, client, auth_headers):
+        headers = auth_headers['access']
+        _add_records(client, headers, 50)
+        etag = client.get('/api/v1/health?size=50', headers={**headers, **GZIP}).headers['ETag']
+        resp = client.get('/api/v1/health?size=50', headers={**headers, **GZIP, 'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert 'Content-Encoding' not in resp.headers
+
+    def test_per_blueprint_settings(self):
+        class PerBlueprintConfig(TestConfig):
+            COMPRESS_MIN_SIZE = 0
+            COMPRESS_BLUEPRINTS = {'version': {'enabled': False}}
+
+        app = create_app(PerBlueprintConfig)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            resp = client.post('/api/v1/auth/login', json={'email': 'nobody@example.com', 'password': 'x'},
+                               headers=GZIP)
+            assert resp.headers['Content-Encoding'] == 'gzip'
+            resp = client.get('/api/v1/version', headers=GZIP)
+            assert resp.status_code == 200
+            assert 'Content-Encoding' not in resp.headers
+            db.drop_all()
+
+    def test_brotli_preferred_when_installed(self, client, auth_headers):
+        brotli = pytest.importorskip('brotli')
+        headers = auth_headers['access']
+        _add_records(client, headers, 50)
+        plain = client.get('/api/v1/health?size=50', headers=headers).get_data()
+        resp = client.get('/api/v1/health?size=50', headers={**headers, 'Accept-Encoding': 'gzip, br'})
+        assert resp.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(resp.get_data()) == plain
@@ -162,6 +162,36 @@ class TestHealthEndpoints:
         assert len(data['records']) == 10
         assert data['pagination']['page'] == 2
     
+    def test_list_health_records_cursor_pagination(self, client, auth_headers):
+        """Cursor mode walks all records newest-first without offsets or totals"""
+        access_headers = auth_headers['access']
+        # Two records share a timestamp to exercise the id tie-breaker
+        stamps = ['2025-08-01T08:00:00Z', '2025-08-02T08:00:00Z', '2025-08-02T08:00:00Z',
+                  '2025-08-03T08:00:00Z', '2025-08-04T08:00:00Z']
+        for i, ts in enumerate(stamps):
+            client.post('/api/v1/health', json={'systolic': 120 + i, 'diastolic': 80, 'timestamp': ts},
+                        headers=access_headers)
+
+        seen = []
+        url = '/api/v1/health?size=2&cursor='
+        while True:
+            response = client.get(url, headers=access_headers)
+            assert response.status_code == 200
+            data = response.get_json()
+            assert 'total' not in data['pagination']
+            seen.extend(r['id'] for r in data['records'])
+            next_cursor = data['pagination']['next_cursor']
+            if not next_cursor:
+                break
+            url = f'/api/v1/health?size=2&cursor={next_cursor}'
+
+        offset_ids = [r['id'] for r in client.get('/api/v1/health?size=10', headers=access_headers).get_json()['records']]
+        assert seen == offset_ids
+        assert len(set(seen)) == 5
+
+        response = client.get('/api/v1/health?cursor=not-a-cursor', headers=access_headers)
+        assert response.status_code == 400
+
     def test_list_health_records_filter_by_tags(self, client, auth_headers):
         """Test filtering health records by tags"""
         access_headers = auth_headers['access']
@@ -195,6 +225,44 @@ class TestHealthEndpoints:
         for record in data['records']:
             assert any(t in record['tags'] for t in ['morning', 'work'])
     
+    def test_list_health_records_tag_index(self, client, auth_headers, runner):
+        """Tag filters use the record_tags index: AND mode, updates, deletes and backfill"""
+        access_headers = auth_headers['access']
+        ids = []
+        for tags in (['morning', 'home'], ['morning', 'gym'], ['餐后']):
+            r = client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80, 'tags': tags},
+                            headers=access_headers)
+            ids.append(r.get_json()['id'])
+
+        response = client.get('/api/v1/health?tags=morning,home&tag_mode=all', headers=access_headers)
+        assert [r['id'] for r in response.get_json()['records']] == [ids[0]]
+        response = client.get('/api/v1/health?tags=餐后', headers=access_headers)
+        assert [r['id'] for r in response.get_json()['records']] == [ids[2]]
+        assert client.get('/api/v1/health?tags=x&tag_mode=some', headers=access_headers).status_code == 400
+
+        # Re-tagging and deleting keep the index in sync
+        client.put(f'/api/v1/health/{ids[1]}', json={'tags': ['home']}, headers=access_headers)
+        client.delete(f'/api/v1/health/{ids[0]}', headers=access_headers)
+        response = client.get('/api/v1/health?tags=morning', headers=access_headers)
+        assert response.get_json()['records'] == []
+        response = client.get('/api/v1/health?tags=home', headers=access_headers)
+        assert [r['id'] for r in response.get_json()['records']] == [ids[1]]
+
+        # Legacy rows without index entries are picked up by the backfill command
+        from src.cache import app_cache
+        from src.extensions import db
+        from src.models import RecordTag
+        RecordTag.query.delete()
+        db.session.commit()
+        # Raw SQL bypasses the write path, so drop list pages cached before it
+        app_cache().clear()
+        assert client.get('/api/v1/health?tags=home', headers=access_headers).get_json()['records'] == []
+        result = runner.invoke(args=['backfill-record-tags', '--chunk-size', '1'])
+        assert result.exit_code == 0
+        assert 'Indexed tags for 2 records' in result.output
+        response = client.get('/api/v1/health?tags=home', headers=access_headers)
+        assert [r['id'] for r in response.get_json()['records']] == [ids[1]]
+
     def test_get_health_record(self, client, auth_headers):
         """Test getting a specific health record"""
         access_headers = auth_headers['access']
@@ -323,3 +391,704 @@ class TestHealthEndpoints:
         # Second user should not be able to access first user's record
         response = client.get(f'/api/v1/health/{record_id}', headers=user2_headers)
         assert response.status_code == 404  # Or 403, depending on implementation
+
+    def test_export_csv_streams_rows_with_member_names(self, client, auth_headers):
+        """Export is streamed oldest-first with member names joined in"""
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        client.post('/api/v1/health', json={'systolic': 130, 'diastolic': 85, 'timestamp': '2025-08-02T08:00:00Z',
+                                            'tags': ['晨起', 'home'], 'note': 'line1\nline2'}, headers=access_headers)
+        client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80, 'timestamp': '2025-08-01T08:00:00Z',
+                                            'subject_member_id': mom_id}, headers=access_headers)
+
+        response = client.get('/api/v1/health/export', headers=access_headers)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert 'attachment' in response.headers['Content-Disposition']
+        text = response.get_data(as_text=True)
+        assert text.startswith('\ufeff')
+        lines = text.lstrip('\ufeff').splitlines()
+        assert lines[0] == 'id,member_name,timestamp,systolic,diastolic,heart_rate,tags,note'
+        assert lines[1].split(',')[1:4] == ['Mom', '2025-08-01T08:00:00Z', '120']
+        assert lines[2].split(',')[1:3] == ['Self', '2025-08-02T08:00:00Z']
+        assert lines[2].endswith('晨起;home,line1 line2')
+        assert len(lines) == 3
+
+        response = client.get(f'/api/v1/health/export?subject_member_id={mom_id}', headers=access_headers)
+        lines = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+        assert len(lines) == 2
+        assert lines[1].split(',')[1] == 'Mom'
+
+    def test_export_job_runs_and_downloads(self, client, auth_headers, app, runner):
+        """A queued export writes the export_csv body gzip-compressed; status shows progress; GC removes it"""
+        import gzip
+        import os
+        from src.exports import export_jobs
+        from src.extensions import db
+        from src.models import ExportJob
+        access_headers = auth_headers['access']
+        for day in range(1, 4):
+            client.post('/api/v1/health', json={'systolic': 120 + day, 'diastolic': 80, 'tags': ['晨起'],
+                                                'timestamp': f'2025-08-0{day}T08:00:00Z'}, headers=access_headers)
+
+        resp = client.post('/api/v1/health/export-jobs?date_from=2025-08-02T00:00:00Z', headers=access_headers)
+        assert resp.status_code == 202
+        job = resp.get_json()
+        assert resp.headers['Location'].endswith(f"/export-jobs/{job['id']}")
+        status = client.get(f"/api/v1/health/export-jobs/{job['id']}", headers=access_headers).get_json()
+        assert status['status'] == 'done'
+        assert status['progress'] == {'rows_written': 2, 'rows_total': 2, 'percent': 100.0}
+        assert status['file_name'].endswith('.csv.gz')
+
+        download = client.get(status['download_url'], headers=access_headers)
+        assert download.status_code == 200
+        assert download.mimetype == 'application/gzip'
+        expected = client.get('/api/v1/health/export?date_from=2025-08-02T00:00:00Z', headers=access_headers)
+        assert gzip.decompress(download.get_data()) == expected.get_data()
+        download.close()
+
+        # Jobs are private to their owner
+        client.post('/api/v1/auth/register', json={'username': 'other', 'email': 'other@example.com',
+                                                   'password': 'password123'})
+        other = client.post('/api/v1/auth/login', json={'email': 'other@example.com',
+                                                        'password': 'password123'}).get_json()['access_token']
+        resp = client.get(f"/api/v1/health/export-jobs/{job['id']}", headers={'Authorization': f'Bearer {other}'})
+        assert resp.status_code == 404
+
+        path = export_jobs().artifact_path(job['id'])
+        assert os.path.exists(path)
+        ExportJob.query.update({ExportJob.expires_at: datetime(2000, 1, 1)})
+        db.session.commit()
+        result = runner.invoke(args=['gc-export-jobs'])
+        assert 'Removed 1 expired export jobs' in result.output
+        assert not os.path.exists(path)
+        assert client.get(f"/api/v1/health/export-jobs/{job['id']}", headers=access_headers).status_code == 404
+
+    def test_export_job_queue_bound_and_unfinished_download(self, client, auth_headers):
+        import threading
+        from src.exports import export_jobs
+        from src.extensions import db
+        from src.models import ExportJob, User
+        access_headers = auth_headers['access']
+        jobs = export_jobs()
+        jobs._slots = threading.BoundedSemaphore(1)
+        assert jobs.try_reserve()
+        resp = client.post('/api/v1/health/export-jobs', headers=access_headers)
+        assert resp.status_code == 503
+        assert resp.headers['Retry-After'] == '30'
+        jobs.release()
+
+        user_id = User.query.filter_by(email='test@example.com').one().id
+        queued = ExportJob(user_id=user_id, status='queued', filters='{}', rows_written=0)
+        db.session.add(queued)
+        db.session.commit()
+        resp = client.get(f'/api/v1/health/export-jobs/{queued.id}/download', headers=access_headers)
+        assert resp.status_code == 409
+        assert client.get(f'/api/v1/health/export-jobs/{queued.id}', headers=access_headers).get_json()[
+            'download_url'] is None
+
+    def test_export_job_on_thread_pool(self, tmp_path):
+        """Without eager mode the job runs on the background pool"""
+        from src.app import create_app
+        from src.exports import export_jobs
+        from src.extensions import db
+        from tests.conftest import TestConfig
+
+        class PooledConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'jobs.db'}"
+            EXPORT_JOBS_EAGER = False
+            EXPORT_DIR = str(tmp_path / 'exports')
+
+        app = create_app(PooledConfig)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            client.post('/api/v1/auth/register', json={'username': 'pool', 'email': 'pool@example.com',
+                                                       'password': 'password123'})
+            token = client.post('/api/v1/auth/login', json={'email': 'pool@example.com',
+                                                            'password': 'password123'}).get_json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+            client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80}, headers=headers)
+
+            job = client.post('/api/v1/health/export-jobs', headers=headers).get_json()
+            assert job['status'] in ('queued', 'running', 'done')
+            export_jobs()._executor.shutdown(wait=True)
+            status = client.get(f"/api/v1/health/export-jobs/{job['id']}", headers=headers).get_json()
+            assert status['status'] == 'done' and status['progress']['rows_written'] == 1
+            db.drop_all()
+
+    def test_bulk_delete_by_ids_and_filter(self, client, auth_headers):
+        """Bulk delete removes records, mappings and tags, refreshes rollups and invalidates list ETags"""
+        from src.models import HealthDailyRollup, RecordSubject, RecordTag
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        records = [{'systolic': 120 + i, 'diastolic': 80, 'tags': ['device-a'] if i % 2 else [],
+                    'timestamp': f'2025-08-{1 + i:02d}T08:00:00Z', 'subject_member_id': mom_id if i < 4 else None}
+                   for i in range(8)]
+        ids = client.post('/api/v1/health/batch', json={'records': records}, headers=access_headers).get_json()['ids']
+        etag = client.get('/api/v1/health', headers=access_headers).headers['ETag']
+
+        resp = client.post('/api/v1/health/bulk-delete', json={'ids': ids[:2] + [999999]}, headers=access_headers)
+        assert resp.get_json() == {'deleted': 2}
+        assert client.get('/api/v1/health', headers={**access_headers, 'If-None-Match': etag}).status_code == 200
+
+        resp = client.post('/api/v1/health/bulk-delete', json={'filter': {
+            'subject_member_id': mom_id, 'date_to': '2025-08-03T23:59:59Z'}}, headers=access_headers)
+        assert resp.get_json() == {'deleted': 1}
+        resp = client.post('/api/v1/health/bulk-delete', json={'filter': {'tags': ['device-a']}},
+                           headers=access_headers)
+        assert resp.get_json() == {'deleted': 3}
+
+        remaining = client.get('/api/v1/health', headers=access_headers).get_json()
+        assert sorted(r['systolic'] for r in remaining['records']) == [124, 126]
+        assert RecordSubject.query.count() == 2 and RecordTag.query.count() == 0
+        assert sorted(r.count for r in HealthDailyRollup.query.all()) == [1, 1]
+
+        for body in ({}, {'ids': [1], 'filter': {'tags': ['x']}}, {'filter': {}}, {'filter': {'tag_mode': 'all'}},
+                     {'filter': {'color': 'red'}}, {'ids': ['1']}):
+            resp = client.post('/api/v1/health/bulk-delete', json=body, headers=access_headers)
+            assert resp.status_code == 400, body
+
+    def test_bulk_delete_chunks(self, client, auth_headers):
+        from src.manager.health_manager import HealthManager
+        from src.models import User
+        access_headers = auth_headers['access']
+        client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120, 'diastolic': 80, 'timestamp': f'2025-08-01T08:{i:02d}:00Z'} for i in range(7)]},
+            headers=access_headers)
+        user_id = User.query.filter_by(email='test@example.com').one().id
+        assert HealthManager().bulk_delete(user_id, filters={'date_from': datetime(2025, 8, 1)}, chunk_size=3) == 7
+        assert client.get('/api/v1/health', headers=access_headers).get_json()['pagination']['total'] == 0
+
+    def test_archive_records_transparent_reads(self, client, auth_headers, runner):
+        """Archived records leave paged lists but still show up in exports reaching back; rollups survive"""
+        import gzip
+        from src.models import HealthDailyRollup, HealthRecord, HealthRecordArchive
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        old = [{'systolic': 130 + i, 'diastolic': 85, 'timestamp': f'2020-03-0{i + 1}T08:00:00Z',
+                'tags': ['clinic'] if i == 1 else [], 'subject_member_id': mom_id if i == 2 else None}
+               for i in range(3)]
+        client.post('/api/v1/health/batch', json={'records': old}, headers=access_headers)
+        client.post('/api/v1/health', json={'systolic': 118, 'diastolic': 76, 'tags': ['clinic']},
+                    headers=access_headers)
+
+        def rollups():
+            return sorted((r.member_id, r.day, r.count, r.systolic_sum) for r in HealthDailyRollup.query.all())
+        before = rollups()
+
+        result = runner.invoke(args=['archive-records', '--older-than', '365', '--chunk-size', '2'])
+        assert result.exit_code == 0
+        assert 'Archived 3 records' in result.output
+        assert HealthRecord.query.count() == 1 and HealthRecordArchive.query.count() == 3
+        assert rollups() == before
+        assert runner.invoke(args=['rebuild-rollups']).exit_code == 0
+        assert rollups() == before
+
+        assert client.get('/api/v1/health', headers=access_headers).get_json()['pagination']['total'] == 1
+
+        def export(query=''):
+            text = client.get(f'/api/v1/health/export{query}', headers=access_headers).get_data(as_text=True)
+            return [line.split(',') for line in text.lstrip('\ufeff').splitlines()[1:]]
+        rows = export()
+        assert [r[3] for r in rows] == ['130', '131', '132', '118']
+        assert rows[2][1] == 'Mom'
+        assert [r[3] for r in export('?tags=clinic')] == ['131', '118']
+        assert [r[3] for r in export(f'?subject_member_id={mom_id}')] == ['132']
+        assert [r[3] for r in export('?date_from=2020-03-02T00:00:00Z&date_to=2020-12-31T00:00:00Z')] == \
+            ['131', '132']
+
+        lines = client.get('/api/v1/health/stream?since=2020-03-01T08:00:00Z', headers=access_headers).\
+            get_data(as_text=True).splitlines()
+        assert [json.loads(line)['systolic'] for line in lines] == [131, 132, 118]
+
+        job = client.post('/api/v1/health/export-jobs?tags=clinic', headers=access_headers).get_json()
+        status = client.get(f"/api/v1/health/export-jobs/{job['id']}", headers=access_headers).get_json()
+        body = client.get(status['download_url'], headers=access_headers)
+        assert gzip.decompress(body.get_data()) == client.get('/api/v1/health/export?tags=clinic',
+                                                               headers=access_headers).get_data()
+        body.close()
+
+    def test_export_job_progress_counts_archived_records(self, client, auth_headers, runner):
+        """An export job reaching into the archive counts the archived rows it writes"""
+        access_headers = auth_headers['access']
+        client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120 + i, 'diastolic': 80, 'timestamp': f'2020-01-0{i + 1}T08:00:00Z',
+             'tags': ['clinic'] if i else []} for i in range(3)]}, headers=access_headers)
+        client.post('/api/v1/health', json={'systolic': 118, 'diastolic': 76, 'tags': ['clinic']},
+                    headers=access_headers)
+        assert runner.invoke(args=['archive-records', '--older-than', '365']).exit_code == 0
+
+        for query, rows in (('', 4), ('?tags=clinic', 3), ('?date_from=2021-01-01T00:00:00Z', 1)):
+            job = client.post(f'/api/v1/health/export-jobs{query}', headers=access_headers).get_json()
+            status = client.get(f"/api/v1/health/export-jobs/{job['id']}", headers=access_headers).get_json()
+            assert status['progress'] == {'rows_written': rows, 'rows_total': rows, 'percent': 100.0}
+
+    def test_archive_again_after_new_records(self, client, auth_headers, runner):
+        """Archived ids are never handed out again, so a later archive run cannot collide"""
+        from src.models import HealthRecordArchive
+        access_headers = auth_headers['access']
+        old = client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120 + i, 'diastolic': 80, 'timestamp': f'2020-01-0{i + 1}T08:00:00Z'} for i in range(3)]},
+            headers=access_headers).get_json()['ids']
+        assert runner.invoke(args=['archive-records', '--older-than', '365']).exit_code == 0
+
+        new_id = client.post('/api/v1/health', json={'systolic': 130, 'diastolic': 85,
+                                                     'timestamp': '2020-02-01T08:00:00Z'},
+                             headers=access_headers).get_json()['id']
+        assert new_id > max(old)
+        result = runner.invoke(args=['archive-records', '--older-than', '365'])
+        assert result.exit_code == 0 and 'Archived 1 records' in result.output
+        assert sorted(r.id for r in HealthRecordArchive.query.all()) == sorted(old + [new_id])
+        text = client.get('/api/v1/health/export', headers=access_headers).get_data(as_text=True)
+        ids = [line.split(',')[0] for line in text.lstrip('\ufeff').splitlines()[1:]]
+        assert sorted(ids) == sorted(str(i) for i in old + [new_id])
+
+    def test_archived_records_in_aggregates_detail_and_deletes(self, client, auth_headers, runner):
+        """Stats (raw and rollup), series, abnormal counts, detail and deletes all see archived records"""
+        from src.models import ArchivedRecordTag, HealthRecordArchive
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        old_ids = client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 150, 'diastolic': 95, 'timestamp': '2020-03-01T08:00:00Z', 'tags': ['clinic'],
+             'subject_member_id': mom_id},
+            {'systolic': 110, 'diastolic': 70, 'timestamp': '2020-03-02T08:00:00Z'}]},
+            headers=access_headers).get_json()['ids']
+        client.post('/api/v1/health', json={'systolic': 160, 'diastolic': 100, 'subject_member_id': mom_id},
+                    headers=access_headers)
+        assert runner.invoke(args=['archive-records', '--older-than', '365']).exit_code == 0
+
+        def total(query=''):
+            stats = client.get(f'/api/v1/health/stats{query}', headers=access_headers).get_json()['stats']
+            return sum(s['count'] for s in stats)
+        assert total() == 3
+        assert total('?abnormal_only=true') == 2
+        assert total('?tags=clinic') == 1
+        assert client.get('/api/v1/health/series', headers=access_headers).get_json()['total'] == 3
+        counts = client.get('/api/v1/health/abnormal/count', headers=access_headers).get_json()['members']
+        assert [(c['member_id'], c['abnormal']) for c in counts] == [(mom_id, 2)]
+
+        detail = client.get(f'/api/v1/health/{old_ids[0]}', headers=access_headers).get_json()
+        assert (detail['systolic'], detail['tags'], detail['member_name']) == (150, ['clinic'], 'Mom')
+        # Archived records are read-only apart from deletion
+        assert client.put(f'/api/v1/health/{old_ids[0]}', json={'systolic': 140},
+                          headers=access_headers).status_code == 404
+
+        assert client.delete(f'/api/v1/health/{old_ids[0]}', headers=access_headers).status_code == 200
+        assert client.get(f'/api/v1/health/{old_ids[0]}', headers=access_headers).status_code == 404
+        assert total() == 2 and total('?tags=clinic') == 0
+        deleted = client.get('/api/v1/sync', headers=access_headers).get_json()['deleted']['records']
+        assert deleted == [old_ids[0]]
+
+        resp = client.post('/api/v1/health/bulk-delete', json={'filter': {'date_to': '2020-12-31T00:00:00Z'}},
+                           headers=access_headers)
+        assert resp.get_json() == {'deleted': 1}
+        assert HealthRecordArchive.query.count() == 0 and ArchivedRecordTag.query.count() == 0
+        assert total() == 1
+
+    def test_stream_ndjson_since_and_gzip(self, client, auth_headers):
+        """/stream writes one JSON record per line oldest-first; since is exclusive; gzip when accepted"""
+        import gzip
+        access_headers = auth_headers['access']
+        for day, sys in ((3, 131), (1, 121), (2, 126)):
+            client.post('/api/v1/health', json={'systolic': sys, 'diastolic': 80, 'tags': ['晨起'],
+                                                'timestamp': f'2025-08-0{day}T08:00:00Z'}, headers=access_headers)
+
+        response = client.get('/api/v1/health/stream', headers=access_headers)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == 'application/x-ndjson'
+        assert 'Content-Encoding' not in response.headers
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [r['systolic'] for r in lines] == [121, 126, 131]
+        assert lines[0]['timestamp'] == '2025-08-01T08:00:00Z'
+        assert lines[0]['tags'] == ['晨起'] and lines[0]['member_name'] == 'Self'
+
+        response = client.get('/api/v1/health/stream?since=2025-08-01T08:00:00Z',
+                              headers={**access_headers, 'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(response.get_data()).decode('utf-8')
+        assert [json.loads(line)['systolic'] for line in body.splitlines()] == [126, 131]
+
+        response = client.get('/api/v1/health/stream?since=yesterday', headers=access_headers)
+        assert response.status_code == 400
+
+    def test_backfill_record_subjects(self, client, auth_headers, runner):
+        """Legacy unmapped records are mapped to Self by the CLI and by the first list request"""
+        from src.extensions import db
+        from src.models import RecordSubject, User
+        access_headers = auth_headers['access']
+        for i in range(3):
+            client.post('/api/v1/health', json={'systolic': 120 + i, 'diastolic': 80}, headers=access_headers)
+        self_id = next(m['id'] for m in client.get('/api/v1/members', headers=access_headers).get_json()['members']
+                       if m['full_name'] == 'Self')
+
+        def make_legacy():
+            RecordSubject.query.delete()
+            User.query.update({User.record_subjects_backfilled: False})
+            db.session.commit()
+
+        make_legacy()
+        result = runner.invoke(args=['backfill-record-subjects', '--chunk-size', '2'])
+        assert result.exit_code == 0
+        assert 'Mapped 3 records across 1 users' in result.output
+        assert User.query.one().record_subjects_backfilled is True
+        response = client.get(f'/api/v1/health?subject_member_id={self_id}', headers=access_headers)
+        assert response.get_json()['pagination']['total'] == 3
+        # Marked users are skipped on later runs
+        assert 'Mapped 0 records across 0 users' in runner.invoke(args=['backfill-record-subjects']).output
+
+        make_legacy()
+        response = client.get(f'/api/v1/health?subject_member_id={self_id}', headers=access_headers)
+        assert response.get_json()['pagination']['total'] == 3
+        assert RecordSubject.query.count() == 3
+
+    def test_create_health_records_batch(self, client, auth_headers):
+        """Batch create inserts all items atomically and reports per-item validation errors"""
+        access_headers = auth_headers['access']
+        dad_id = client.post('/api/v1/members', json={'full_name': 'Dad'}, headers=access_headers).get_json()['id']
+        readings = [{'systolic': 110 + i, 'diastolic': 70, 'heart_rate': 60,
+                     'timestamp': f'2025-08-{i + 1:02d}T07:30:00Z', 'tags': ['device']} for i in range(20)]
+        readings[3]['subject_member_id'] = dad_id
+
+        response = client.post('/api/v1/health/batch', json={'records': readings}, headers=access_headers)
+        assert response.status_code == 201
+        body = response.get_json()
+        assert body['created'] == 20
+        assert len(body['ids']) == 20
+
+        data = client.get('/api/v1/health?tags=device&size=100', headers=access_headers).get_json()
+        assert data['pagination']['total'] == 20
+        dad_records = client.get(f'/api/v1/health?subject_member_id={dad_id}', headers=access_headers).get_json()
+        assert [r['id'] for r in dad_records['records']] == [body['ids'][3]]
+
+        # Any invalid item rejects the whole batch
+        bad = [{'systolic': 120, 'diastolic': 80},
+               {'systolic': 80, 'diastolic': 90},
+               {'systolic': 120, 'diastolic': 80, 'timestamp': 'yesterday', 'subject_member_id': 9999}]
+        response = client.post('/api/v1/health/batch', json={'records': bad}, headers=access_headers)
+        assert response.status_code == 400
+        items = response.get_json()['details']['items']
+        assert [i['index'] for i in items] == [1, 2]
+        assert '_schema' in items[0]['errors']
+        assert set(items[1]['errors']) == {'timestamp', 'subject_member_id'}
+        assert client.get('/api/v1/health', headers=access_headers).get_json()['pagination']['total'] == 20
+
+        response = client.post('/api/v1/health/batch', json={'records': []}, headers=access_headers)
+        assert response.status_code == 400
+
+    def test_import_csv_round_trips_export(self, client, auth_headers):
+        """An exported CSV imports back, skipping and reporting invalid rows"""
+        import io
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        client.post('/api/v1/health', json={'systolic': 130, 'diastolic': 85, 'heart_rate': 70,
+                                            'timestamp': '2025-08-02T08:00:00Z', 'tags': ['晨起', 'home'],
+                                            'note': 'after walk'}, headers=access_headers)
+        client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80, 'timestamp': '2025-08-01T08:00:00Z',
+                                            'subject_member_id': mom_id}, headers=access_headers)
+        exported = client.get('/api/v1/health/export', headers=access_headers).get_data()
+        bad_rows = ('\n,Mom,2025-08-03T08:00:00Z,80,90,,,\n'
+                    ',Nobody,2025-08-04T08:00:00Z,120,80,,,\n'
+                    ',,,120,80,,,\n').encode('utf-8')
+
+        response = client.post('/api/v1/health/import', headers=access_headers, content_type='multipart/form-data',
+                               data={'file': (io.BytesIO(exported.rstrip(b'\r\n') + bad_rows), 'records.csv')})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['imported'] == 2
+        assert body['skipped'] == 3
+        assert [e['line'] for e in body['errors']] == [4, 5, 6]
+        assert '_schema' in body['errors'][0]['errors']
+        assert 'member_name' in body['errors'][1]['errors']
+        assert 'timestamp' in body['errors'][2]['errors']
+
+        mom_records = client.get(f'/api/v1/health?subject_member_id={mom_id}', headers=access_headers).get_json()
+        assert mom_records['pagination']['total'] == 2
+        tagged = client.get('/api/v1/health?tags=晨起', headers=access_headers).get_json()['records']
+        assert len(tagged) == 2
+        assert all(r['tags'] == ['晨起', 'home'] and r['note'] == 'after walk' and r['heart_rate'] == 70
+                   for r in tagged)
+
+        # Raw text/csv bodies work too; a header without the required columns is rejected
+        response = client.post('/api/v1/health/import', headers=access_headers, content_type='text/csv',
+                               data='timestamp,systolic,diastolic\n2025-08-05T08:00:00Z,118,76\n')
+        assert response.get_json()['imported'] == 1
+        response = client.post('/api/v1/health/import', headers=access_headers, content_type='text/csv',
+                               data='when,sys\n')
+        assert response.status_code == 400
+        assert response.get_json()['details']['missing_columns'] == ['diastolic', 'systolic', 'timestamp']
+
+    def test_record_stats_buckets(self, client, auth_headers):
+        """Stats aggregate per day/week/month in SQL and honour list filters"""
+        access_headers = auth_headers['access']
+        dad_id = client.post('/api/v1/members', json={'full_name': 'Dad'}, headers=access_headers).get_json()['id']
+        readings = [
+            # Friday 2025-08-01 (two readings), Sunday 08-03, Monday 08-04, and September
+            {'systolic': 120, 'diastolic': 80, 'heart_rate': 60, 'timestamp': '2025-08-01T07:00:00Z', 'tags': ['am']},
+            {'systolic': 131, 'diastolic': 85, 'timestamp': '2025-08-01T21:00:00Z', 'tags': ['pm']},
+            {'systolic': 140, 'diastolic': 90, 'heart_rate': 80, 'timestamp': '2025-08-03T07:00:00Z', 'tags': ['am']},
+            {'systolic': 110, 'diastolic': 70, 'heart_rate': 70, 'timestamp': '2025-08-04T07:00:00Z', 'tags': ['am']},
+            {'systolic': 150, 'diastolic': 95, 'timestamp': '2025-09-10T07:00:00Z', 'subject_member_id': dad_id},
+        ]
+        client.post('/api/v1/health/batch', json={'records': readings}, headers=access_headers)
+
+        stats = client.get('/api/v1/health/stats', headers=access_headers).get_json()
+        assert stats['bucket'] == 'day'
+        first = stats['stats'][0]
+        assert first['period'] == '2025-08-01'
+        assert first['count'] == 2
+        assert first['systolic'] == {'min': 120, 'max': 131, 'avg': 125.5}
+        assert first['heart_rate'] == {'count': 1, 'min': 60, 'max': 60, 'avg': 60.0}
+
+        weeks = client.get('/api/v1/health/stats?bucket=week', headers=access_headers).get_json()['stats']
+        assert [(w['period'], w['count']) for w in weeks] == [('2025-07-28', 3), ('2025-08-04', 1), ('2025-09-08', 1)]
+        months = client.get('/api/v1/health/stats?bucket=month', headers=access_headers).get_json()['stats']
+        assert [(m['period'], m['count']) for m in months] == [('2025-08-01', 4), ('2025-09-01', 1)]
+
+        filtered = client.get('/api/v1/health/stats?bucket=month&tags=am&date_to=2025-08-03T23:59:59Z',
+                              headers=access_headers).get_json()['stats']
+        assert [(m['period'], m['count']) for m in filtered] == [('2025-08-01', 2)]
+        dad = client.get(f'/api/v1/health/stats?bucket=month&subject_member_id={dad_id}',
+                         headers=access_headers).get_json()['stats']
+        assert [(m['period'], m['count']) for m in dad] == [('2025-09-01', 1)]
+        assert client.get('/api/v1/health/stats?bucket=year', headers=access_headers).status_code == 400
+
+    def test_daily_rollups_follow_writes(self, client, auth_headers, runner):
+        """Daily rollups stay equal to a full rebuild across create/update/delete and serve stats"""
+        from src.models import HealthDailyRollup
+        access_headers = auth_headers['access']
+
+        def snapshot():
+            return sorted((r.member_id, r.day.isoformat(), r.count, r.systolic_sum, r.systolic_min, r.systolic_max,
+                           r.diastolic_sum, r.heart_rate_count, r.heart_rate_sum, r.heart_rate_max)
+                          for r in HealthDailyRollup.query.all())
+
+        readings = [{'systolic': 120 + i, 'diastolic': 70 + i, 'heart_rate': 60 + i if i % 2 else None,
+                     'timestamp': f'2025-08-0{1 + i % 3}T0{i}:00:00Z'} for i in range(9)]
+        ids = client.post('/api/v1/health/batch', json={'records': readings}, headers=access_headers).get_json()['ids']
+        client.post('/api/v1/health', json={'systolic': 150, 'diastolic': 95, 'timestamp': '2025-08-02T12:00:00Z'},
+                    headers=access_headers)
+        client.put(f'/api/v1/health/{ids[0]}', json={'systolic': 180, 'heart_rate': 99}, headers=access_headers)
+        client.delete(f'/api/v1/health/{ids[1]}', headers=access_headers)
+        client.delete(f'/api/v1/health/{ids[4]}', headers=access_headers)
+
+        maintained = snapshot()
+        assert [row[2] for row in maintained] == [3, 2, 3]
+        result = runner.invoke(args=['rebuild-rollups'])
+        assert result.exit_code == 0
+        assert 'Wrote 3 daily rollup rows' in result.output
+        assert snapshot() == maintained
+
+        # Whole-day ranges read rollups; a range that starts mid-day falls back to raw rows
+        whole = client.get('/api/v1/health/stats?date_from=2025-08-02T00:00:00Z&date_to=2025-08-03T23:59:59Z',
+                           headers=access_headers).get_json()['stats']
+        partial = client.get('/api/v1/health/stats?date_from=2025-08-02T00:00:01Z&date_to=2025-08-03T23:59:59Z',
+                             headers=access_headers).get_json()['stats']
+        assert whole == partial
+        assert [s['count'] for s in whole] == [2, 3]
+
+    def test_series_downsamples_and_keeps_abnormal(self, client, auth_headers):
+        """/series bounds the payload at `points` and never drops an isolated abnormal reading"""
+        access_headers = auth_headers['access']
+        spikes = {37, 150, 262}
+        readings = [{'systolic': 165 if i in spikes else 110 + i % 5, 'diastolic': 70 + i % 3,
+                     'timestamp': f'2025-07-{1 + i // 24:02d}T{i % 24:02d}:00:00Z'} for i in range(300)]
+        ids = client.post('/api/v1/health/batch', json={'records': readings}, headers=access_headers).get_json()['ids']
+
+        body = client.get('/api/v1/health/series?points=40', headers=access_headers).get_json()
+        assert body['total'] == 300 and body['downsampled'] is True
+        series = body['series']
+        assert len(series) == 40
+        assert series[0]['id'] == ids[0] and series[-1]['id'] == ids[-1]
+        assert {ids[i] for i in spikes} <= {p['id'] for p in series}
+        assert [p['timestamp'] for p in series] == sorted(p['timestamp'] for p in series)
+
+        small = client.get('/api/v1/health/series?points=500', headers=access_headers).get_json()
+        assert small['downsampled'] is False and len(small['series']) == 300
+        assert client.get('/api/v1/health/series?points=2', headers=access_headers).status_code == 400
+
+    @pytest.mark.parametrize('threshold', [3, 40, 100, 999])
+    @pytest.mark.parametrize('with_keep', [False, True])
+    def test_lttb_numpy_matches_python(self, monkeypatch, threshold, with_keep):
+        """With NumPy installed, lttb_indices picks the same points on both paths"""
+        np = pytest.importorskip('numpy')
+        from src import downsample
+        rng = np.random.default_rng(7)
+        x = np.cumsum(rng.integers(60, 3600, 1000)).tolist()
+        ys = (rng.integers(90, 170, 1000).tolist(), rng.integers(55, 110, 1000).tolist())
+        keep = [s >= 160 for s in ys[0]] if with_keep else None
+
+        numpy_picks = downsample.lttb_indices(x, ys, threshold, keep=keep)
+        monkeypatch.setattr(downsample, 'np', None)
+        python_picks = downsample.lttb_indices(x, ys, threshold, keep=keep)
+        assert numpy_picks == python_picks
+        assert len(numpy_picks) == threshold and numpy_picks[0] == 0 and numpy_picks[-1] == 999
+
+    def test_abnormal_severity_filter_and_counts(self, client, auth_headers, runner, app):
+        """Severity is set on write/update, filters list/export, is counted per member and backfilled"""
+        from src.extensions import db
+        from src.models import HealthRecord
+        access_headers = auth_headers['access']
+        readings = [(118, 76), (125, 78), (118, 82), (145, 85), (190, 100), (110, 70)]
+        ids = client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': s, 'diastolic': d, 'timestamp': f'2025-09-0{i + 1}T08:00:00Z'}
+            for i, (s, d) in enumerate(readings)]}, headers=access_headers).get_json()['ids']
+        assert [db.session.get(HealthRecord, i).severity for i in ids] == [0, 1, 2, 3, 4, 0]
+
+        listed = client.get('/api/v1/health?abnormal_only=true&size=100', headers=access_headers).get_json()
+        assert sorted(r['id'] for r in listed['records']) == ids[1:5]
+        assert listed['pagination']['total'] == 4
+        export = client.get('/api/v1/health/export?abnormal_only=1', headers=access_headers)
+        assert len(export.get_data(as_text=True).strip().splitlines()) == 1 + 4
+        assert client.get('/api/v1/health?abnormal_only=maybe', headers=access_headers).status_code == 400
+
+        client.put(f'/api/v1/health/{ids[0]}', json={'systolic': 135}, headers=access_headers)
+        counts = client.get('/api/v1/health/abnormal/count', headers=access_headers).get_json()['members']
+        assert len(counts) == 1
+        assert counts[0]['abnormal'] == 5
+        assert counts[0]['by_severity'] == {'elevated': 1, 'stage_1': 2, 'stage_2': 1, 'crisis': 1}
+
+        # Rows written before the column existed are classified by the backfill command
+        HealthRecord.query.update({HealthRecord.severity: None}, synchronize_session=False)
+        db.session.commit()
+        result = runner.invoke(args=['backfill-record-severity', '--chunk-size', '4'])
+        assert result.exit_code == 0
+        assert 'Classified 6 records' in result.output
+        db.session.expire_all()
+        assert [db.session.get(HealthRecord, i).severity for i in ids] == [2, 1, 2, 3, 4, 0]
+
+    def test_etag_not_modified_until_data_changes(self, client, auth_headers):
+        """List/detail/export answer 304 for a current ETag and change tags after any write"""
+        access_headers = auth_headers['access']
+        rec_id = client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80,
+                                                     'timestamp': '2025-08-22T10:00:00Z'},
+                             headers=access_headers).get_json()['id']
+        urls = ['/api/v1/health?size=5', f'/api/v1/health/{rec_id}', '/api/v1/health/export']
+        etags = {}
+        for url in urls:
+            resp = client.get(url, headers=access_headers)
+            assert resp.status_code == 200
+            assert resp.headers['ETag'].startswith('W/')
+            etags[url] = resp.headers['ETag']
+            again = client.get(url, headers={**access_headers, 'If-None-Match': etags[url]})
+            assert again.status_code == 304
+            assert again.get_data() == b''
+        assert len(set(etags.values())) == 3
+
+        client.put(f'/api/v1/health/{rec_id}', json={'note': 'edited'}, headers=access_headers)
+        for url in urls:
+            resp = client.get(url, headers={**access_headers, 'If-None-Match': etags[url]})
+            assert resp.status_code == 200
+            assert resp.headers['ETag'] != etags[url]
+
+    def test_list_sparse_fields_and_columnar(self, client, auth_headers, app):
+        """?fields= selects only those columns in SQL; ?format=columnar returns one array per field"""
+        from sqlalchemy import event
+        from src.extensions import db
+        access_headers = auth_headers['access']
+        for i in range(3):
+            client.post('/api/v1/health', json={'systolic': 120 + i, 'diastolic': 80, 'tags': ['t'],
+                                                'note': 'n', 'timestamp': f'2025-08-0{i + 1}T08:00:00Z'},
+                        headers=access_headers)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            body = client.get('/api/v1/health?fields=timestamp,systolic&format=columnar',
+                              headers=access_headers).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert body['records'] == {'timestamp': ['2025-08-03T08:00:00Z', '2025-08-02T08:00:00Z',
+                                                 '2025-08-01T08:00:00Z'],
+                                   'systolic': [122, 121, 120]}
+        assert body['pagination']['total'] == 3
+        page_sql = [s for s in statements if 'LIMIT' in s and 'count(' not in s.lower()][-1]
+        assert 'health_records.note' not in page_sql and 'health_records.tags' not in page_sql
+
+        rows = client.get('/api/v1/health?fields=id,tags&cursor=&size=2', headers=access_headers).get_json()
+        assert [sorted(r) for r in rows['records']] == [['id', 'tags'], ['id', 'tags']]
+        assert rows['records'][0]['tags'] == ['t'] and rows['pagination']['next_cursor']
+        nxt = client.get(f"/api/v1/health?fields=id,tags&size=2&cursor={rows['pagination']['next_cursor']}",
+                         headers=access_headers).get_json()
+        assert len(nxt['records']) == 1 and nxt['pagination']['next_cursor'] is None
+
+        assert client.get('/api/v1/health?fields=password', headers=access_headers).status_code == 400
+        assert client.get('/api/v1/health?format=xml', headers=access_headers).status_code == 400
+
+    def test_list_and_detail_include_subject_in_one_query(self, client, auth_headers):
+        """Every list row and the detail carry subject_member_id/member_name, joined into the page query"""
+        from sqlalchemy import event
+        from src.extensions import db
+        access_headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=access_headers).get_json()['id']
+        client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120 + i, 'diastolic': 80, 'timestamp': f'2025-08-0{i + 1}T08:00:00Z',
+             'subject_member_id': mom_id if i % 2 else None} for i in range(6)]}, headers=access_headers)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.lower())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            pages = [client.get(url, headers=access_headers).get_json() for url in (
+                '/api/v1/health?size=4', '/api/v1/health?size=4&page=2', '/api/v1/health?size=4&total=false',
+                '/api/v1/health?size=4&cursor=', '/api/v1/health?size=4&format=columnar')]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        # One SELECT per page: records, subject and total together, no per-row member lookups
+        record_sql = [st for st in statements if 'from health_records' in st]
+        assert len(record_sql) == len(pages)
+        assert all('join members' in st for st in record_sql)
+        # (Filter parsing still resolves the Self member once per request, by household and name)
+        assert not any('from members' in st and 'where members.id' in st for st in statements)
+
+        rows = pages[0]['records'] + pages[1]['records']
+        assert [(r['systolic'], r['member_name']) for r in rows] == [
+            (125, 'Mom'), (124, 'Self'), (123, 'Mom'), (122, 'Self'), (121, 'Mom'), (120, 'Self')]
+        assert {r['subject_member_id'] for r in rows if r['member_name'] == 'Mom'} == {mom_id}
+        assert pages[4]['records']['member_name'][:2] == ['Mom', 'Self']
+        # Sparse fieldsets without subject fields skip the join
+        statements.clear()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            client.get('/api/v1/health?fields=id,systolic', headers=access_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert not any('join members' in st for st in statements)
+
+        detail = client.get(f"/api/v1/health/{rows[0]['id']}", headers=access_headers).get_json()
+        assert detail['subject_member_id'] == mom_id and detail['member_name'] == 'Mom'
+
+    def test_count_free_pages_and_cached_totals(self, client, auth_headers):
+        """?total=false skips COUNT for has_more; totals are counted once per filter set until a write"""
+        from sqlalchemy import event
+        from src.extensions import db
+        access_headers = auth_headers['access']
+        client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120, 'diastolic': 80, 'timestamp': f'2025-08-0{i + 1}T08:00:00Z'} for i in range(5)]},
+            headers=access_headers)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.lower())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            first = client.get('/api/v1/health?total=false&size=2', headers=access_headers).get_json()
+            last = client.get('/api/v1/health?total=false&size=2&page=3', headers=access_headers).get_json()
+            count_free = [s for s in statements if 'count(' in s]
+            statements.clear()
+            client.get('/api/v1/health?size=2', headers=access_headers)
+            page2 = client.get('/api/v1/health?size=2&page=2', headers=access_headers).get_json()
+            counted = [s for s in statements if 'count(' in s]
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert first['pagination'] == {'page': 1, 'size': 2, 'has_more': True}
+        assert len(first['records']) == 2
+        assert last['pagination']['has_more'] is False and len(last['records']) == 1
+        assert count_free == []
+        assert len(counted) == 1
+        assert page2['pagination']['total'] == 5 and page2['pagination']['has_more'] is True
+
+        client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80}, headers=access_headers)
+        assert client.get('/api/v1/health?size=2&page=2', headers=access_headers).get_json()['pagination']['total'] == 6
+        assert client.get('/api/v1/health?total=maybe', headers=access_headers).status_code == 400
@@ -0,0 +1,54 @@
+"""
+Tests for the JSON providers: orjson and stdlib must produce the same API output.
+"""
+import decimal
+import json
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from src import json_provider
+from src.app import create_app
+from tests.conftest import TestConfig
+
+PAYLOAD = {
+    "b": [datetime(2025, 8, 22, 10, 0, 0), datetime(2025, 8, 22, 10, 0, 0, 123456)],
+    "a": {"aware": datetime(2025, 8, 22, 10, 0, tzinfo=timezone.utc), "day": date(2025, 8, 22)},
+    "price": decimal.Decimal("12.50"),
+    "name": "晨起",
+}
+EXPECTED = {
+    "a": {"aware": "2025-08-22T10:00:00Z", "day": "2025-08-22"},
+    "b": ["2025-08-22T10:00:00Z", "2025-08-22T10:00:00.123456Z"],
+    "name": "晨起",
+    "price": "12.50",
+}
+
+
+def _app(provider):
+    class Config(TestConfig):
+        JSON_PROVIDER = provider
+    return create_app(Config)
+
+
+@pytest.mark.parametrize("provider", ["stdlib", "orjson"])
+def test_providers_serialize_datetimes_in_api_format(provider):
+    if provider == "orjson":
+        pytest.importorskip("orjson")
+    app = _app(provider)
+    assert isinstance(app.json, json_provider.OrjsonProvider if provider == "orjson" else json_provider.UTCJSONProvider)
+    text = app.json.dumps(PAYLOAD)
+    assert json.loads(text) == EXPECTED
+    assert text.index('"a"') < text.index('"b"')  # keys sorted like Flask's default provider
+    with app.test_request_context():
+        resp = app.json.response(PAYLOAD)
+        assert resp.mimetype == "application/json"
+        assert json.loads(resp.get_data(as_text=True)) == EXPECTED
+
+
+def test_format_datetime_converts_to_utc():
+    local = datetime(2025, 8, 22, 18, 0, tzinfo=timezone(timedelta(hours=8)))
+    assert json_provider.format_datetime(local) == "2025-08-22T10:00:00Z"
+
+
+def test_unknown_provider_rejected():
+    with pytest.raises(ValueError):
+        _app("simplejson")
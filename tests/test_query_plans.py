@@ -0,0 +1,99 @@
+"""
+Query plan checks for the health record hot queries (SQLite EXPLAIN QUERY PLAN).
+"""
+from datetime import datetime
+from sqlalchemy import event
+from src.extensions import db
+from src.manager.health_manager import HealthManager
+from src.manager.user_manager import UserManager
+from src.models import HealthRecord
+
+
+def _capture_statements(fn):
+    """Run fn and return the (sql, params) pairs it sent to the driver."""
+    captured = []
+
+    def _listener(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", _listener)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _listener)
+    return captured
+
+
+def _plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+class TestHealthQueryPlans:
+    def test_list_count_and_export_use_indexes(self, app):
+        manager = HealthManager()
+        window = dict(tags=None, date_from=datetime(2025, 1, 1), date_to=datetime(2025, 12, 31))
+
+        statements = _capture_statements(lambda: manager.list(1, page=3, size=20, subject_member_id=7, **window))
+        statements += _capture_statements(lambda: list(manager.iter_export_rows(1, subject_member_id=7, **window)))
+        # The export first looks up the user's archive boundary (a primary key read on users)
+        statements = [st for st in statements if "archived_before" not in st[0]]
+        # The page query carries the total; the empty page past the end falls back to a plain COUNT
+        list_sql, count_sql, export_sql = statements
+        assert "(SELECT count(" in list_sql[0]
+        assert count_sql[0].lstrip().upper().startswith("SELECT COUNT")
+
+        for statement, parameters in (count_sql, list_sql, export_sql):
+            plan = _plan(statement, parameters)
+            joined = "\n".join(plan)
+            assert "ix_health_records_user_ts_id" in joined, joined
+            assert "ix_record_subjects_member_record" in joined, joined
+            # Sorting must come from the index, not a temporary b-tree
+            assert "TEMP B-TREE" not in joined, joined
+            assert not any(p.startswith("SCAN health_records") for p in plan), joined
+
+        # The export joins the subject mapping through the unique record_id index
+        assert "ix_record_subjects_record_id" in "\n".join(_plan(*export_sql))
+
+    def test_list_total_rides_on_page_query(self, app):
+        manager = HealthManager()
+        user_id = UserManager().create_user("plans", "plans@example.com", "Passw0rd!").id
+        manager.bulk_create(user_id, [dict(systolic=110 + i, diastolic=70, heart_rate=None, note=None, tags=[],
+                                           timestamp=datetime(2025, 1, 1 + i), subject_member_id=None)
+                                      for i in range(5)], None)
+
+        pages = []
+        statements = _capture_statements(lambda: pages.append(manager.list(user_id, 2, 2, None, None, None)))
+        statements += _capture_statements(lambda: pages.append(manager.list(user_id, 1, 2, None, None, None, columns=("id",))))
+        assert len(statements) == 2
+        (total, items), (col_total, rows) = pages
+        assert total == col_total == 5
+        assert [r.systolic for r in items] == [112, 111]
+        assert [r.id for r in rows] == [5, 4]
+
+    def test_bulk_create_inserts_records_in_one_executemany(self, app):
+        manager = HealthManager()
+        user_id = UserManager().create_user("bulk", "bulk@example.com", "Passw0rd!").id
+        items = [dict(systolic=110 + i, diastolic=70, heart_rate=None, note=None, tags=["am"],
+                      timestamp=datetime(2025, 1, 1, 8, i), subject_member_id=None) for i in range(50)]
+        ids = []
+        statements = _capture_statements(lambda: ids.extend(manager.bulk_create(user_id, items, None)))
+        record_inserts = [st for st in statements if st[0].lstrip().startswith("INSERT INTO health_records")]
+        assert len(record_inserts) == 1 and len(record_inserts[0][1]) == 50
+        # One SELECT maps the rows back to their ids by their change sequence numbers
+        id_reads = [st for st in statements if st[0].lstrip().startswith("SELECT health_records.change_seq")]
+        assert len(id_reads) == 1
+        assert "ix_health_records_user_change_seq" in "\n".join(_plan(*id_reads[0]))
+        assert [r.systolic for r in (db.session.get(HealthRecord, i) for i in ids)] == [110 + i for i in range(50)]
+
+    def test_list_subject_join_uses_indexes(self, app):
+        manager = HealthManager()
+        window = dict(tags=None, date_from=datetime(2025, 1, 1), date_to=datetime(2025, 12, 31))
+        (page_sql,) = _capture_statements(lambda: manager.list(1, page=3, size=20, with_subject=True, **window))[:1]
+        plan = _plan(*page_sql)
+        joined = "\n".join(plan)
+        assert "ix_health_records_user_ts_id" in joined, joined
+        # One indexed lookup per page row for the subject mapping and the member
+        assert "SEARCH record_subjects USING INDEX ix_record_subjects_record_id" in joined, joined
+        assert "SEARCH members USING INTEGER PRIMARY KEY" in joined, joined
+        assert "TEMP B-TREE" not in joined, joined
@@ -0,0 +1,109 @@
+"""
+Tests for delta sync: change sequence, tombstones, batching and rows written before sync existed.
+"""
+from src.extensions import db
+from src.models import HealthRecord, Member
+
+
+def _sync(client, headers, since=0, limit=None):
+    query = f'?since={since}' + (f'&limit={limit}' if limit else '')
+    resp = client.get(f'/api/v1/sync{query}', headers=headers)
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def _sync_all(client, headers, since=0, limit=None):
+    """Follow next_since until caught up; return the merged batches and the final checkpoint."""
+    records, members, deleted, calls = {}, {}, [], 0
+    while True:
+        body = _sync(client, headers, since, limit)
+        calls += 1
+        records.update({r['id']: r for r in body['records']})
+        members.update({m['id']: m for m in body['members']})
+        deleted += body['deleted']['records']
+        since = body['next_since']
+        if not body['has_more']:
+            return records, members, deleted, since, calls
+
+
+class TestSync:
+    def test_incremental_changes_and_tombstones(self, client, auth_headers):
+        headers = auth_headers['access']
+        mom_id = client.post('/api/v1/members', json={'full_name': 'Mom'}, headers=headers).get_json()['id']
+        ids = client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 120 + i, 'diastolic': 80, 'tags': ['home'], 'subject_member_id': mom_id if i == 0 else None}
+            for i in range(3)]}, headers=headers).get_json()['ids']
+
+        records, members, deleted, checkpoint, _ = _sync_all(client, headers)
+        assert set(records) == set(ids)
+        assert records[ids[0]]['subject_member_id'] == mom_id and records[ids[0]]['tags'] == ['home']
+        assert {m['full_name'] for m in members.values()} == {'Self', 'Mom'}
+        assert deleted == []
+
+        body = _sync(client, headers, checkpoint)
+        assert body == {'records': [], 'members': [], 'deleted': {'records': []},
+                        'next_since': checkpoint, 'has_more': False}
+
+        client.put(f'/api/v1/health/{ids[1]}', json={'systolic': 135}, headers=headers)
+        client.delete(f'/api/v1/health/{ids[2]}', headers=headers)
+        client.post('/api/v1/health/bulk-delete', json={'ids': [ids[0]]}, headers=headers)
+        client.delete(f'/api/v1/members/{mom_id}', headers=headers)
+
+        body = _sync(client, headers, checkpoint)
+        assert [(r['id'], r['systolic']) for r in body['records']] == [(ids[1], 135)]
+        assert sorted(body['deleted']['records']) == sorted([ids[0], ids[2]])
+        assert [(m['id'], m['status']) for m in body['members']] == [(mom_id, 'inactive')]
+        assert body['next_since'] > checkpoint and not body['has_more']
+
+    def test_batches_page_through_every_change_once(self, client, auth_headers):
+        headers = auth_headers['access']
+        ids = client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 110 + i, 'diastolic': 75} for i in range(7)]}, headers=headers).get_json()['ids']
+        client.delete(f'/api/v1/health/{ids[0]}', headers=headers)
+
+        seen = []
+        since = 0
+        while True:
+            body = _sync(client, headers, since, limit=3)
+            assert len(body['records']) + len(body['members']) + len(body['deleted']['records']) <= 3
+            seen += [r['id'] for r in body['records']] + [('deleted', rid) for rid in body['deleted']['records']]
+            since = body['next_since']
+            if not body['has_more']:
+                break
+        assert sorted(seen[:-1]) == sorted(ids[1:]) and seen[-1] == ('deleted', ids[0])
+
+    def test_rows_from_before_sync_are_sequenced(self, client, auth_headers, runner):
+        headers = auth_headers['access']
+        client.post('/api/v1/health/batch', json={'records': [
+            {'systolic': 110 + i, 'diastolic': 75} for i in range(5)]}, headers=headers)
+        # As left by the migration: no sequence numbers yet
+        HealthRecord.query.update({HealthRecord.change_seq: 0})
+        Member.query.update({Member.change_seq: 0})
+        db.session.commit()
+
+        records, members, _, checkpoint, calls = _sync_all(client, headers, limit=2)
+        assert len(records) == 5 and len(members) == 1 and calls == 3
+        assert _sync(client, headers, checkpoint)['records'] == []
+
+        HealthRecord.query.update({HealthRecord.change_seq: 0})
+        db.session.commit()
+        result = runner.invoke(args=['sequence-sync-rows'])
+        assert result.exit_code == 0 and 'Sequenced 5 rows' in result.output
+        assert HealthRecord.query.filter_by(change_seq=0).count() == 0
+
+    def test_archived_records_are_synced(self, client, auth_headers, runner):
+        headers = auth_headers['access']
+        client.post('/api/v1/health', json={'systolic': 130, 'diastolic': 85, 'timestamp': '2020-01-01T08:00:00Z'},
+                    headers=headers)
+        client.post('/api/v1/health', json={'systolic': 120, 'diastolic': 80}, headers=headers)
+        _, _, _, checkpoint, _ = _sync_all(client, headers)
+        assert runner.invoke(args=['archive-records', '--older-than', '365']).exit_code == 0
+
+        # Archiving is not a change, but a fresh client still gets archived records
+        assert _sync(client, headers, checkpoint)['records'] == []
+        records, _, _, _, _ = _sync_all(client, headers)
+        assert sorted(r['systolic'] for r in records.values()) == [120, 130]
+
+    def test_invalid_since(self, client, auth_headers):
+        resp = client.get('/api/v1/sync?since=-1', headers=auth_headers['access'])
+        assert resp.status_code == 400
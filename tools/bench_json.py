@@ -0,0 +1,80 @@
+"""
+Benchmark JSON serialization of typical API payloads with each provider.
+
+Compares the previous path (stdlib provider, timestamps pre-formatted per field in Python) with the
+stdlib and orjson providers serializing datetimes natively. Run from the project root:
+
+    python -m tools.bench_json [--rounds 2000]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.json_provider import OrjsonProvider, UTCJSONProvider, format_datetime, orjson
+
+
+def record_page(rows: int = 100):
+    start = datetime(2025, 1, 1, 7, 30)
+    return [{
+        "id": i,
+        "systolic": 110 + i % 40,
+        "diastolic": 70 + i % 25,
+        "heart_rate": 60 + i % 30 if i % 3 else None,
+        "timestamp": start + timedelta(hours=7 * i, microseconds=i),
+        "tags": ["morning", "晨起"] if i % 2 else [],
+        "note": "after walk" if i % 5 == 0 else None,
+    } for i in range(rows)]
+
+
+def user_list(rows: int = 200):
+    start = datetime(2024, 6, 1, 9, 0)
+    return [{
+        "id": i,
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "created_at": start + timedelta(days=i),
+        "last_login_at": start + timedelta(days=i, hours=3) if i % 4 else None,
+        "role": "USER",
+    } for i in range(rows)]
+
+
+def preformatted(rows):
+    """What endpoints did before: format every datetime field to a string in Python."""
+    return [{k: format_datetime(v) if isinstance(v, datetime) else v for k, v in r.items()} for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = [("stdlib + per-field format", DefaultJSONProvider(app), True),
+                 ("stdlib native datetimes", UTCJSONProvider(app), False)]
+    if orjson is not None:
+        providers.append(("orjson native datetimes", OrjsonProvider(app), False))
+    else:
+        print("orjson not installed; skipping it")
+
+    for name, payload in (("record page (100 rows)", {"records": record_page()}),
+                          ("admin user list (200 users)", {"items": user_list(), "total": 200})):
+        print(f"\n{name}")
+        baseline = None
+        for label, provider, needs_format in providers:
+            key = next(iter(payload))
+            rows = payload[key]
+
+            def run():
+                body = dict(payload, **{key: preformatted(rows)}) if needs_format else payload
+                return provider.dumps(body)
+            out = json.loads(run())
+            assert out[key][1].get("timestamp", out[key][1].get("created_at")).endswith("Z")
+            per_call = min(timeit.repeat(run, number=args.rounds, repeat=3)) / args.rounds * 1e6
+            baseline = baseline or per_call
+            print(f"  {label:<28} {per_call:8.1f} us/page  x{baseline / per_call:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
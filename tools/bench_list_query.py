@@ -0,0 +1,97 @@
+"""
+Benchmark ways of fetching a record list page together with its filtered total.
+
+Compares a separate COUNT + page query, a single query with COUNT(*) OVER () and the single query
+HealthManager.list runs (page rows plus an uncorrelated (SELECT COUNT ...) column). Runs against a
+temporary SQLite database with a fixed delay before every statement standing in for the network
+round-trip to a MySQL server. Run from the project root:
+
+    python -m tools.bench_list_query [--rows 20000] [--latency-ms 1.0] [--rounds 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from src.app import create_app
+from src.config import Config
+from src.extensions import db
+from src.manager.health_manager import HealthManager
+from src.models import HealthRecord
+
+
+def seed(user_id: int, rows: int) -> None:
+    start = datetime(2024, 1, 1, 7, 30)
+    db.session.bulk_insert_mappings(HealthRecord, [{
+        "user_id": user_id,
+        "systolic": 110 + i % 40,
+        "diastolic": 70 + i % 25,
+        "heart_rate": 60 + i % 30,
+        "timestamp": start + timedelta(hours=3 * i),
+        "tags": "",
+        "severity": 0,
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def strategies(manager: HealthManager):
+    q = manager._filtered_query(1, None, None, None, None, "any", False)
+    order = (HealthRecord.timestamp.desc(), HealthRecord.id.desc())
+
+    def page(n):
+        return q.order_by(*order).offset((n - 1) * 20).limit(20)
+
+    def two_queries(n):
+        return q.count(), page(n).all()
+
+    def window(n):
+        rows = page(n).add_columns(func.count().over()).all()
+        return rows[0][1], [r[0] for r in rows]
+
+    def scalar_count(n):
+        return manager.list(1, n, 20, None, None, None)
+
+    return [("COUNT + page query", two_queries), ("COUNT(*) OVER ()", window),
+            ("page + (SELECT COUNT)", scalar_count)]
+
+
+def run(fetch, rounds: int, pages: int) -> float:
+    started = time.perf_counter()
+    for i in range(rounds):
+        fetch(i * 7 % pages + 1)
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated per-statement round-trip")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            CACHE_BACKEND = "none"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            seed(1, args.rows)
+
+            def round_trip(*_):
+                time.sleep(args.latency_ms / 1000)
+            event.listen(db.engine, "before_cursor_execute", round_trip)
+
+            pages = max(1, args.rows // 20)
+            print(f"{args.rows} rows, {args.latency_ms:g} ms simulated round-trip, {args.rounds} pages of 20")
+            baseline = None
+            for name, fetch in strategies(HealthManager()):
+                ms = run(fetch, args.rounds, pages)
+                baseline = baseline or ms
+                print(f"  {name:<24}{ms:8.2f} ms/page  ({baseline / ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()